@@ -18,6 +18,7 @@ import { Terminal } from '@xterm/xterm'
 import { FitAddon } from '@xterm/addon-fit'
 import '@xterm/xterm/css/xterm.css'
 import { io } from 'socket.io-client'
+import { loadBootstrap } from '../utils/bootstrap'
 import CredentialPrompt from './CredentialPrompt'
 import axios from 'axios'
 
@@ -64,8 +65,8 @@ export default function Console({ open, onClose, site, openInNewTab = false }) {
     const checkSavedCredentials = async () => {
       if (site?.id && site?.console_type === 'ssh') {
         try {
-          const res = await axios.get('/api/credentials')
-          const credentials = res.data.credentials || []
+          const sections = await loadBootstrap(['credentials'])
+          const credentials = sections.credentials?.credentials || []
           const hasPassword = credentials.some(
             cred => cred.credential_type === 'password' &&
             (cred.associated_site_ids || []).includes(site.id)
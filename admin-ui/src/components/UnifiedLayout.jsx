@@ -33,6 +33,7 @@ import Brightness4Icon from '@mui/icons-material/Brightness4'
 import Brightness7Icon from '@mui/icons-material/Brightness7'
 import axios from 'axios'
 import { useTheme } from '../contexts/ThemeContext'
+import { loadBootstrap, resetBootstrap } from '../utils/bootstrap'
 
 // Configure axios to send cookies with requests
 axios.defaults.withCredentials = true
@@ -70,11 +71,11 @@ export default function UnifiedLayout({ webappConfig }) {
   const { mode, toggleMode, theme } = useTheme()
 
   useEffect(() => {
-    // Check authentication
-    axios.get('/api/auth/me')
-      .then(response => {
-        const userData = response.data.user
-        const userRoles = response.data.roles || []
+    // Check authentication (the portal page reads its data from the same bootstrap request)
+    loadBootstrap()
+      .then(sections => {
+        const userData = sections.me.user
+        const userRoles = sections.me.roles || []
         
         setUser(userData)
         setRoles(userRoles)
@@ -121,6 +122,7 @@ export default function UnifiedLayout({ webappConfig }) {
   }
 
   const handleLogout = () => {
+    resetBootstrap()
     axios.post('/api/auth/logout')
       .then(() => {
         navigate('/login')
@@ -28,6 +28,7 @@ import DeleteIcon from '@mui/icons-material/Delete'
 import SecurityIcon from '@mui/icons-material/Security'
 import UploadFileIcon from '@mui/icons-material/UploadFile'
 import axios from 'axios'
+import { createListSync } from '../utils/deltaSync'
 
 // Configure axios to send cookies with requests
 axios.defaults.withCredentials = true
@@ -56,6 +57,13 @@ export default function CertificateManagement() {
   const [selectedFile, setSelectedFile] = useState(null)
   const [uploading, setUploading] = useState(false)
 
+  // After the first load only changed certificates are fetched (newest first)
+  const [syncCertificates] = useState(() => createListSync(
+    '/api/admin/certificates',
+    'certificates',
+    (a, b) => (b.created_at || '').localeCompare(a.created_at || ''),
+  ))
+
   useEffect(() => {
     loadCertificates()
   }, [])
@@ -63,8 +71,7 @@ export default function CertificateManagement() {
   const loadCertificates = async () => {
     setLoading(true)
     try {
-      const response = await axios.get('/api/admin/certificates')
-      setCertificates(response.data.certificates || [])
+      setCertificates(await syncCertificates())
     } catch (err) {
       console.error('Failed to load certificates:', err)
       setError('Failed to load certificates')
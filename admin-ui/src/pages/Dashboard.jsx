@@ -21,8 +21,8 @@ export default function Dashboard() {
   const loadStats = async () => {
     try {
       const [usersRes, sitesRes, mappingsRes, auditRes] = await Promise.all([
-        axios.get('/api/admin/users').catch(() => ({ data: { users: [] } })),
-        axios.get('/api/admin/sites').catch(() => ({ data: { sites: [] } })),
+        axios.get('/api/admin/users?fields=id').catch(() => ({ data: { users: [] } })),
+        axios.get('/api/admin/sites?fields=id').catch(() => ({ data: { sites: [] } })),
         axios.get('/api/admin/role-mappings').catch(() => ({ data: { mappings: [] } })),
         axios.get('/api/admin/audit?limit=1').catch(() => ({ data: { total: 0 } })),
       ])
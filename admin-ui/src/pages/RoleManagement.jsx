@@ -24,6 +24,8 @@ import {
 import AddIcon from '@mui/icons-material/Add'
 import DeleteIcon from '@mui/icons-material/Delete'
 import axios from 'axios'
+import { indexMappingMatrix } from '../utils/mappingMatrix'
+import { createMatrixSync } from '../utils/deltaSync'
 
 export default function RoleManagement() {
   const [mappings, setMappings] = useState([])
@@ -34,6 +36,8 @@ export default function RoleManagement() {
   const [selectedRole, setSelectedRole] = useState('')
   const [error, setError] = useState('')
   const [success, setSuccess] = useState('')
+  // After the first load only changed mappings are fetched
+  const [syncMatrix] = useState(() => createMatrixSync())
 
   useEffect(() => {
     loadData()
@@ -41,13 +45,13 @@ export default function RoleManagement() {
 
   const loadData = async () => {
     try {
-      const [mappingsRes, rolesRes, groupsRes] = await Promise.all([
-        axios.get('/api/admin/role-mappings'),
-        axios.get('/api/admin/roles'),
+      const [matrixData, groupsRes] = await Promise.all([
+        syncMatrix(),
         axios.get('/api/admin/ldap-groups'),
       ])
-      setMappings(mappingsRes.data.mappings)
-      setRoles(rolesRes.data.roles)
+      const matrix = indexMappingMatrix(matrixData)
+      setMappings(matrix.roleMappings())
+      setRoles(matrixData.roles)
       setGroups(groupsRes.data.groups)
     } catch (err) {
       console.error('Failed to load data:', err)
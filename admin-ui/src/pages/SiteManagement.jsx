@@ -34,6 +34,9 @@ import DeleteIcon from '@mui/icons-material/Delete'
 import InfoIcon from '@mui/icons-material/Info'
 import ExpandMoreIcon from '@mui/icons-material/ExpandMore'
 import axios from 'axios'
+import { indexMappingMatrix } from '../utils/mappingMatrix'
+import { createListSync, createMatrixSync } from '../utils/deltaSync'
+import { io } from 'socket.io-client'
 
 const SITE_TOKENS = [
   { token: '${NAME}', desc: 'Site name' },
@@ -82,29 +85,46 @@ export default function SiteManagement() {
   const [success, setSuccess] = useState('')
   const [tokenInfoAnchor, setTokenInfoAnchor] = useState(null)
 
+  // After the first load only changed sites and mappings are fetched
+  const [syncSites] = useState(() => createListSync(
+    '/api/admin/sites',
+    'sites',
+    (a, b) => a.name.localeCompare(b.name) || a.id - b.id,
+  ))
+  const [syncMatrix] = useState(() => createMatrixSync())
+
   useEffect(() => {
     loadSites()
     loadGroups()
   }, [])
 
+  // Pick up changes made by other admins (or imports) as they happen
+  useEffect(() => {
+    const events = io('/events', {
+      transports: ['websocket', 'polling'],
+      withCredentials: true,
+      auth: { scope: 'admin' },
+    })
+    for (const name of ['site_updated', 'site_removed', 'sites_changed']) {
+      events.on(name, () => loadSites())
+    }
+    // The server stopped sending events; reconnecting re-checks the session
+    events.on('session_revoked', () => {
+      events.disconnect().connect()
+      loadSites()
+    })
+    return () => events.disconnect()
+  }, [])
+
   const loadSites = async () => {
     try {
-      const response = await axios.get('/api/admin/sites')
-      const sitesWithGroups = await Promise.all(
-        response.data.sites.map(async (site) => {
-          try {
-            const siteRes = await axios.get(`/api/admin/sites/${site.id}`)
-            return { 
-              ...site, 
-              groups: siteRes.data.groups || [],
-              roles: siteRes.data.roles || []
-            }
-          } catch {
-            return { ...site, groups: [] }
-          }
-        })
-      )
-      setSites(sitesWithGroups)
+      const [siteList, matrixData] = await Promise.all([syncSites(), syncMatrix()])
+      const matrix = indexMappingMatrix(matrixData)
+      setSites(siteList.map((site) => ({
+        ...site,
+        groups: matrix.groupsForSite(site.id),
+        roles: matrix.rolesForSite(site.id),
+      })))
     } catch (err) {
       console.error('Failed to load sites:', err)
       setError('Failed to load sites')
@@ -136,32 +156,41 @@ export default function SiteManagement() {
     }
   }
 
-  const handleOpenDialog = (site = null) => {
+  const handleOpenDialog = async (site = null) => {
     if (site) {
+      // The list only carries table columns; load the full site for editing
+      let details
+      try {
+        details = (await axios.get(`/api/admin/sites/${site.id}`)).data
+      } catch (err) {
+        console.error('Failed to load site:', err)
+        setError('Failed to load site')
+        return
+      }
       setEditingSite(site)
       setFormData({
-        name: site.name || '',
-        url: site.url || '',
-        description: site.description || '',
-        visible: site.visible !== false,
-        health_url: site.health_url || '',
-        owner: site.owner || '',
-        ssh_path: site.ssh_path || '',
-        access_methods: site.access_methods || [],
-        proxy_url: site.proxy_url || '',
-        sign_on_method: site.sign_on_method || '',
-        console_enabled: site.console_enabled || false,
-        console_type: site.console_type || '',
-        console_url: site.console_url || '',
-        inline_web_url: site.inline_web_url || '',
-        inline_ssh_url: site.inline_ssh_url || '',
-        inline_vnc_url: site.inline_vnc_url || '',
-        inline_proxy_mode: site.inline_proxy_mode || 'none',
-        inline_proxy_auth: site.inline_proxy_auth || 'none',
-        inline_proxy_instructions: site.inline_proxy_instructions || '',
-        requires_user_credential: site.requires_user_credential || false,
-        required_credential_type: site.required_credential_type || '',
-        inline_console_height: site.inline_console_height || 480,
+        name: details.name || '',
+        url: details.url || '',
+        description: details.description || '',
+        visible: details.visible !== false,
+        health_url: details.health_url || '',
+        owner: details.owner || '',
+        ssh_path: details.ssh_path || '',
+        access_methods: details.access_methods || [],
+        proxy_url: details.proxy_url || '',
+        sign_on_method: details.sign_on_method || '',
+        console_enabled: details.console_enabled || false,
+        console_type: details.console_type || '',
+        console_url: details.console_url || '',
+        inline_web_url: details.inline_web_url || '',
+        inline_ssh_url: details.inline_ssh_url || '',
+        inline_vnc_url: details.inline_vnc_url || '',
+        inline_proxy_mode: details.inline_proxy_mode || 'none',
+        inline_proxy_auth: details.inline_proxy_auth || 'none',
+        inline_proxy_instructions: details.inline_proxy_instructions || '',
+        requires_user_credential: details.requires_user_credential || false,
+        required_credential_type: details.required_credential_type || '',
+        inline_console_height: details.inline_console_height || 480,
       })
     } else {
       setEditingSite(null)
@@ -24,6 +24,7 @@ import RefreshIcon from '@mui/icons-material/Refresh'
 import EditIcon from '@mui/icons-material/Edit'
 import LockIcon from '@mui/icons-material/Lock'
 import axios from 'axios'
+import { createListSync } from '../utils/deltaSync'
 import { extractCNFromDN } from '../utils/ldap'
 
 export default function UserManagement() {
@@ -39,6 +40,9 @@ export default function UserManagement() {
   const [passwordError, setPasswordError] = useState('')
   const [changingPassword, setChangingPassword] = useState(false)
 
+  // After the first load only changed users are fetched
+  const [syncUsers] = useState(() => createListSync('/api/admin/users', 'users'))
+
   useEffect(() => {
     loadUsers()
   }, [])
@@ -46,8 +50,7 @@ export default function UserManagement() {
   const loadUsers = async () => {
     setLoading(true)
     try {
-      const response = await axios.get('/api/admin/users')
-      setUsers(response.data.users)
+      setUsers(await syncUsers())
     } catch (err) {
       console.error('Failed to load users:', err)
       setError('Failed to load users')
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react'
 import {
+  Avatar,
   Box,
   Container,
   Typography,
@@ -29,6 +30,8 @@ import DownloadIcon from '@mui/icons-material/Download'
 import axios from 'axios'
 import { Link } from 'react-router-dom'
 import Console from '../components/Console'
+import { io } from 'socket.io-client'
+import { loadBootstrap } from '../utils/bootstrap'
 
 // Configure axios to send cookies with requests
 axios.defaults.withCredentials = true
@@ -87,14 +90,43 @@ export default function UserPortal() {
     loadData()
   }, [])
 
+  // Live site changes (see portal/app/utils/events.py)
+  useEffect(() => {
+    const events = io('/events', {
+      transports: ['websocket', 'polling'],
+      withCredentials: true,
+    })
+    const upsertSite = ({ site }) => {
+      setSites((prev) => {
+        const index = prev.findIndex((s) => s.id === site.id)
+        if (index === -1) {
+          return [...prev, site].sort((a, b) => a.name.localeCompare(b.name))
+        }
+        const next = [...prev]
+        next[index] = { ...prev[index], ...site }
+        return next
+      })
+    }
+    events.on('site_added', upsertSite)
+    events.on('site_updated', upsertSite)
+    events.on('site_removed', ({ id }) => {
+      setSites((prev) => prev.filter((s) => s.id !== id))
+    })
+    events.on('sites_changed', () => loadData())
+    // The server stopped sending events; reconnecting re-checks the session
+    events.on('session_revoked', () => {
+      events.disconnect().connect()
+      loadData()
+    })
+    return () => events.disconnect()
+  }, [])
+
   const loadData = async () => {
     try {
-      const [sitesRes, certificatesRes] = await Promise.all([
-        axios.get('/api/sites'),
-        axios.get('/api/certificates').catch(() => ({ data: { certificates: [] } })) // Certificates are optional
-      ])
-      setSites(sitesRes.data.sites || [])
-      setCertificates(certificatesRes.data.certificates || [])
+      // Shared with the layout's auth check, so page load is a single request
+      const sections = await loadBootstrap()
+      setSites(sections.sites?.sites || [])
+      setCertificates(sections.certificates?.certificates || [])
     } catch (err) {
       console.error('Failed to load portal data:', err)
       const errorMessage = err.response?.data?.error || err.message || 'Failed to load data'
@@ -369,9 +401,19 @@ export default function UserPortal() {
                       <Card sx={{ height: '100%', display: 'flex', flexDirection: 'column' }}>
                         <CardContent sx={{ flexGrow: 1 }}>
                           <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between', mb: 1 }}>
-                            <Typography variant="h6" component="h3">
-                              {site.name}
-                            </Typography>
+                            <Box sx={{ display: 'flex', alignItems: 'center', gap: 1.5 }}>
+                              <Avatar
+                                src={`/api/sites/${site.id}/icon`}
+                                alt=""
+                                variant="rounded"
+                                sx={{ width: 32, height: 32, bgcolor: 'action.selected', color: 'text.secondary' }}
+                              >
+                                {site.name.charAt(0).toUpperCase()}
+                              </Avatar>
+                              <Typography variant="h6" component="h3">
+                                {site.name}
+                              </Typography>
+                            </Box>
                             {hasProxy && (
                               <Chip
                                 icon={<VpnLockIcon />}
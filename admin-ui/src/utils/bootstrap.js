@@ -0,0 +1,49 @@
+/**
+ * Shared client for /api/bootstrap (portal initial load in one request).
+ */
+import axios from 'axios'
+
+const state = { etags: {}, sections: {}, inFlight: {} }
+
+/**
+ * Loads bootstrap sections, sending the ETags of sections already held so
+ * only changed ones come back. Concurrent calls for the same sections share
+ * one request.
+ *
+ * @param {Array<string>} sections - Sections to load (default: all)
+ * @returns {Promise<object>} - Current data by section (me, config, sites, certificates, credentials)
+ */
+export function loadBootstrap(sections = null) {
+  const key = sections ? sections.join(',') : '*'
+  if (state.inFlight[key]) {
+    return state.inFlight[key]
+  }
+  const names = sections || Object.keys(state.etags)
+  const params = {}
+  if (sections) {
+    params.sections = sections.join(',')
+  }
+  const known = names.filter((name) => state.etags[name]).map((name) => `${name}:${state.etags[name]}`)
+  if (known.length) {
+    params.etags = known.join(',')
+  }
+
+  state.inFlight[key] = axios.get('/api/bootstrap', { params })
+    .then((response) => {
+      Object.assign(state.etags, response.data.etags)
+      Object.assign(state.sections, response.data.sections)
+      return { ...state.sections }
+    })
+    .finally(() => {
+      delete state.inFlight[key]
+    })
+  return state.inFlight[key]
+}
+
+/**
+ * Forgets held sections so the next load fetches them in full (e.g. after logout).
+ */
+export function resetBootstrap() {
+  state.etags = {}
+  state.sections = {}
+}
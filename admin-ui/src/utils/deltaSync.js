@@ -0,0 +1,104 @@
+/**
+ * Delta sync for admin list endpoints (?since=<sync_token>).
+ */
+import axios from 'axios'
+
+/**
+ * Fetches a list endpoint, or only its changes since the previous call.
+ * Starts over with a full load when the server reports the token as expired (410).
+ *
+ * @param {string} url - Endpoint, e.g. '/api/admin/users'
+ * @param {object} state - Sync state ({ token }), updated in place
+ * @param {object} params - Extra query parameters
+ * @returns {Promise<object>} - { data, full } where full is true for a complete list
+ */
+async function fetchSince(url, state, params = {}) {
+  const since = state.token
+  try {
+    const response = await axios.get(url, { params: since ? { ...params, since } : params })
+    state.token = response.data.sync_token
+    return { data: response.data, full: !since }
+  } catch (err) {
+    if (since && err.response?.status === 410) {
+      state.token = null
+      return fetchSince(url, state, params)
+    }
+    throw err
+  }
+}
+
+/**
+ * Upserts changed rows into a Map by id and drops deleted ids.
+ *
+ * @param {Map} rows - Current rows by id (replaced when full is true)
+ * @param {Array} changed - Rows from the response
+ * @param {Array} deleted - Deleted ids from the response
+ * @param {boolean} full - Whether the response was a complete list
+ * @returns {Map} - Updated rows
+ */
+export function mergeRows(rows, changed, deleted, full) {
+  const merged = full ? new Map() : rows
+  for (const row of changed || []) {
+    merged.set(row.id, row)
+  }
+  for (const id of deleted || []) {
+    merged.delete(id)
+  }
+  return merged
+}
+
+/**
+ * Creates a function that keeps a local copy of an admin list current: the
+ * first call loads the full list, later calls fetch only rows created,
+ * updated or deleted since the previous call.
+ *
+ * @param {string} url - List endpoint, e.g. '/api/admin/users'
+ * @param {string} key - Response key holding the rows, e.g. 'users'
+ * @param {function} compare - Optional sort comparator for the returned rows
+ * @returns {function(): Promise<Array>} - Resolves to the current rows
+ */
+export function createListSync(url, key, compare = null) {
+  const state = { token: null }
+  let rows = new Map()
+
+  return async () => {
+    const { data, full } = await fetchSince(url, state)
+    rows = mergeRows(rows, data[key], data.deleted, full)
+    const list = [...rows.values()]
+    return compare ? list.sort(compare) : list
+  }
+}
+
+/**
+ * Creates a function that keeps a local copy of the mapping matrix current
+ * (see createListSync); resolves to a matrix shaped like the full response.
+ *
+ * @returns {function(): Promise<object>} - Resolves to the current matrix
+ */
+export function createMatrixSync() {
+  const state = { token: null }
+  let groups = new Map()
+  let sites = new Map()
+  let roles = []
+  let siteGroups = new Map()
+  let roleMappings = new Map()
+
+  const edgeRows = (edges) => (edges || []).map((edge) => ({ id: edge[0], edge }))
+
+  return async () => {
+    const { data, full } = await fetchSince('/api/admin/mapping-matrix', state)
+    const deleted = data.deleted || {}
+    groups = mergeRows(groups, data.groups, [], full)
+    sites = mergeRows(sites, data.sites, deleted.sites, full)
+    siteGroups = mergeRows(siteGroups, edgeRows(data.site_groups), deleted.site_groups, full)
+    roleMappings = mergeRows(roleMappings, edgeRows(data.role_mappings), deleted.role_mappings, full)
+    roles = data.roles || roles
+    return {
+      groups: [...groups.values()],
+      sites: [...sites.values()],
+      roles,
+      site_groups: [...siteGroups.values()].map((row) => row.edge),
+      role_mappings: [...roleMappings.values()].map((row) => row.edge),
+    }
+  }
+}
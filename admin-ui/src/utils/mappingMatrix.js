@@ -0,0 +1,54 @@
+/**
+ * Helpers for the /api/admin/mapping-matrix response.
+ */
+
+/**
+ * Indexes the mapping matrix (groups, sites, roles and edge lists) for lookups.
+ *
+ * @param {object} matrix - Response body of GET /api/admin/mapping-matrix
+ * @returns {object} - Lookup helpers shaped like the per-site and role-mapping endpoints
+ */
+export function indexMappingMatrix(matrix) {
+  const groupsById = new Map((matrix.groups || []).map((g) => [g.id, g]))
+  const rolesById = new Map((matrix.roles || []).map((r) => [r.id, r]))
+
+  const groupIdsBySite = new Map()
+  for (const [, siteId, groupId] of matrix.site_groups || []) {
+    if (!groupIdsBySite.has(siteId)) {
+      groupIdsBySite.set(siteId, [])
+    }
+    groupIdsBySite.get(siteId).push(groupId)
+  }
+
+  const roleIdsByGroup = new Map()
+  for (const [, roleId, groupId] of matrix.role_mappings || []) {
+    if (!roleIdsByGroup.has(groupId)) {
+      roleIdsByGroup.set(groupId, new Set())
+    }
+    roleIdsByGroup.get(groupId).add(roleId)
+  }
+
+  return {
+    groupsForSite(siteId) {
+      return (groupIdsBySite.get(siteId) || []).map((id) => groupsById.get(id)).filter(Boolean)
+    },
+
+    rolesForSite(siteId) {
+      const roleIds = new Set()
+      for (const groupId of groupIdsBySite.get(siteId) || []) {
+        for (const roleId of roleIdsByGroup.get(groupId) || []) {
+          roleIds.add(roleId)
+        }
+      }
+      return [...roleIds].map((id) => rolesById.get(id)).filter(Boolean)
+    },
+
+    roleMappings() {
+      return (matrix.role_mappings || []).map(([id, roleId, groupId]) => ({
+        id,
+        ldap_group: groupsById.get(groupId),
+        role: rolesById.get(roleId),
+      }))
+    },
+  }
+}
@@ -137,6 +137,9 @@ def create_app(config_class=Config):
     from .admin.ldap_groups import search_ldap_groups
     from .admin.certificates import create_certificate, update_certificate, delete_certificate, upload_certificate
     from .api.profile import change_password
+    from .api.sites import issue_site_token
+    from .admin.site_transfer import import_sites_endpoint
+    from .admin.config_snapshot import apply_config_snapshot
     csrf.exempt(create_site)
     csrf.exempt(update_site)
     csrf.exempt(delete_site)
@@ -153,6 +156,9 @@ def create_app(config_class=Config):
     csrf.exempt(delete_certificate)
     csrf.exempt(upload_certificate)
     csrf.exempt(change_password)
+    csrf.exempt(issue_site_token)
+    csrf.exempt(import_sites_endpoint)
+    csrf.exempt(apply_config_snapshot)
     
     # Handle CSRF errors gracefully for setup endpoint (fallback)
     # Only catch CSRFError specifically, not all exceptions
@@ -218,6 +224,13 @@ def create_app(config_class=Config):
         response, content_type = get_metrics()
         return response, 200, {'Content-Type': content_type}
     
+    # JWKS for portal access tokens (standard well-known location)
+    @app.route('/.well-known/jwks.json')
+    def well_known_jwks():
+        """Public keys for verifying portal access tokens."""
+        from .auth.routes import jwks
+        return jwks()
+    
     # Register main routes
     from .routes import register_routes
     register_routes(app)
@@ -226,8 +239,14 @@ def create_app(config_class=Config):
     from .cli import register_commands
     register_commands(app)
     
-    # Initialize SocketIO for WebSocket support
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    # Background health prober (leader-elected across workers)
+    from .utils.health_prober import init_health_prober
+    init_health_prober(app)
+    
+    # Initialize SocketIO for WebSocket support; the Redis message queue lets
+    # any worker emit to connections held by another
+    message_queue = None if app.testing else (app.config.get('SOCKETIO_MESSAGE_QUEUE') or None)
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', message_queue=message_queue)
     
     # Register SocketIO event handlers
     @socketio.on('connect')
@@ -266,6 +285,10 @@ def create_app(config_class=Config):
         """Handle WebSocket disconnection."""
         pass
     
+    # Realtime portal events (site, access and health changes)
+    from .api.events import register_event_handlers
+    register_event_handlers(socketio)
+    
     # Bootstrap on first run - ensure tables exist and create default data
     with app.app_context():
         bootstrap_app(db, migrate)
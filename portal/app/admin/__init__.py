@@ -3,5 +3,5 @@ from flask import Blueprint
 
 admin_bp = Blueprint('admin', __name__)
 
-from . import ldap_test, ldap_config, role_mappings, sites, users, audit, webapp_config, sso_config, ldap_groups, certificates
+from . import ldap_test, ldap_config, role_mappings, sites, users, audit, webapp_config, sso_config, ldap_groups, certificates, access_review, mapping_matrix, site_transfer, config_snapshot, search
 
@@ -0,0 +1,172 @@
+"""Access-review report: which users can reach which sites, and through what."""
+import csv
+import io
+import json
+from flask import request, jsonify, session, Response, stream_with_context
+from . import admin_bp
+from ..db import db
+from ..models import (
+    User, Site, LDAPGroup, Role, RoleMapping, GroupSiteMap, AuditLog, user_group_membership
+)
+from ..utils.rbac import require_admin
+
+REPORT_COLUMNS = [
+    'user_id', 'uid', 'display_name', 'disabled',
+    'site_id', 'site_name', 'site_url',
+    'via', 'group_id', 'group_dn', 'group_roles'
+]
+
+# Rows fetched per round trip (server-side cursor on PostgreSQL)
+_BATCH_SIZE = 1000
+
+
+def _group_roles(group_id=None):
+    """group_id -> 'role1;role2' for groups with role mappings (one query)."""
+    query = (
+        db.session.query(RoleMapping.ldap_group_id, Role.name)
+        .join(Role, Role.id == RoleMapping.role_id)
+        .order_by(RoleMapping.ldap_group_id, Role.name)
+    )
+    if group_id:
+        query = query.filter(RoleMapping.ldap_group_id == group_id)
+    roles = {}
+    for gid, name in query:
+        roles.setdefault(gid, []).append(name)
+    return {gid: ';'.join(names) for gid, names in roles.items()}
+
+
+def _user_site_columns():
+    return (
+        User.id.label('user_id'), User.uid, User.display_name, User.disabled,
+        Site.id.label('site_id'), Site.name.label('site_name'), Site.url.label('site_url'),
+    )
+
+
+def _group_grants(site_id=None, group_id=None, user_id=None):
+    """Access granted through group -> site mappings (one streamed query)."""
+    stmt = (
+        db.select(
+            *_user_site_columns(),
+            LDAPGroup.id.label('group_id'), LDAPGroup.dn.label('group_dn')
+        )
+        .select_from(user_group_membership)
+        .join(GroupSiteMap, GroupSiteMap.ldap_group_id == user_group_membership.c.ldap_group_id)
+        .join(User, User.id == user_group_membership.c.user_id)
+        .join(Site, Site.id == GroupSiteMap.site_id)
+        .join(LDAPGroup, LDAPGroup.id == GroupSiteMap.ldap_group_id)
+        .order_by(User.id, Site.id, LDAPGroup.id)
+    )
+    if site_id:
+        stmt = stmt.where(GroupSiteMap.site_id == site_id)
+    if group_id:
+        stmt = stmt.where(GroupSiteMap.ldap_group_id == group_id)
+    if user_id:
+        stmt = stmt.where(user_group_membership.c.user_id == user_id)
+    return db.session.execute(stmt.execution_options(yield_per=_BATCH_SIZE))
+
+
+def _local_admin_grants(site_id=None, user_id=None):
+    """Local admins can reach every site (one streamed query)."""
+    stmt = (
+        db.select(*_user_site_columns())
+        .select_from(User)
+        .join(Site, db.true())
+        .where(User.is_local_admin == True)
+        .order_by(User.id, Site.id)
+    )
+    if site_id:
+        stmt = stmt.where(Site.id == site_id)
+    if user_id:
+        stmt = stmt.where(User.id == user_id)
+    return db.session.execute(stmt.execution_options(yield_per=_BATCH_SIZE))
+
+
+def iter_access_review(site_id=None, group_id=None, user_id=None):
+    """
+    Yield access-review rows as dicts, in a fixed number of queries.
+
+    Args:
+        site_id: Only rows for this site
+        group_id: Only access granted through this LDAP group
+        user_id: Only rows for this user
+
+    Yields:
+        dict: One row per (user, site, path), keyed by REPORT_COLUMNS
+    """
+    roles_by_group = _group_roles(group_id)
+
+    for row in _group_grants(site_id, group_id, user_id):
+        record = dict(row._mapping)
+        record['disabled'] = bool(record['disabled'])
+        record['via'] = 'group'
+        record['group_roles'] = roles_by_group.get(row.group_id, '')
+        yield record
+
+    if group_id:
+        return
+
+    for row in _local_admin_grants(site_id, user_id):
+        record = dict(row._mapping)
+        record['disabled'] = bool(record['disabled'])
+        record.update(via='local_admin', group_id=None, group_dn=None, group_roles='admin')
+        yield record
+
+
+def _csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % _BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, separators=(',', ':')))
+        if len(lines) >= _BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+@admin_bp.route('/access-review', methods=['GET'])
+@require_admin
+def export_access_review():
+    """Stream the user x site x path access report as CSV or NDJSON."""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    site_id = request.args.get('site_id', type=int)
+    group_id = request.args.get('group_id', type=int)
+    user_id = request.args.get('user_id', type=int)
+
+    try:
+        db.session.add(AuditLog(
+            user_id=session.get('user_id'),
+            ip=request.remote_addr,
+            action='access_review_exported',
+            details={'format': fmt, 'site_id': site_id, 'group_id': group_id, 'user_id': user_id}
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()  # Don't fail the export if audit logging fails
+
+    rows = iter_access_review(site_id=site_id, group_id=group_id, user_id=user_id)
+    if fmt == 'csv':
+        body, mimetype, extension = _csv_chunks(rows), 'text/csv', 'csv'
+    else:
+        body, mimetype, extension = _ndjson_chunks(rows), 'application/x-ndjson', 'ndjson'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=access-review.{extension}'}
+    )
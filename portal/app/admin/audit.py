@@ -5,12 +5,27 @@ from . import admin_bp
 from ..db import db
 from ..models import AuditLog
 from ..utils.rbac import require_admin
+from ..utils.fieldsets import Fieldset, FieldsetError, column, isoformat
+
+AUDIT_FIELDSET = Fieldset(AuditLog, {
+    'id': column('id'),
+    'ts': column('ts', isoformat),
+    'user_id': column('user_id'),
+    'ip': column('ip'),
+    'action': column('action'),
+    'details': column('details'),
+}, default=['id', 'ts', 'user_id', 'ip', 'action', 'details'])
 
 
 @admin_bp.route('/audit', methods=['GET'])
 @require_admin
 def get_audit_logs():
-    """Query audit logs."""
+    """Query audit logs (supports sparse fieldsets, e.g. fields=ts,action)."""
+    try:
+        fields = AUDIT_FIELDSET.parse(request.args.get('fields'))
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    
     # Parse query parameters
     user_id = request.args.get('user_id', type=int)
     action = request.args.get('action')
@@ -47,17 +62,10 @@ def get_audit_logs():
     
     # Apply pagination
     total = query.count()
-    logs = query.limit(limit).offset(offset).all()
+    logs = query.options(AUDIT_FIELDSET.load_only(fields)).limit(limit).offset(offset).all()
     
     return jsonify({
-        'logs': [{
-            'id': log.id,
-            'ts': log.ts.isoformat() if log.ts else None,
-            'user_id': log.user_id,
-            'ip': log.ip,
-            'action': log.action,
-            'details': log.details
-        } for log in logs],
+        'logs': [AUDIT_FIELDSET.serialize(log, fields) for log in logs],
         'total': total,
         'limit': limit,
         'offset': offset
@@ -7,14 +7,32 @@ from . import admin_bp
 from ..db import db
 from ..models import Certificate, AuditLog, User
 from ..utils.rbac import require_admin
+from ..utils.delta_sync import SyncTokenError, SyncTokenExpired, sync_window, deleted_since
 
 
 @admin_bp.route('/certificates', methods=['GET'])
 @require_admin
 def list_certificates():
-    """List all certificates."""
-    certificates = Certificate.query.order_by(Certificate.created_at.desc()).all()
-    return jsonify({
+    """
+    List all certificates.
+    
+    With since=<sync_token> (from a previous response) only certificates
+    changed since then are returned, plus the ids of deleted certificates
+    under "deleted".
+    """
+    try:
+        sync_token, since = sync_window(request.args)
+    except SyncTokenExpired as e:
+        return jsonify({'error': str(e)}), 410
+    except SyncTokenError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = Certificate.query
+    if since is not None:
+        query = query.filter(Certificate.updated_at >= since)
+    certificates = query.order_by(Certificate.created_at.desc()).all()
+    payload = {
+        'sync_token': sync_token,
         'certificates': [{
             'id': c.id,
             'name': c.name,
@@ -24,7 +42,10 @@ def list_certificates():
             'created_at': c.created_at.isoformat() if c.created_at else None,
             'updated_at': c.updated_at.isoformat() if c.updated_at else None
         } for c in certificates]
-    }), 200
+    }
+    if since is not None:
+        payload['deleted'] = deleted_since('certificates', since)
+    return jsonify(payload), 200
 
 
 @admin_bp.route('/certificates/upload', methods=['POST'])
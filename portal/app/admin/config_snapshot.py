@@ -0,0 +1,51 @@
+"""Configuration snapshot export/apply endpoints."""
+from flask import request, jsonify, session
+from . import admin_bp
+from ..db import db
+from ..models import AuditLog
+from ..utils.rbac import require_admin
+from ..utils.config_snapshot import export_snapshot, apply_snapshot, SnapshotError
+
+
+@admin_bp.route('/config/snapshot', methods=['GET'])
+@require_admin
+def get_config_snapshot():
+    """Export the full portal configuration as one consistent snapshot."""
+    try:
+        return jsonify(export_snapshot()), 200
+    except SnapshotError as e:
+        return jsonify({'error': str(e)}), 409
+
+
+@admin_bp.route('/config/snapshot', methods=['POST'])
+@require_admin
+def apply_config_snapshot():
+    """
+    Apply a configuration snapshot in one transaction.
+    
+    Only the differences from the live configuration are written. With
+    ?dry_run=1 nothing is written and the planned changes are returned.
+    """
+    snapshot = request.get_json(silent=True)
+    if not snapshot:
+        return jsonify({'error': 'Invalid request'}), 400
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    
+    try:
+        result = apply_snapshot(snapshot, dry_run=dry_run)
+    except SnapshotError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not dry_run and result['changes']:
+        try:
+            db.session.add(AuditLog(
+                user_id=session.get('user_id'),
+                ip=request.remote_addr,
+                action='config_snapshot_applied',
+                details={'summary': result['summary']}
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    
+    return jsonify(result), 200
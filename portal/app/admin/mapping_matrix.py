@@ -0,0 +1,89 @@
+"""Group x site x role mapping matrix for the admin UI."""
+import hashlib
+from flask import request, jsonify, current_app
+from . import admin_bp
+from ..db import db
+from ..models import LDAPGroup, Site, Role, RoleMapping, GroupSiteMap
+from ..utils.rbac import require_admin
+from ..utils.delta_sync import SyncTokenError, SyncTokenExpired, sync_window, deleted_since
+
+
+def build_mapping_matrix(since=None):
+    """
+    Build the whole mapping graph in three flat queries.
+
+    Args:
+        since: Only include sites and edges updated at or after this time
+            (plus "deleted" ids per section); groups are those of the
+            included edges and roles are always complete
+
+    Returns:
+        dict: groups/sites/roles as lists of objects plus edge lists
+            site_groups: [mapping_id, site_id, group_id]
+            role_mappings: [mapping_id, role_id, group_id]
+    """
+    roles = db.session.query(Role.id, Role.name, Role.description).order_by(Role.name).all()
+    site_query = db.session.query(Site.id, Site.name, Site.url, Site.visible)
+    site_edges = db.select(
+        db.literal('site').label('kind'), GroupSiteMap.id.label('mapping_id'),
+        GroupSiteMap.site_id.label('target_id'), LDAPGroup.id.label('group_id'), LDAPGroup.dn, LDAPGroup.cn
+    ).join(LDAPGroup, LDAPGroup.id == GroupSiteMap.ldap_group_id)
+    role_edges = db.select(
+        db.literal('role').label('kind'), RoleMapping.id.label('mapping_id'),
+        RoleMapping.role_id.label('target_id'), LDAPGroup.id.label('group_id'), LDAPGroup.dn, LDAPGroup.cn
+    ).join(LDAPGroup, LDAPGroup.id == RoleMapping.ldap_group_id)
+    if since is not None:
+        site_query = site_query.filter(Site.updated_at >= since)
+        site_edges = site_edges.where(GroupSiteMap.updated_at >= since)
+        role_edges = role_edges.where(RoleMapping.updated_at >= since)
+    sites = site_query.order_by(Site.name, Site.id).all()
+
+    # Both edge tables in one round trip, with the mapped groups' columns
+    edges = db.union_all(site_edges, role_edges).subquery()
+    edge_rows = db.session.execute(db.select(edges).order_by(edges.c.kind, edges.c.mapping_id)).all()
+
+    groups = {}
+    site_groups = []
+    role_mappings = []
+    for row in edge_rows:
+        groups.setdefault(row.group_id, {'id': row.group_id, 'dn': row.dn, 'cn': row.cn})
+        if row.kind == 'site':
+            site_groups.append([row.mapping_id, row.target_id, row.group_id])
+        else:
+            role_mappings.append([row.mapping_id, row.target_id, row.group_id])
+
+    matrix = {
+        'groups': sorted(groups.values(), key=lambda g: (g['cn'] or g['dn']).lower()),
+        'sites': [{'id': s.id, 'name': s.name, 'url': s.url, 'visible': s.visible} for s in sites],
+        'roles': [{'id': r.id, 'name': r.name, 'description': r.description} for r in roles],
+        'site_groups': site_groups,
+        'role_mappings': role_mappings,
+    }
+    if since is not None:
+        matrix['deleted'] = {entity: deleted_since(entity, since) for entity in ('sites', 'site_groups', 'role_mappings')}
+    return matrix
+
+
+@admin_bp.route('/mapping-matrix', methods=['GET'])
+@require_admin
+def get_mapping_matrix():
+    """
+    Get all groups, sites, roles and their mappings in one response (ETag-aware).
+    
+    With since=<sync_token> only changes since a previous response are returned.
+    """
+    try:
+        sync_token, since = sync_window(request.args)
+    except SyncTokenExpired as e:
+        return jsonify({'error': str(e)}), 410
+    except SyncTokenError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    matrix = build_mapping_matrix(since)
+    # The ETag covers the content only, so it stays stable while nothing
+    # changes (a client revalidating keeps its older, still valid token)
+    etag = hashlib.sha256(current_app.json.dumps(matrix).encode('utf-8')).hexdigest()[:32]
+    response = jsonify({**matrix, 'sync_token': sync_token})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
@@ -2,18 +2,37 @@
 from flask import request, jsonify
 from . import admin_bp
 from ..db import db
-from ..models import Role, LDAPGroup, RoleMapping
-from ..utils.rbac import require_admin
-from ..ldap.group_sync import sync_group_to_db
+from ..models import Role, LDAPGroup, RoleMapping, User, user_group_membership
+from ..utils.rbac import require_admin, get_roles_for_users
+from ..utils.access import refresh_group_access, touch_group_members
+from ..utils.delta_sync import SyncTokenError, SyncTokenExpired, sync_window, deleted_since
+from ..utils.policy import bump_policy_version
+from ..ldap.group_sync import sync_group_to_db, find_group_by_dn
 
 
 @admin_bp.route('/role-mappings', methods=['GET'])
 @require_admin
 def list_role_mappings():
-    """List all role mappings."""
-    mappings = RoleMapping.query.all()
+    """
+    List all role mappings.
     
-    return jsonify({
+    With since=<sync_token> (from a previous response) only mappings created
+    since then are returned, plus the ids of deleted mappings under "deleted".
+    """
+    try:
+        sync_token, since = sync_window(request.args)
+    except SyncTokenExpired as e:
+        return jsonify({'error': str(e)}), 410
+    except SyncTokenError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = RoleMapping.query
+    if since is not None:
+        query = query.filter(RoleMapping.updated_at >= since).order_by(RoleMapping.id)
+    mappings = query.all()
+    
+    payload = {
+        'sync_token': sync_token,
         'mappings': [{
             'id': m.id,
             'ldap_group': {
@@ -27,7 +46,10 @@ def list_role_mappings():
                 'description': m.role.description
             }
         } for m in mappings]
-    }), 200
+    }
+    if since is not None:
+        payload['deleted'] = deleted_since('role_mappings', since)
+    return jsonify(payload), 200
 
 
 @admin_bp.route('/role-mappings', methods=['POST'])
@@ -45,7 +67,7 @@ def create_role_mapping():
         return jsonify({'error': 'ldap_group_dn and role_name required'}), 400
     
     # Get or create LDAP group
-    group = LDAPGroup.query.filter_by(dn=group_dn).first()
+    group = find_group_by_dn(group_dn)
     if not group:
         group = sync_group_to_db(group_dn)
     
@@ -66,7 +88,10 @@ def create_role_mapping():
     # Create mapping
     mapping = RoleMapping(ldap_group_id=group.id, role_id=role.id)
     db.session.add(mapping)
+    refresh_group_access(group.id)
+    touch_group_members(group.id)
     db.session.commit()
+    bump_policy_version(revoke_sessions=True)
     
     return jsonify({
         'id': mapping.id,
@@ -87,8 +112,12 @@ def create_role_mapping():
 def delete_role_mapping(mapping_id):
     """Delete a role mapping."""
     mapping = RoleMapping.query.get_or_404(mapping_id)
+    group_id = mapping.ldap_group_id
     db.session.delete(mapping)
+    refresh_group_access(group_id)
+    touch_group_members(group_id)
     db.session.commit()
+    bump_policy_version(revoke_sessions=True)
     
     return jsonify({'ok': True}), 200
 
@@ -122,3 +151,32 @@ def list_ldap_groups():
         } for g in groups]
     }), 200
 
+
+
+@admin_bp.route('/ldap-groups/<int:group_id>/members', methods=['GET'])
+@require_admin
+def list_ldap_group_members(group_id):
+    """List portal users who are members of an LDAP group."""
+    group = LDAPGroup.query.get_or_404(group_id)
+    users = (
+        User.query
+        .join(user_group_membership, user_group_membership.c.user_id == User.id)
+        .filter(user_group_membership.c.ldap_group_id == group_id)
+        .order_by(User.uid)
+        .all()
+    )
+    roles_by_user = get_roles_for_users([u.id for u in users])
+    return jsonify({
+        'group': {
+            'id': group.id,
+            'dn': group.dn,
+            'cn': group.cn
+        },
+        'users': [{
+            'id': u.id,
+            'uid': u.uid,
+            'display_name': u.display_name,
+            'disabled': u.disabled,
+            'roles': roles_by_user.get(u.id, [])
+        } for u in users]
+    }), 200
@@ -0,0 +1,29 @@
+"""Global admin search endpoint."""
+from flask import request, jsonify
+from . import admin_bp
+from ..utils.rbac import require_admin
+from ..utils.search import search, SEARCH_TYPES
+
+
+@admin_bp.route('/search', methods=['GET'])
+@require_admin
+def global_search():
+    """
+    Ranked search over sites, users, LDAP groups and certificates.
+    
+    Query params: q (search text), types (comma-separated subset of
+    sites,users,groups,certificates) and limit (default 20, max 100).
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q required'}), 400
+    
+    types = None
+    if request.args.get('types'):
+        types = [t.strip() for t in request.args['types'].split(',') if t.strip()]
+        unknown = [t for t in types if t not in SEARCH_TYPES]
+        if unknown:
+            return jsonify({'error': f"Unknown types: {', '.join(unknown)}"}), 400
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    return jsonify({'query': query, 'results': search(query, types=types, limit=limit)}), 200
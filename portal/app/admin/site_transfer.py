@@ -0,0 +1,66 @@
+"""Bulk site import and export endpoints."""
+from flask import request, jsonify, session, Response, stream_with_context
+from . import admin_bp
+from ..db import db
+from ..models import AuditLog
+from ..utils.rbac import require_admin
+from ..utils.site_transfer import iter_import_records, import_sites, iter_export_rows, export_chunks
+
+_FORMATS = ('csv', 'ndjson')
+
+
+def _import_format():
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt.lower()
+    content_type = (request.mimetype or '').lower()
+    return 'csv' if content_type in ('text/csv', 'application/csv') else 'ndjson'
+
+
+@admin_bp.route('/sites/import', methods=['POST'])
+@require_admin
+def import_sites_endpoint():
+    """
+    Bulk-create sites from a CSV or NDJSON request body.
+    
+    The body is read as a stream and imported in batched transactions.
+    Query params: format (csv or ndjson; defaults from Content-Type) and
+    dry_run (validate only).
+    """
+    fmt = _import_format()
+    if fmt not in _FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    
+    stream = request.files['file'].stream if 'file' in request.files else request.stream
+    report = import_sites(iter_import_records(stream, fmt), dry_run=dry_run)
+    
+    if not dry_run:
+        try:
+            db.session.add(AuditLog(
+                user_id=session.get('user_id'),
+                ip=request.remote_addr,
+                action='sites_imported',
+                details={'format': fmt, 'created': report['created'], 'failed': report['failed']}
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    
+    return jsonify(report), 200
+
+
+@admin_bp.route('/sites/export', methods=['GET'])
+@require_admin
+def export_sites():
+    """Stream every site as CSV or NDJSON (same columns the import accepts)."""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in _FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(export_chunks(iter_export_rows(), fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=sites.{fmt}'}
+    )
@@ -1,44 +1,107 @@
 """Site management endpoints."""
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from . import admin_bp
 from ..db import db
-from ..models import Site, GroupSiteMap, LDAPGroup
-from ..utils.rbac import require_admin
-from ..utils.security import validate_proxied_url
+from ..models import Site, GroupSiteMap, LDAPGroup, User, user_effective_sites
+from ..utils.rbac import require_admin, get_roles_for_users
+from ..utils.security import proxied_url_validator, get_redis_client
+from ..utils.access import refresh_group_access, remove_site_access
+from ..utils.policy import bump_policy_version, get_policy
+from ..utils.site_listing import list_sites_page
+from ..utils.pagination import PaginationError
+from ..utils.health_prober import forget_health_statuses
+from ..utils.fieldsets import Fieldset, FieldsetError, column, isoformat
+from ..utils.delta_sync import SyncTokenError, SyncTokenExpired, sync_window, deleted_since
+from ..utils.events import (
+    rooms_for_sites, publish_site_changed, publish_site_removed,
+    publish_site_access_granted, publish_site_access_revoked
+)
+from ..ldap.group_sync import find_group_by_dn
+
+
+SITE_FIELDSET = Fieldset(Site, {
+    'id': column('id'),
+    'name': column('name'),
+    'url': column('url'),
+    'description': column('description'),
+    'visible': column('visible'),
+    'health_url': column('health_url'),
+    'health_interval': column('health_interval'),
+    'health_timeout': column('health_timeout'),
+    'owner': column('owner'),
+    'ssh_path': column('ssh_path'),
+    'access_methods': column('access_methods', lambda v: v or []),
+    'proxy_url': column('proxy_url'),
+    'sign_on_method': column('sign_on_method'),
+    'console_enabled': column('console_enabled', lambda v: v or False),
+    'console_type': column('console_type'),
+    'console_url': column('console_url'),
+    'inline_web_url': column('inline_web_url'),
+    'inline_ssh_url': column('inline_ssh_url'),
+    'inline_vnc_url': column('inline_vnc_url'),
+    'inline_proxy_mode': column('inline_proxy_mode'),
+    'inline_proxy_auth': column('inline_proxy_auth'),
+    'inline_proxy_instructions': column('inline_proxy_instructions'),
+    'requires_user_credential': column('requires_user_credential', lambda v: v or False),
+    'required_credential_type': column('required_credential_type'),
+    'inline_console_height': column('inline_console_height'),
+    'created_at': column('created_at', isoformat),
+    'updated_at': column('updated_at', isoformat),
+}, default=[
+    # Columns of the admin UI sites table (the edit dialog loads the full site)
+    'id', 'name', 'url', 'owner', 'visible', 'access_methods', 'proxy_url',
+    'sign_on_method', 'console_enabled', 'console_type', 'created_at',
+])
 
 
 @admin_bp.route('/sites', methods=['GET'])
 @require_admin
 def list_sites():
-    """List all sites."""
-    sites = Site.query.all()
+    """
+    List sites.
+    
+    Supports filters (name, owner, access_method, visible), sort (name,
+    created_at, id; prefix "-" for descending), keyset pagination (limit,
+    cursor) and sparse fieldsets (fields=name,url,...; "all" for every
+    field). Only the columns behind the requested fields are fetched.
+    
+    With since=<sync_token> (from a previous response) only sites changed
+    since then are returned, plus the ids of deleted sites under "deleted";
+    filters and pagination do not apply.
+    """
+    try:
+        fields = SITE_FIELDSET.parse(request.args.get('fields'))
+        sync_token, since = sync_window(request.args)
+    except SyncTokenExpired as e:
+        return jsonify({'error': str(e)}), 410
+    except (FieldsetError, SyncTokenError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if since is not None:
+        sites = (
+            Site.query.options(SITE_FIELDSET.load_only(fields))
+            .filter(Site.updated_at >= since)
+            .order_by(Site.id)
+            .all()
+        )
+        return jsonify({
+            'sync_token': sync_token,
+            'sites': [SITE_FIELDSET.serialize(s, fields) for s in sites],
+            'deleted': deleted_since('sites', since)
+        }), 200
+    
+    # Sort keys are read for the next cursor, so always load them
+    query = Site.query.options(SITE_FIELDSET.load_only(fields, extra=('name', 'created_at')))
+    try:
+        sites, meta = list_sites_page(query, request.args, unfiltered_total=get_policy().site_count)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
     return jsonify({
-        'sites': [{
-            'id': s.id,
-            'name': s.name,
-            'url': s.url,
-            'description': s.description,
-            'visible': s.visible,
-            'health_url': s.health_url,
-            'owner': s.owner,
-            'ssh_path': s.ssh_path,
-            'access_methods': s.access_methods or [],
-            'proxy_url': s.proxy_url,
-            'sign_on_method': s.sign_on_method,
-            'console_enabled': s.console_enabled or False,
-            'console_type': s.console_type,
-            'console_url': s.console_url,
-            'inline_web_url': s.inline_web_url,
-            'inline_ssh_url': s.inline_ssh_url,
-            'inline_vnc_url': s.inline_vnc_url,
-            'inline_proxy_mode': s.inline_proxy_mode,
-            'inline_proxy_auth': s.inline_proxy_auth,
-            'inline_proxy_instructions': s.inline_proxy_instructions,
-            'requires_user_credential': s.requires_user_credential or False,
-            'required_credential_type': s.required_credential_type,
-            'inline_console_height': s.inline_console_height,
-            'created_at': s.created_at.isoformat() if s.created_at else None
-        } for s in sites]
+        'sync_token': sync_token,
+        'next_cursor': meta['next_cursor'],
+        'total_estimate': meta['total_estimate'],
+        'sites': [SITE_FIELDSET.serialize(s, fields) for s in sites]
     }), 200
 
 
@@ -57,6 +120,7 @@ def create_site():
         return jsonify({'error': 'name and url required'}), 400
     
     # Validate URL is in allowed hosts
+    validate_proxied_url = proxied_url_validator()
     if not validate_proxied_url(url):
         return jsonify({'error': 'URL not in allowed proxied hosts'}), 400
     
@@ -87,6 +151,8 @@ def create_site():
         description=data.get('description'),
         visible=data.get('visible', True),
         health_url=data.get('health_url'),
+        health_interval=data.get('health_interval') or None,
+        health_timeout=data.get('health_timeout') or None,
         owner=data.get('owner'),
         ssh_path=data.get('ssh_path'),
         access_methods=data.get('access_methods', []),
@@ -108,6 +174,8 @@ def create_site():
     
     db.session.add(site)
     db.session.commit()
+    bump_policy_version()
+    publish_site_changed(site)
     
     return jsonify({
         'id': site.id,
@@ -162,6 +230,8 @@ def get_site(site_id):
         'description': site.description,
         'visible': site.visible,
         'health_url': site.health_url,
+        'health_interval': site.health_interval,
+        'health_timeout': site.health_timeout,
         'owner': site.owner,
         'ssh_path': site.ssh_path,
         'access_methods': site.access_methods or [],
@@ -188,6 +258,25 @@ def get_site(site_id):
     }), 200
 
 
+@admin_bp.route('/sites/<int:site_id>/users', methods=['GET'])
+@require_admin
+def list_site_users(site_id):
+    """List portal users who can see a site through their group memberships."""
+    Site.query.get_or_404(site_id)
+    member_ids = db.select(user_effective_sites.c.user_id).where(user_effective_sites.c.site_id == site_id)
+    users = User.query.filter(User.id.in_(member_ids)).order_by(User.uid).all()
+    roles_by_user = get_roles_for_users([u.id for u in users])
+    return jsonify({
+        'users': [{
+            'id': u.id,
+            'uid': u.uid,
+            'display_name': u.display_name,
+            'disabled': u.disabled,
+            'roles': roles_by_user.get(u.id, [])
+        } for u in users]
+    }), 200
+
+
 @admin_bp.route('/sites/<int:site_id>', methods=['PUT'])
 @require_admin
 def update_site(site_id):
@@ -198,6 +287,8 @@ def update_site(site_id):
     if not data:
         return jsonify({'error': 'Invalid request'}), 400
     
+    validate_proxied_url = proxied_url_validator()
+    
     if 'name' in data:
         site.name = data['name']
     if 'url' in data:
@@ -215,6 +306,10 @@ def update_site(site_id):
         site.visible = data['visible']
     if 'health_url' in data:
         site.health_url = data['health_url']
+    if 'health_interval' in data:
+        site.health_interval = data['health_interval'] or None
+    if 'health_timeout' in data:
+        site.health_timeout = data['health_timeout'] or None
     if 'owner' in data:
         site.owner = data['owner']
     if 'ssh_path' in data:
@@ -262,6 +357,8 @@ def update_site(site_id):
         site.inline_console_height = data['inline_console_height'] or 480
     
     db.session.commit()
+    bump_policy_version()
+    publish_site_changed(site)
     
     return jsonify({
         'id': site.id,
@@ -293,8 +390,16 @@ def update_site(site_id):
 def delete_site(site_id):
     """Delete a site."""
     site = Site.query.get_or_404(site_id)
+    rooms = rooms_for_sites([site_id])[site_id]
+    remove_site_access(site_id)
     db.session.delete(site)
     db.session.commit()
+    bump_policy_version()
+    publish_site_removed(site_id, rooms)
+    try:
+        forget_health_statuses(get_redis_client(), [site_id])
+    except Exception as e:
+        current_app.logger.debug(f"Health status cleanup failed: {str(e)}")
     
     return jsonify({'ok': True}), 200
 
@@ -310,7 +415,7 @@ def add_site_group(site_id):
         return jsonify({'error': 'group_dn required'}), 400
     
     group_dn = data['group_dn']
-    group = LDAPGroup.query.filter_by(dn=group_dn).first()
+    group = find_group_by_dn(group_dn)
     
     if not group:
         from ..ldap.group_sync import sync_group_to_db
@@ -327,7 +432,10 @@ def add_site_group(site_id):
     
     mapping = GroupSiteMap(site_id=site_id, ldap_group_id=group.id)
     db.session.add(mapping)
+    refresh_group_access(group.id)
     db.session.commit()
+    bump_policy_version()
+    publish_site_access_granted(site, group)
     
     return jsonify({'ok': True}), 201
 
@@ -342,7 +450,10 @@ def remove_site_group(site_id, group_id):
     ).first_or_404()
     
     db.session.delete(mapping)
+    refresh_group_access(group_id)
     db.session.commit()
+    bump_policy_version()
+    publish_site_access_revoked(site_id, group_id)
     
     return jsonify({'ok': True}), 200
 
@@ -4,32 +4,74 @@ from datetime import datetime
 from . import admin_bp
 from ..db import db
 from ..models import User, AuditLog
-from ..utils.rbac import require_admin, get_user_roles
+from ..utils.rbac import require_admin, get_user_roles, get_roles_for_users
 from ..utils.security import hash_password
-from ..ldap import get_user_groups, sync_group_to_db
+from ..utils.session_claims import bump_user_epoch
+from ..utils.fieldsets import Fieldset, FieldsetError, column, isoformat
+from ..utils.delta_sync import SyncTokenError, SyncTokenExpired, sync_window, deleted_since
+from ..ldap import get_user_groups, sync_user_groups
 from ..ldap.connector import LDAPConnectionError
 
 
+USER_FIELDSET = Fieldset(User, {
+    'id': column('id'),
+    'uid': column('uid'),
+    'display_name': column('display_name'),
+    'email': column('email'),
+    'is_local_admin': column('is_local_admin'),
+    'disabled': column('disabled'),
+    'last_login': column('last_login', isoformat),
+    'cached_groups': column('cached_groups', lambda v: v or []),
+    'roles': ((), lambda u, context: context['roles'].get(u.id, [])),
+    'dn': column('dn'),
+    'auth_type': (('dn',), lambda u, context: 'LDAP' if u.dn else 'Local'),  # Authentication type
+    'updated_at': column('updated_at', isoformat),
+}, default=[
+    # Everything the admin UI users table shows
+    'id', 'uid', 'display_name', 'email', 'is_local_admin', 'disabled',
+    'last_login', 'cached_groups', 'roles', 'dn', 'auth_type',
+])
+
+
 @admin_bp.route('/users', methods=['GET'])
 @require_admin
 def list_users():
-    """List all users."""
-    users = User.query.all()
-    return jsonify({
-        'users': [{
-            'id': u.id,
-            'uid': u.uid,
-            'display_name': u.display_name,
-            'email': u.email,
-            'is_local_admin': u.is_local_admin,
-            'disabled': u.disabled,
-            'last_login': u.last_login.isoformat() if u.last_login else None,
-            'cached_groups': u.cached_groups or [],
-            'roles': get_user_roles(u.id),
-            'dn': u.dn,
-            'auth_type': 'LDAP' if u.dn else 'Local'  # Authentication type
-        } for u in users]
-    }), 200
+    """
+    List all users.
+    
+    Supports sparse fieldsets (fields=uid,email,...; "all" for every field);
+    only the columns behind the requested fields are fetched, and roles are
+    only resolved when requested.
+    
+    With since=<sync_token> (from a previous response) only users changed
+    since then are returned, plus the ids of deleted users under "deleted".
+    """
+    try:
+        fields = USER_FIELDSET.parse(request.args.get('fields'))
+        sync_token, since = sync_window(request.args)
+    except SyncTokenExpired as e:
+        return jsonify({'error': str(e)}), 410
+    except (FieldsetError, SyncTokenError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = User.query.options(USER_FIELDSET.load_only(fields))
+    if since is not None:
+        query = query.filter(User.updated_at >= since).order_by(User.id)
+    users = query.all()
+    if 'roles' not in fields:
+        roles = {}
+    elif since is not None:
+        roles = get_roles_for_users([u.id for u in users])
+    else:
+        roles = get_roles_for_users()
+    
+    payload = {
+        'sync_token': sync_token,
+        'users': [USER_FIELDSET.serialize(u, fields, {'roles': roles}) for u in users]
+    }
+    if since is not None:
+        payload['deleted'] = deleted_since('users', since)
+    return jsonify(payload), 200
 
 
 @admin_bp.route('/users/<int:user_id>', methods=['GET'])
@@ -65,21 +107,10 @@ def refresh_user(uid):
         # Get fresh groups from LDAP using enhanced lookup
         group_dns = get_user_groups(user.uid)
         
-        # Normalize and sync groups to database
-        normalized_group_dns = []
-        for group_dn in group_dns:
-            normalized_dn = str(group_dn).strip()
-            if normalized_dn:
-                normalized_group_dns.append(normalized_dn)
-                try:
-                    sync_group_to_db(normalized_dn)
-                except Exception as e:
-                    from flask import current_app
-                    current_app.logger.error(f"Failed to sync group {normalized_dn}: {str(e)}")
-        
-        # Update user with normalized groups
-        user.cached_groups = normalized_group_dns
+        # Normalize and sync groups and memberships to database in bulk
+        normalized_group_dns = sync_user_groups(user, group_dns)
         db.session.commit()
+        bump_user_epoch(user.id)
         
         return jsonify({
             'ok': True,
@@ -117,6 +148,7 @@ def update_user(user_id):
         user.email = data['email']
     
     db.session.commit()
+    bump_user_epoch(user.id)
     
     return jsonify({
         'id': user.id,
@@ -152,6 +184,7 @@ def change_user_password(user_id):
     # Hash and save new password
     user.password_hash = hash_password(new_password)
     db.session.commit()
+    bump_user_epoch(user.id)
     
     # Log password change by admin
     try:
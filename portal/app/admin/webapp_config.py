@@ -103,49 +103,45 @@ def update_webapp_config():
     }), 200
 
 
-@admin_bp.route('/webapp-config/public', methods=['GET'])
-def get_public_webapp_config():
-    """Get public webapp configuration (for frontend) - no auth required."""
+PUBLIC_CONFIG_DEFAULTS = {
+    'app_title': 'HLSPG Portal',
+    'page_title': 'Home Lab Single Pane of Glass',
+    'primary_color': '#1976d2',
+    'secondary_color': '#dc004e',
+    'logo_url': '',
+    'favicon_url': '',
+    'login_title': '',
+    'login_subtitle': '',
+    'login_description': '',
+}
+
+
+def public_webapp_config():
+    """
+    Public webapp configuration (branding shown before and after login).
+    
+    Returns:
+        dict: Configured values, with defaults for unset fields or when the
+            configuration cannot be loaded
+    """
     try:
         config = WebAppConfig.query.filter_by(id=1).first()
-        
-        if not config:
-            # Return defaults
-            return jsonify({
-                'app_title': 'HLSPG Portal',
-                'page_title': 'Home Lab Single Pane of Glass',
-                'primary_color': '#1976d2',
-                'secondary_color': '#dc004e',
-                'logo_url': '',
-                'favicon_url': '',
-                'login_title': '',
-                'login_subtitle': '',
-                'login_description': '',
-            }), 200
-        
-        return jsonify({
-            'app_title': config.app_title or 'HLSPG Portal',
-            'page_title': config.page_title or 'Home Lab Single Pane of Glass',
-            'primary_color': config.primary_color or '#1976d2',
-            'secondary_color': config.secondary_color or '#dc004e',
-            'logo_url': config.logo_url or '',
-            'favicon_url': config.favicon_url or '',
-            'login_title': config.login_title or '',
-            'login_subtitle': config.login_subtitle or '',
-            'login_description': config.login_description or '',
-        }), 200
     except Exception as e:
         # If DB not ready, return defaults
         current_app.logger.warning(f'Failed to load webapp config: {e}')
-        return jsonify({
-            'app_title': 'HLSPG Portal',
-            'page_title': 'Home Lab Single Pane of Glass',
-            'primary_color': '#1976d2',
-            'secondary_color': '#dc004e',
-            'logo_url': '',
-            'favicon_url': '',
-            'login_title': '',
-            'login_subtitle': '',
-            'login_description': '',
-        }), 200
+        config = None
+    
+    if not config:
+        return dict(PUBLIC_CONFIG_DEFAULTS)
+    
+    return {
+        key: getattr(config, key) or default
+        for key, default in PUBLIC_CONFIG_DEFAULTS.items()
+    }
+
+
+@admin_bp.route('/webapp-config/public', methods=['GET'])
+def get_public_webapp_config():
+    """Get public webapp configuration (for frontend) - no auth required."""
+    return jsonify(public_webapp_config()), 200
 
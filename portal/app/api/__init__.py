@@ -3,5 +3,5 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__)
 
-from . import sites, profile, metrics, credentials, certificates
+from . import sites, profile, metrics, credentials, certificates, bootstrap
 
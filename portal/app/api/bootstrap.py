@@ -0,0 +1,104 @@
+"""Single-request bootstrap for the user portal's initial load.
+
+GET /api/bootstrap returns what the portal otherwise fetches with five
+requests (/api/auth/me, /api/sites, /api/admin/webapp-config/public,
+/api/certificates and /api/credentials), resolving the principal once and
+running a fixed number of queries however many sites or credentials the user
+has. Each section carries its own ETag so a client can refresh part of it:
+
+    sections: comma-separated sections to return (default: all)
+    etags: comma-separated section:etag pairs the client already holds;
+        matching sections are listed under "unchanged" instead of resent
+
+Response: {"etags": {section: etag}, "sections": {section: data},
+"unchanged": [section, ...]}. The response as a whole also has an ETag
+(If-None-Match gives a 304) and is gzip-compressed when the client accepts it.
+"""
+import gzip
+import hashlib
+from flask import jsonify, request, current_app
+from . import api_bp
+from .sites import accessible_sites_body
+from .certificates import list_user_certificates
+from .credentials import list_user_credentials
+from ..admin.webapp_config import public_webapp_config
+from ..auth.routes import user_info
+from ..utils.rbac import require_login, get_current_principal
+from ..utils.security import rate_limit
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def _json_section(data):
+    body = current_app.json.dumps(data)
+    return body, hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+
+# Section name -> builder(principal) returning (JSON body, ETag)
+BOOTSTRAP_SECTIONS = {
+    'me': lambda principal: _json_section(user_info(principal)),
+    'config': lambda principal: _json_section(public_webapp_config()),
+    'sites': lambda principal: accessible_sites_body(principal),
+    'certificates': lambda principal: _json_section({'certificates': list_user_certificates()}),
+    'credentials': lambda principal: _json_section({'credentials': list_user_credentials(principal.id)}),
+}
+
+
+def _parse_known_etags(value):
+    """Parse "section:etag,..." into a dict (malformed pairs are ignored)."""
+    known = {}
+    for pair in (value or '').split(','):
+        section, _, etag = pair.strip().partition(':')
+        if section and etag:
+            known[section] = etag
+    return known
+
+
+@api_bp.route('/bootstrap', methods=['GET'])
+@require_login
+@rate_limit(max_requests=120, period=60, scope='user')
+def bootstrap():
+    """Everything the user portal needs on page load, in one response."""
+    requested = request.args.get('sections')
+    if requested:
+        sections = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in sections if name not in BOOTSTRAP_SECTIONS]
+        if unknown:
+            return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    else:
+        sections = list(BOOTSTRAP_SECTIONS)
+    known = _parse_known_etags(request.args.get('etags'))
+    
+    principal = get_current_principal()
+    etags = {}
+    bodies = []
+    unchanged = []
+    for name in sections:
+        body, etag = BOOTSTRAP_SECTIONS[name](principal)
+        etags[name] = etag
+        if known.get(name) == etag:
+            unchanged.append(name)
+        else:
+            bodies.append(f'"{name}":{body}')
+    
+    # Section bodies are spliced in as-is (the sites body comes from its cache)
+    body = (
+        f'{{"etags":{current_app.json.dumps(etags)},'
+        f'"sections":{{{",".join(bodies)}}},'
+        f'"unchanged":{current_app.json.dumps(unchanged)}}}'
+    )
+    etag = hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+    gzipped = bool(request.accept_encodings['gzip']) and len(body) >= GZIP_MIN_BYTES
+    
+    response = current_app.response_class(body, mimetype='application/json')
+    # Compressed and plain bodies are different representations
+    response.set_etag(f'{etag}-gzip' if gzipped else etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept-Encoding')
+    response = response.make_conditional(request)
+    if gzipped and response.status_code == 200:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
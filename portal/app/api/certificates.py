@@ -1,58 +1,42 @@
 """User certificate endpoints."""
-from flask import jsonify, request, send_file, session
+from flask import jsonify, request, send_file
 from io import BytesIO
 from . import api_bp
 from ..db import db
-from ..models import User, Certificate
+from ..models import Certificate
+from ..utils.rbac import require_login
 
 
-def _require_user():
-    """Helper to fetch authenticated user or return error response."""
-    user_id = session.get('user_id')
-    if not user_id:
-        return None, (jsonify({'error': 'Authentication required'}), 401)
-    
-    user = User.query.get(user_id)
-    if not user or user.disabled:
-        return None, (jsonify({'error': 'User not found or disabled'}), 401)
+def list_user_certificates():
+    """Enabled certificates available to users (empty if the table is missing)."""
+    try:
+        certificates = Certificate.query.filter_by(enabled=True).order_by(Certificate.name).all()
+    except Exception as e:
+        # Handle case where certificates table doesn't exist yet (migration not run)
+        return []
     
-    return user, None
+    return [{
+        'id': c.id,
+        'name': c.name,
+        'description': c.description,
+        'filename': c.filename,
+        'created_at': c.created_at.isoformat() if c.created_at else None
+    } for c in certificates]
 
 
 @api_bp.route('/certificates', methods=['GET'])
+@require_login
 def list_certificates():
     """List all enabled certificates available to users."""
-    user, error = _require_user()
-    if error:
-        return error
-    
-    try:
-        certificates = Certificate.query.filter_by(enabled=True).order_by(Certificate.name).all()
-    except Exception as e:
-        # Handle case where certificates table doesn't exist yet (migration not run)
-        # Return empty list instead of error
-        return jsonify({
-            'certificates': []
-        }), 200
-    
     return jsonify({
-        'certificates': [{
-            'id': c.id,
-            'name': c.name,
-            'description': c.description,
-            'filename': c.filename,
-            'created_at': c.created_at.isoformat() if c.created_at else None
-        } for c in certificates]
+        'certificates': list_user_certificates()
     }), 200
 
 
 @api_bp.route('/certificates/<int:certificate_id>', methods=['GET'])
+@require_login
 def get_certificate(certificate_id):
     """Get certificate details (without data)."""
-    user, error = _require_user()
-    if error:
-        return error
-    
     try:
         certificate = Certificate.query.filter_by(id=certificate_id, enabled=True).first_or_404()
     except Exception as e:
@@ -68,12 +52,9 @@ def get_certificate(certificate_id):
 
 
 @api_bp.route('/certificates/<int:certificate_id>/download', methods=['GET'])
+@require_login
 def download_certificate(certificate_id):
     """Download a certificate file."""
-    user, error = _require_user()
-    if error:
-        return error
-    
     try:
         certificate = Certificate.query.filter_by(id=certificate_id, enabled=True).first_or_404()
     except Exception as e:
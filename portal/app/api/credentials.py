@@ -1,51 +1,48 @@
 """User credential management endpoints."""
-from flask import jsonify, request, session
+from flask import jsonify, request
+from sqlalchemy.orm import selectinload
 from . import api_bp
 from ..db import db
-from ..models import User, UserCredential, Site
+from ..models import UserCredential, Site
+from ..utils.rbac import require_login, get_current_principal
 
 ALLOWED_CREDENTIAL_TYPES = {'ssh_key', 'certificate', 'password'}
 
 
-def _require_user():
-    """Helper to fetch authenticated user or return error response."""
-    user_id = session.get('user_id')
-    if not user_id:
-        return None, (jsonify({'error': 'Authentication required'}), 401)
-    
-    user = User.query.get(user_id)
-    if not user or user.disabled:
-        return None, (jsonify({'error': 'User not found or disabled'}), 401)
-    
-    return user, None
+def list_user_credentials(user_id):
+    """A user's credentials (secrets omitted), newest first, in two queries."""
+    credentials = (
+        UserCredential.query.filter_by(user_id=user_id)
+        .options(selectinload(UserCredential.associated_sites))
+        .order_by(UserCredential.created_at.desc())
+        .all()
+    )
+    return [{
+        'id': cred.id,
+        'name': cred.name,
+        'credential_type': cred.credential_type,
+        'created_at': cred.created_at.isoformat() if cred.created_at else None,
+        'associated_site_ids': [site.id for site in cred.associated_sites],
+        'associated_sites': [{'id': site.id, 'name': site.name} for site in cred.associated_sites]
+    } for cred in credentials]
 
 
 @api_bp.route('/credentials', methods=['GET'])
+@require_login
 def list_credentials():
     """List credentials for the current user."""
-    user, error = _require_user()
-    if error:
-        return error
+    user = get_current_principal()
     
-    credentials = UserCredential.query.filter_by(user_id=user.id).order_by(UserCredential.created_at.desc()).all()
     return jsonify({
-        'credentials': [{
-            'id': cred.id,
-            'name': cred.name,
-            'credential_type': cred.credential_type,
-            'created_at': cred.created_at.isoformat() if cred.created_at else None,
-            'associated_site_ids': [site.id for site in cred.associated_sites],
-            'associated_sites': [{'id': site.id, 'name': site.name} for site in cred.associated_sites]
-        } for cred in credentials]
+        'credentials': list_user_credentials(user.id)
     }), 200
 
 
 @api_bp.route('/credentials', methods=['POST'])
+@require_login
 def create_credential():
     """Create a credential for the current user."""
-    user, error = _require_user()
-    if error:
-        return error
+    user = get_current_principal()
     
     data = request.get_json() or {}
     name = (data.get('name') or '').strip()
@@ -86,11 +83,10 @@ def create_credential():
 
 
 @api_bp.route('/credentials/<int:credential_id>', methods=['PUT'])
+@require_login
 def update_credential(credential_id):
     """Update a credential owned by the current user."""
-    user, error = _require_user()
-    if error:
-        return error
+    user = get_current_principal()
     
     credential = UserCredential.query.filter_by(id=credential_id, user_id=user.id).first()
     if not credential:
@@ -130,11 +126,10 @@ def update_credential(credential_id):
 
 
 @api_bp.route('/credentials/<int:credential_id>', methods=['DELETE'])
+@require_login
 def delete_credential(credential_id):
     """Delete a credential owned by the current user."""
-    user, error = _require_user()
-    if error:
-        return error
+    user = get_current_principal()
     
     credential = UserCredential.query.filter_by(id=credential_id, user_id=user.id).first()
     if not credential:
@@ -0,0 +1,39 @@
+"""Socket.IO handlers for the realtime events namespace (see utils/events)."""
+from flask_socketio import join_room
+from ..utils.rbac import get_current_principal
+from ..utils.events import EVENTS_NAMESPACE, user_room, admin_room
+
+
+def handle_events_connect(auth):
+    """
+    Subscribe an authenticated connection to its user's room.
+
+    Which events reach the room is decided from the database at publish
+    time, so access changes need no rejoin; revoking the user's sessions
+    closes the room (see utils/events).
+
+    Args:
+        auth: Socket.IO auth payload; {"scope": "admin"} subscribes the admin UI
+
+    Returns:
+        bool: False to reject the connection
+    """
+    principal = get_current_principal()
+    if principal is None:
+        return False
+
+    if (auth or {}).get('scope') == 'admin':
+        if not principal.has_any_role('admin'):
+            return False
+        join_room(admin_room(principal.id), namespace=EVENTS_NAMESPACE)
+        return True
+
+    join_room(user_room(principal.id), namespace=EVENTS_NAMESPACE)
+    return True
+
+
+def register_event_handlers(socketio):
+    """Register the events namespace handlers on the app's SocketIO server."""
+    @socketio.on('connect', namespace=EVENTS_NAMESPACE)
+    def on_events_connect(auth=None):
+        return handle_events_connect(auth)
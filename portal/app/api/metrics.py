@@ -6,6 +6,11 @@ logins_success = Counter('hlspg_logins_success_total', 'Total successful logins'
 logins_fail = Counter('hlspg_logins_fail_total', 'Total failed logins')
 ldap_connect_failures = Counter('hlspg_ldap_connect_failures_total', 'Total LDAP connection failures')
 sites_served = Counter('hlspg_sites_served_total', 'Total sites served to users')
+forward_auth_decisions = Counter('hlspg_forward_auth_decisions_total', 'Forward-auth decisions by status', ['result'])
+rate_limit_decisions = Counter(
+    'hlspg_rate_limit_decisions_total', 'Rate limit decisions by endpoint (allowed, limited or error)',
+    ['endpoint', 'result']
+)
 
 
 def get_metrics():
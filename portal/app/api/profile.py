@@ -1,26 +1,18 @@
 """User profile endpoint."""
-from flask import jsonify, session, request
+from flask import jsonify, request
 from . import api_bp
 from ..db import db
-from ..models import User, AuditLog, SSOConfig
-from ..utils.rbac import get_user_roles
+from ..models import AuditLog, SSOConfig
+from ..utils.rbac import require_login, get_current_principal
 from ..utils.security import hash_password, verify_password
 
 
 @api_bp.route('/profile', methods=['GET'])
+@require_login
 def get_profile():
     """Get current user profile."""
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
-    
-    user = User.query.get(user_id)
-    if not user or user.disabled:
-        return jsonify({'error': 'User not found or disabled'}), 401
-    
-    roles = get_user_roles(user.id)
-    if user.is_local_admin:
-        roles.append('admin')
+    principal = get_current_principal()
+    roles = principal.all_roles
     
     # Get SSO account settings URL if configured
     sso_config = SSOConfig.query.filter_by(id=1).first()
@@ -28,31 +20,26 @@ def get_profile():
     
     return jsonify({
         'user': {
-            'id': user.id,
-            'uid': user.uid,
-            'display_name': user.display_name,
-            'email': user.email,
-            'is_local_admin': user.is_local_admin,
-            'last_login': user.last_login.isoformat() if user.last_login else None,
-            'dn': user.dn,  # Distinguished Name for LDAP users
-            'auth_type': 'LDAP' if user.dn else 'Local'  # Authentication type indicator
+            'id': principal.id,
+            'uid': principal.uid,
+            'display_name': principal.display_name,
+            'email': principal.email,
+            'is_local_admin': principal.is_local_admin,
+            'last_login': principal.last_login.isoformat() if principal.last_login else None,
+            'dn': principal.dn,  # Distinguished Name for LDAP users
+            'auth_type': 'LDAP' if principal.dn else 'Local'  # Authentication type indicator
         },
         'roles': roles,
-        'groups': user.cached_groups or [],
+        'groups': principal.group_dns,
         'sso_account_settings_url': sso_account_settings_url
     }), 200
 
 
 @api_bp.route('/profile/change-password', methods=['POST'])
+@require_login
 def change_password():
     """Change current user's password (local accounts only)."""
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
-    
-    user = User.query.get(user_id)
-    if not user or user.disabled:
-        return jsonify({'error': 'User not found or disabled'}), 401
+    user = get_current_principal().user
     
     # Only allow password changes for local accounts
     if user.dn:
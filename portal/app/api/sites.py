@@ -1,94 +1,262 @@
 """User-facing sites endpoint."""
-from flask import jsonify, session
+import hashlib
+from urllib.parse import urlencode
+from flask import jsonify, request, current_app, redirect, url_for
 from . import api_bp
 from ..db import db
-from ..models import User, Site, GroupSiteMap, LDAPGroup
-from ..utils.rbac import get_user_roles
-from ..utils.site_tokens import resolve_site_tokens
+from ..models import Site
+from ..utils.rbac import require_login, get_current_principal
+from ..utils.tokens import issue_token
+from ..utils.policy import get_policy
+from ..utils.security import get_redis_client
+from ..utils.site_listing import list_sites_page, serialize_user_site
+from ..utils.pagination import PaginationError
+from ..utils.health_prober import get_health_statuses
+from ..utils.health_history import get_health_history
+from ..utils.site_icons import ICON_NAME_PATTERN, ICON_MIMETYPES, get_icon_cache
+
+SITES_CACHE_PREFIX = 'hlspg:sites:'
+SITES_QUERY_ARGS = ('name', 'owner', 'access_method', 'visible', 'sort', 'limit', 'cursor')
+
+
+def _group_fingerprint(canonical_groups):
+    """Stable hash of a canonical group set (users with equal sets share cache entries)."""
+    return hashlib.sha256('\n'.join(sorted(canonical_groups)).encode('utf-8')).hexdigest()[:32]
+
+
+def _build_sites_payload(site_ids, args):
+    """Serialize a page of visible sites for a set of site IDs."""
+    if not site_ids:
+        return {'sites': [], 'next_cursor': None, 'total_estimate': 0}
+    
+    # site_ids includes hidden sites, so the total is counted on the visible ones
+    query = Site.query.filter(Site.id.in_(site_ids), Site.visible == True)
+    sites, meta = list_sites_page(query, args, unfiltered_total=None)
+    
+    site_payloads = [serialize_user_site(s) for s in sites]
+    
+    return {'sites': site_payloads, 'next_cursor': meta['next_cursor'], 'total_estimate': meta['total_estimate']}
+
+
+def _with_health(body, etag, site_ids, redis_client):
+    """
+    Add the latest probe results to a cached payload.
+    
+    Health changes far more often than site definitions, so it is kept out
+    of the cached body and merged in as a top-level "health" object
+    (site_id -> status) with the ETag extended accordingly.
+    """
+    if redis_client is None or not site_ids:
+        return body, etag
+    try:
+        statuses = get_health_statuses(redis_client, site_ids)
+    except Exception as e:
+        current_app.logger.debug(f"Health status lookup failed: {str(e)}")
+        return body, etag
+    if not statuses:
+        return body, etag
+    health = {str(site_id): status for site_id, status in statuses.items()}
+    payload = current_app.json.loads(body)
+    payload['health'] = health
+    etag = hashlib.sha256(f'{etag}:{current_app.json.dumps(health)}'.encode('utf-8')).hexdigest()[:32]
+    return current_app.json.dumps(payload), etag
+
+
+def _sites_response(body, etag):
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def accessible_sites_body(user, args=None):
+    """
+    Serialized sites page for a principal, with the latest health merged in.
+    
+    The serialized payload is cached in Redis under the user's group-set
+    fingerprint and the policy version (bumped on every Site/GroupSiteMap
+    write), so users with the same groups share one entry. Latest health
+    probe results are added on every call under "health".
+    
+    Args:
+        user: Principal
+        args: Filter, sort and pagination arguments (see SITES_QUERY_ARGS)
+    
+    Returns:
+        tuple: (JSON body, ETag)
+    
+    Raises:
+        PaginationError: On invalid sort or pagination arguments
+    """
+    snapshot = get_policy()
+    args = args or {}
+    cache_key = f"{SITES_CACHE_PREFIX}{snapshot.version}:{_group_fingerprint(user.groups)}"
+    if args:
+        cache_key += ':' + hashlib.sha256(urlencode(sorted(args.items())).encode('utf-8')).hexdigest()[:16]
+    
+    redis_client = None
+    try:
+        redis_client = get_redis_client()
+        etag, body, ids = redis_client.hmget(cache_key, 'etag', 'body', 'ids')
+        if etag and body:
+            site_ids = [int(site_id) for site_id in ids.split(',') if site_id] if ids else []
+            return _with_health(body, etag, site_ids, redis_client)
+    except Exception as e:
+        current_app.logger.debug(f"Sites cache lookup failed: {str(e)}")
+        redis_client = None
+    
+    # Resolve accessible site IDs from the in-memory policy snapshot
+    payload = _build_sites_payload(snapshot.sites_for(user.groups), args)
+    body = current_app.json.dumps(payload)
+    etag = hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+    site_ids = [site['id'] for site in payload['sites']]
+    
+    if redis_client is not None:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.hset(cache_key, mapping={'etag': etag, 'body': body, 'ids': ','.join(map(str, site_ids))})
+            pipe.expire(cache_key, current_app.config.get('SITES_CACHE_TTL', 300))
+            pipe.execute()
+        except Exception as e:
+            current_app.logger.debug(f"Sites cache store failed: {str(e)}")
+    
+    return _with_health(body, etag, site_ids, redis_client)
 
 
 @api_bp.route('/sites', methods=['GET'])
+@require_login
 def get_accessible_sites():
-    """Get sites accessible to the current user."""
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Authentication required'}), 401
-    
-    user = User.query.get(user_id)
-    if not user or user.disabled:
-        return jsonify({'error': 'User not found or disabled'}), 401
-    
-    # Get user's groups
-    user_groups = user.cached_groups or []
-    
-    if not user_groups:
-        # No groups, return empty list
-        return jsonify({'sites': []}), 200
-    
-    # Normalize group DNs (strip whitespace) for matching
-    normalized_groups = [str(dn).strip() for dn in user_groups if dn]
-    
-    if not normalized_groups:
-        return jsonify({'sites': []}), 200
-    
-    # Find LDAP groups - try exact match first
-    from sqlalchemy import func
-    ldap_groups = LDAPGroup.query.filter(LDAPGroup.dn.in_(normalized_groups)).all()
-    matched_dns = {g.dn for g in ldap_groups}
-    
-    # If we didn't match all groups, try case-insensitive matching for the rest
-    unmatched_groups = [dn for dn in normalized_groups if dn not in matched_dns]
-    
-    if unmatched_groups:
-        for cached_dn in unmatched_groups:
-            # Try case-insensitive match
-            case_insensitive = LDAPGroup.query.filter(
-                func.lower(LDAPGroup.dn) == func.lower(cached_dn)
-            ).first()
-            if case_insensitive:
-                ldap_groups.append(case_insensitive)
-    
-    group_ids = [g.id for g in ldap_groups]
-    
-    if not group_ids:
-        return jsonify({'sites': []}), 200
-    
-    # Find sites mapped to these groups
-    mappings = GroupSiteMap.query.filter(GroupSiteMap.ldap_group_id.in_(group_ids)).all()
-    site_ids = [m.site_id for m in mappings]
-    
-    # Get visible sites
-    sites = Site.query.filter(
-        Site.id.in_(site_ids),
-        Site.visible == True
-    ).all()
-    
-    site_payloads = []
-    for s in sites:
-        site_payloads.append({
-            'id': s.id,
-            'name': s.name,
-            'url': s.url,
-            'description': s.description,
-            'health_url': s.health_url,
-            'access_methods': s.access_methods or [],
-            'proxy_url': resolve_site_tokens(s.proxy_url, s),
-            'sign_on_method': s.sign_on_method,
-            'console_enabled': s.console_enabled or False,
-            'console_type': s.console_type,
-            'console_url': resolve_site_tokens(s.console_url, s),
-            'ssh_path': s.ssh_path,
-            'inline_web_url': resolve_site_tokens(s.inline_web_url, s),
-            'inline_ssh_url': resolve_site_tokens(s.inline_ssh_url, s),
-            'inline_vnc_url': resolve_site_tokens(s.inline_vnc_url, s),
-            'inline_proxy_mode': s.inline_proxy_mode,
-            'inline_proxy_auth': s.inline_proxy_auth,
-            'inline_proxy_instructions': s.inline_proxy_instructions,
-            'inline_proxy_instructions_resolved': resolve_site_tokens(s.inline_proxy_instructions, s),
-            'requires_user_credential': s.requires_user_credential or False,
-            'required_credential_type': s.required_credential_type,
-            'inline_console_height': s.inline_console_height
-        })
-
-    return jsonify({'sites': site_payloads}), 200
+    """
+    Get sites accessible to the current user.
+    
+    Supports filters (name, owner, access_method), sort (name, created_at,
+    id; prefix "-" for descending) and keyset pagination (limit, cursor).
+    Responses are cached per group set; see accessible_sites_body().
+    """
+    args = {key: request.args[key] for key in SITES_QUERY_ARGS if request.args.get(key)}
+    try:
+        body, etag = accessible_sites_body(get_current_principal(), args)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    return _sites_response(body, etag)
 
+
+@api_bp.route('/sites/health/history', methods=['GET'])
+@require_login
+def get_sites_health_history():
+    """
+    Uptime and latency history for accessible sites.
+    
+    Query params: resolution (1m, 1h or 1d), points (buckets, newest last)
+    and site_ids (comma-separated; defaults to every accessible site).
+    """
+    principal = get_current_principal()
+    
+    if principal.is_local_admin:
+        allowed = None
+    else:
+        allowed = principal.site_ids
+    
+    requested = request.args.get('site_ids')
+    if requested:
+        try:
+            site_ids = [int(site_id) for site_id in requested.split(',') if site_id.strip()]
+        except ValueError:
+            return jsonify({'error': 'site_ids must be comma-separated integers'}), 400
+        if allowed is not None:
+            site_ids = [site_id for site_id in site_ids if site_id in allowed]
+    elif allowed is not None:
+        site_ids = sorted(allowed)
+    else:
+        site_ids = [row.id for row in db.session.query(Site.id).order_by(Site.id)]
+    
+    try:
+        redis_client = get_redis_client()
+        redis_client.ping()
+    except Exception:
+        redis_client = None
+    
+    try:
+        history = get_health_history(
+            redis_client,
+            site_ids,
+            resolution=request.args.get('resolution', '1m'),
+            points=request.args.get('points', 60, type=int),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(history), 200
+
+
+@api_bp.route('/sites/<int:site_id>/token', methods=['POST'])
+@require_login
+def issue_site_token(site_id):
+    """Mint a short-lived signed access token for launching a site."""
+    principal = get_current_principal()
+    
+    if not principal.is_local_admin and site_id not in principal.site_ids:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    token, expires_in = issue_token(principal, site_id=site_id)
+    return jsonify({
+        'access_token': token,
+        'token_type': 'Bearer',
+        'expires_in': expires_in,
+        'site_id': site_id
+    }), 200
+
+
+@api_bp.route('/sites/<int:site_id>/icon', methods=['GET'])
+@require_login
+def get_site_icon(site_id):
+    """
+    Redirect to a site's cached icon.
+    
+    Icons that are missing or older than the site's last edit are fetched in
+    the background; until then the previous icon (or a 404) is returned.
+    """
+    principal = get_current_principal()
+    
+    if not principal.is_local_admin and site_id not in principal.site_ids:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    site = db.session.get(Site, site_id)
+    if site is None:
+        return jsonify({'error': 'Site not found'}), 404
+    
+    icons = get_icon_cache(current_app._get_current_object())
+    name, stale = icons.lookup(site.id, site.updated_at)
+    if stale:
+        icons.schedule(site.id, site.url, site.updated_at)
+    
+    if name is None:
+        response = jsonify({'error': 'Icon not available'})
+        response.status_code = 404
+        response.headers['Cache-Control'] = 'private, max-age=60'
+        return response
+    
+    response = redirect(url_for('api.get_icon', name=name))
+    response.headers['Cache-Control'] = 'private, no-cache' if stale else 'private, max-age=300'
+    return response
+
+
+@api_bp.route('/icons/<name>', methods=['GET'])
+@require_login
+def get_icon(name):
+    """Serve a content-hashed icon file (never changes, so cached as immutable)."""
+    if not ICON_NAME_PATTERN.match(name):
+        return jsonify({'error': 'Icon not found'}), 404
+    
+    icons = get_icon_cache(current_app._get_current_object())
+    try:
+        with open(icons.icon_path(name), 'rb') as f:
+            data = f.read()
+    except OSError:
+        return jsonify({'error': 'Icon not found'}), 404
+    icons.touch(name)
+    
+    response = current_app.response_class(data, mimetype=ICON_MIMETYPES[name.rsplit('.', 1)[1]])
+    response.set_etag(name.split('.')[0])
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response.make_conditional(request)
@@ -3,10 +3,10 @@ import paramiko
 import threading
 import queue
 import json
-from flask import session
 from flask_socketio import emit, disconnect
 from ..db import db
-from ..models import User, UserCredential, Site
+from ..models import UserCredential, Site
+from ..utils.rbac import get_current_principal
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,22 +15,9 @@ logger = logging.getLogger(__name__)
 active_connections = {}
 
 
-def _require_user():
-    """Helper to fetch authenticated user from session."""
-    user_id = session.get('user_id')
-    if not user_id:
-        return None
-    
-    user = User.query.get(user_id)
-    if not user or user.disabled:
-        return None
-    
-    return user
-
-
 def handle_ssh_connect(socketio, data, request_sid):
     """Handle SSH connection request."""
-    user = _require_user()
+    user = get_current_principal()
     if not user:
         socketio.emit('error', {'message': 'Authentication required'}, room=request_sid)
         return
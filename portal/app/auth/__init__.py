@@ -3,4 +3,4 @@ from flask import Blueprint
 
 auth_bp = Blueprint('auth', __name__)
 
-from . import routes
+from . import routes, forward_auth
@@ -0,0 +1,127 @@
+"""Forward-auth endpoint for the reverse proxy in front of internal sites.
+
+Nginx (Proxy Manager) calls GET /api/auth/verify as an `auth_request` for
+every proxied request, forwarding the browser's cookies and the original
+URL. The requested host/path is mapped to a Site through the host index in
+the policy snapshot and checked against the session's effective access:
+
+- 200 with X-Auth-* identity headers (including a signed X-Auth-Token for
+  the site) when access is allowed
+- 401 when there is no valid session (the proxy should redirect to /login)
+- 403 when the user may not access the site, or the host is not a known site
+
+Decisions are cached in-process for FORWARD_AUTH_CACHE_TTL seconds, keyed by
+the raw session cookie and site, so repeated requests for the same page's
+assets skip session decoding and Redis entirely. Revocations therefore take
+effect after at most that many seconds.
+
+Only the proxy should be able to reach this endpoint, since it trusts the
+X-Original-URL / X-Forwarded-* headers.
+"""
+import threading
+import time
+from urllib.parse import urlparse, quote
+from flask import request, jsonify, current_app
+from . import auth_bp
+from ..api.metrics import forward_auth_decisions
+from ..utils.policy import get_policy
+from ..utils.rbac import get_current_principal
+from ..utils.tokens import issue_token
+
+
+class _DecisionCache:
+    """Small TTL cache of forward-auth decisions."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, decision = entry
+        if expires_at < time.monotonic():
+            self.entries.pop(key, None)
+            return None
+        return decision
+
+    def put(self, key, decision, ttl, max_size):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.entries) >= max_size:
+                # Drop expired entries first, then everything if still full
+                self.entries = {k: v for k, v in self.entries.items() if v[0] >= now}
+                if len(self.entries) >= max_size:
+                    self.entries.clear()
+            self.entries[key] = (now + ttl, decision)
+
+
+def _get_cache():
+    return current_app.extensions.setdefault('hlspg_forward_auth', _DecisionCache())
+
+
+def _requested_target():
+    """Host and path of the request being authorized, as forwarded by the proxy."""
+    original_url = request.headers.get('X-Original-URL')
+    if original_url:
+        parsed = urlparse(original_url)
+        return parsed.hostname or '', parsed.path or '/'
+
+    host = request.headers.get('X-Forwarded-Host') or request.host
+    uri = request.headers.get('X-Forwarded-Uri') or request.headers.get('X-Original-URI') or '/'
+    return host.split(',')[0].strip(), urlparse(uri).path or '/'
+
+
+def _decide(site_id):
+    """Evaluate access for the current session. Returns (status, error, headers)."""
+    principal = get_current_principal()
+    if principal is None:
+        return 401, 'Authentication required', {}
+
+    if not (principal.is_local_admin or site_id in principal.site_ids):
+        return 403, 'Access denied', {}
+
+    return 200, None, {
+        'X-Auth-User': principal.uid,
+        'X-Auth-User-Id': str(principal.id),
+        'X-Auth-Email': principal.email or '',
+        'X-Auth-Name': quote(principal.display_name or principal.uid, safe=' '),
+        'X-Auth-Roles': ','.join(principal.all_roles),
+        'X-Auth-Site-Id': str(site_id),
+        'X-Auth-Token': issue_token(principal, site_id=site_id)[0],
+    }
+
+
+def _respond(status, error, headers):
+    forward_auth_decisions.labels(result=str(status)).inc()
+    if status == 200:
+        return '', 200, headers
+    return jsonify({'error': error}), status
+
+
+@auth_bp.route('/verify', methods=['GET'])
+def verify():
+    """Authorize a proxied request (nginx auth_request target)."""
+    snapshot = get_policy()
+    host, path = _requested_target()
+    site_id = snapshot.site_for_url(host, path)
+
+    cookie = request.cookies.get(current_app.config.get('SESSION_COOKIE_NAME', 'session'))
+    if not cookie:
+        return _respond(401, 'Authentication required', {})
+
+    if site_id is None:
+        current_app.logger.debug(f"Forward-auth: no site for {host}{path}")
+        return _respond(403, 'Unknown site', {})
+
+    ttl = current_app.config.get('FORWARD_AUTH_CACHE_TTL', 5)
+    cache = _get_cache()
+    key = (cookie, site_id, snapshot.generation, snapshot.version)
+    decision = cache.get(key) if ttl > 0 else None
+    if decision is None:
+        decision = _decide(site_id)
+        if ttl > 0:
+            cache.put(key, decision, ttl, current_app.config.get('FORWARD_AUTH_CACHE_SIZE', 10000))
+
+    return _respond(*decision)
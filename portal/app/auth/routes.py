@@ -4,15 +4,18 @@ from datetime import datetime
 from . import auth_bp
 from ..db import db
 from ..models import User, AuditLog
-from ..ldap import authenticate_user, get_user_groups, sync_group_to_db
+from ..ldap import authenticate_user, get_user_groups, sync_user_groups
 from ..ldap.connector import LDAPConnectionError
 from ..utils.security import rate_limit
-from ..utils.rbac import get_user_roles
+from ..utils.rbac import get_user_roles, get_current_principal, issue_session_claims
+from ..utils.session_claims import bump_user_epoch
+from ..utils.dn import canonicalize_dn
+from ..utils.tokens import get_jwks
 from ..config import Config
 
 
 @auth_bp.route('/login', methods=['POST'])
-@rate_limit(max_requests=5, period=60, key_func=lambda: f"rate_limit:login:{request.remote_addr}")
+@rate_limit(max_requests=5, period=60)
 def login():
     """Login endpoint."""
     data = request.get_json()
@@ -144,51 +147,36 @@ def login():
         user.dn = user_data.get('dn') or user.dn
     
     # Refresh groups from LDAP using enhanced lookup (forward + reverse)
+    group_dns = []
     if ldap_success and user_data.get('dn'):
         # Use enhanced get_user_groups which does both forward and reverse lookup
         # This ensures we get all groups, not just those in memberOf attribute
         try:
             group_dns = get_user_groups(username)
             current_app.logger.info(f"User {username} groups from enhanced lookup: {group_dns} ({len(group_dns)} groups)")
-            
-            # Sync groups to database (normalize DNs - strip whitespace)
-            normalized_group_dns = []
-            for group_dn in group_dns:
-                # Normalize DN: strip whitespace and ensure consistent format
-                normalized_dn = str(group_dn).strip()
-                if normalized_dn:  # Only add non-empty DNs
-                    normalized_group_dns.append(normalized_dn)
-                    # Sync group to database - ensure it's committed before role lookup
-                    try:
-                        sync_group_to_db(normalized_dn)
-                        current_app.logger.debug(f"Synced group to DB: {normalized_dn}")
-                    except Exception as e:
-                        current_app.logger.error(f"Failed to sync group {normalized_dn}: {str(e)}")
-            
-            user.cached_groups = normalized_group_dns
-            current_app.logger.info(
-                f"User {username} cached groups after normalization: {normalized_group_dns} "
-                f"({len(normalized_group_dns)} groups)"
-            )
         except Exception as e:
             current_app.logger.error(f"Failed to get groups for user {username}: {str(e)}")
             # Fallback to memberOf if enhanced lookup fails
-            member_of_groups = user_data.get('memberOf', [])
-            if member_of_groups:
-                normalized_group_dns = [str(g).strip() for g in member_of_groups if str(g).strip()]
-                user.cached_groups = normalized_group_dns
+            group_dns = user_data.get('memberOf', []) or []
+            if group_dns:
                 current_app.logger.warning(
-                    f"User {username}: Using fallback memberOf groups ({len(normalized_group_dns)} groups) "
+                    f"User {username}: Using fallback memberOf groups ({len(group_dns)} groups) "
                     f"due to enhanced lookup failure"
                 )
             else:
-                user.cached_groups = []
                 current_app.logger.warning(f"User {username} logged in via LDAP but has no groups")
-    else:
-        user.cached_groups = []
-        if ldap_success:
-            from flask import current_app
-            current_app.logger.warning(f"User {username} logged in via LDAP but has no DN or groups")
+    elif ldap_success:
+        current_app.logger.warning(f"User {username} logged in via LDAP but has no DN or groups")
+    
+    # Sync groups and memberships to database in bulk (drops empties and DNs
+    # that only differ in case/spacing/escaping)
+    previous_groups = {canonicalize_dn(dn) for dn in user.cached_groups or []}
+    normalized_group_dns = sync_user_groups(user, group_dns)
+    groups_changed = previous_groups != {canonicalize_dn(dn) for dn in normalized_group_dns}
+    current_app.logger.info(
+        f"User {username} cached groups after normalization: {normalized_group_dns} "
+        f"({len(normalized_group_dns)} groups)"
+    )
     
     user.last_login = datetime.utcnow()
     
@@ -197,10 +185,15 @@ def login():
     db.session.commit()
     current_app.logger.debug(f"Committed user {user.uid} with {len(user.cached_groups or [])} cached groups")
     
+    # Other sessions of this user carry the old groups/roles in their claims
+    if groups_changed and user.id:
+        bump_user_epoch(user.id)
+    
     # Create session
     session['user_id'] = user.id
     session['username'] = user.uid
     session.permanent = True
+    issue_session_claims(user)
     
     # Get user roles (after commit to ensure groups are in DB)
     # Refresh user from DB to ensure we have the latest cached_groups
@@ -259,33 +252,44 @@ def me():
         current_app.logger.debug("GET /api/auth/me: No user_id in session")
         return jsonify({'error': 'Not authenticated'}), 401
     
-    user = User.query.get(user_id)
-    if not user or user.disabled:
+    principal = get_current_principal()
+    if principal is None:
         current_app.logger.warning(f"GET /api/auth/me: User {user_id} not found or disabled")
         session.clear()
         return jsonify({'error': 'User not found or disabled'}), 401
     
-    roles = get_user_roles(user.id)
-    if user.is_local_admin:
-        roles.append('admin')
+    info = user_info(principal)
     
     current_app.logger.debug(
-        f"GET /api/auth/me: User {user.uid} - roles: {roles}, "
-        f"groups: {len(user.cached_groups or [])}"
+        f"GET /api/auth/me: User {principal.uid} - roles: {info['roles']}, "
+        f"groups: {len(info['groups'])}"
     )
     
-    return jsonify({
+    return jsonify(info), 200
+
+
+def user_info(principal):
+    """Current user, roles and groups as returned by /api/auth/me."""
+    return {
         'user': {
-            'id': user.id,
-            'uid': user.uid,
-            'display_name': user.display_name,
-            'email': user.email,
-            'is_local_admin': user.is_local_admin,
-            'last_login': user.last_login.isoformat() if user.last_login else None
+            'id': principal.id,
+            'uid': principal.uid,
+            'display_name': principal.display_name,
+            'email': principal.email,
+            'is_local_admin': principal.is_local_admin,
+            'last_login': principal.last_login.isoformat() if principal.last_login else None
         },
-        'roles': roles,
-        'groups': user.cached_groups or []
-    }), 200
+        'roles': principal.all_roles,
+        'groups': principal.group_dns
+    }
+
+
+@auth_bp.route('/jwks.json', methods=['GET'])
+def jwks():
+    """Public keys for verifying portal access tokens."""
+    response = jsonify(get_jwks())
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
 
 
 @auth_bp.route('/setup/check', methods=['GET'])
@@ -354,6 +358,7 @@ def setup_admin():
         session['user_id'] = admin_user.id
         session['username'] = admin_user.uid
         session.permanent = True
+        issue_session_claims(admin_user)
         
         return jsonify({
             'ok': True,
@@ -44,8 +44,123 @@ def create_admin():
     click.echo(f'Admin user {username} created.')
 
 
+@click.command('rebuild-access')
+@click.option('--verify-only', is_flag=True, help='Only compare the materialized tables, do not rebuild.')
+@with_appcontext
+def rebuild_access_command(verify_only):
+    """Rebuild and verify materialized effective access."""
+    from .utils.access import rebuild_access, verify_access
+    
+    if not verify_only:
+        counts = rebuild_access()
+        db.session.commit()
+        click.echo(f"Rebuilt effective access: {counts['roles']} role grants, {counts['sites']} site grants.")
+    
+    result = verify_access()
+    if any(result.values()):
+        click.echo(
+            f"Effective access is inconsistent: "
+            f"roles missing={result['roles_missing']} extra={result['roles_extra']}, "
+            f"sites missing={result['sites_missing']} extra={result['sites_extra']}"
+        )
+        raise SystemExit(1)
+    click.echo('Effective access verified.')
+
+
+@click.command('rotate-signing-key')
+@click.option('--activate-in', default=120, show_default=True,
+              help='Seconds until the new key starts signing (should exceed SIGNING_KEY_CACHE_TTL).')
+@with_appcontext
+def rotate_signing_key_command(activate_in):
+    """Rotate the access token signing key."""
+    from .utils.tokens import rotate_signing_key
+    
+    key = rotate_signing_key(activate_in=activate_in)
+    db.session.commit()
+    click.echo(f"New signing key {key.kid} activates at {key.activates_at.isoformat()}Z.")
+
+
+@click.command('import-sites')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults from the file extension.')
+@click.option('--dry-run', is_flag=True, help='Validate only, do not create sites.')
+@with_appcontext
+def import_sites_command(path, fmt, dry_run):
+    """Bulk-import sites from a CSV or NDJSON file."""
+    from .utils.site_transfer import iter_import_records, import_sites
+    
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, 'rb') as f:
+        report = import_sites(iter_import_records(f, fmt), dry_run=dry_run)
+    
+    for error in report['errors']:
+        click.echo(f"line {error['line']}: {error['url'] or '-'}: {error['error']}", err=True)
+    verb = 'Would create' if dry_run else 'Created'
+    click.echo(f"{verb} {report['created']} sites, {report['failed']} rows failed.")
+    if report['failed']:
+        raise SystemExit(1)
+
+
+@click.command('export-sites')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True), default='-')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@with_appcontext
+def export_sites_command(path, fmt):
+    """Export all sites as CSV or NDJSON (to stdout by default)."""
+    from .utils.site_transfer import iter_export_rows, export_chunks
+    
+    with click.open_file(path, 'w', encoding='utf-8') as f:
+        for chunk in export_chunks(iter_export_rows(), fmt):
+            f.write(chunk)
+
+
+@click.command('export-config')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True), default='-')
+@with_appcontext
+def export_config_command(path):
+    """Export the full configuration snapshot as JSON (to stdout by default)."""
+    import json
+    from .utils.config_snapshot import export_snapshot, SnapshotError
+    
+    try:
+        snapshot = export_snapshot()
+    except SnapshotError as e:
+        raise click.ClickException(str(e))
+    with click.open_file(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, indent=2, default=str)
+        f.write('\n')
+
+
+@click.command('apply-config')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Only show what would change.')
+@with_appcontext
+def apply_config_command(path, dry_run):
+    """Apply a configuration snapshot (only the differences are written)."""
+    import json
+    from .utils.config_snapshot import apply_snapshot, SnapshotError
+    
+    with open(path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    try:
+        result = apply_snapshot(snapshot, dry_run=dry_run)
+    except SnapshotError as e:
+        raise click.ClickException(str(e))
+    
+    for change in result['changes']:
+        click.echo(f"{change['action']:<6} {change['section']}: {change['key']}")
+    verb = 'Would apply' if dry_run else 'Applied'
+    click.echo(f"{verb} {len(result['changes'])} changes.")
+
+
 def register_commands(app):
     """Register CLI commands."""
     app.cli.add_command(init_db)
     app.cli.add_command(create_admin)
+    app.cli.add_command(rebuild_access_command)
+    app.cli.add_command(rotate_signing_key_command)
+    app.cli.add_command(import_sites_command)
+    app.cli.add_command(export_sites_command)
+    app.cli.add_command(export_config_command)
+    app.cli.add_command(apply_config_command)
 
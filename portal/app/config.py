@@ -1,5 +1,6 @@
 """Configuration management from environment variables."""
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -40,9 +41,16 @@ class Config:
     REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
     SESSION_TYPE = os.getenv('SESSION_TYPE', 'redis')
     SESSION_REDIS = os.getenv('SESSION_REDIS_URL', REDIS_URL)
+    # Shared per-process Redis connection pool
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '5'))
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
     SESSION_KEY_PREFIX = 'hlspg:session:'
+    # Group DNs beyond this count are not embedded in session claims (session payload size)
+    SESSION_CLAIMS_MAX_GROUPS = int(os.getenv('SESSION_CLAIMS_MAX_GROUPS', '40'))
+    # Socket.IO message queue fanning realtime events out across workers ('' to disable)
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', REDIS_URL)
     
     # LDAP
     LDAP_URL = os.getenv('LDAP_URL', '')
@@ -61,9 +69,9 @@ class Config:
     SESSION_COOKIE_SECURE = os.getenv('SESSION_COOKIE_SECURE', 'false').lower() == 'true'
     SESSION_COOKIE_SAMESITE = os.getenv('SESSION_COOKIE_SAMESITE', 'Lax')
     SESSION_COOKIE_HTTPONLY = True
-    # Don't set domain - allows cookies to work across ports on same host
-    # Setting domain would restrict cookies to specific subdomain
-    SESSION_COOKIE_DOMAIN = None
+    # Don't set domain by default - allows cookies to work across ports on same host
+    # Set to a parent domain (e.g. ".example.com") for forward-auth on proxied sites
+    SESSION_COOKIE_DOMAIN = os.getenv('SESSION_COOKIE_DOMAIN') or None
     # Set path to root so cookies work for all routes
     SESSION_COOKIE_PATH = '/'
     PERMANENT_SESSION_LIFETIME = int(os.getenv('SESSION_TIMEOUT_MINUTES', '120')) * 60
@@ -76,6 +84,46 @@ class Config:
     # Rate Limiting
     RATE_LIMIT_REQUESTS = int(os.getenv('RATE_LIMIT_REQUESTS', '10'))
     RATE_LIMIT_PERIOD = int(os.getenv('RATE_LIMIT_PERIOD', '60'))
+    # Per-endpoint overrides: "endpoint=requests/period[/ip|user],..." (e.g. "auth.login=5/60/ip")
+    RATE_LIMITS = os.getenv('RATE_LIMITS', '')
+    
+    # RBAC policy snapshot (seconds before recompiling when Redis pub/sub is unavailable)
+    POLICY_SNAPSHOT_TTL = int(os.getenv('POLICY_SNAPSHOT_TTL', '30'))
+    
+    # Shared /api/sites payload cache in Redis (seconds)
+    SITES_CACHE_TTL = int(os.getenv('SITES_CACHE_TTL', '300'))
+    
+    # Forward-auth decision cache (seconds; 0 disables)
+    FORWARD_AUTH_CACHE_TTL = float(os.getenv('FORWARD_AUTH_CACHE_TTL', '5'))
+    FORWARD_AUTH_CACHE_SIZE = int(os.getenv('FORWARD_AUTH_CACHE_SIZE', '10000'))
+    
+    # Portal-signed access tokens (EdDSA JWT, keys published at /.well-known/jwks.json)
+    ACCESS_TOKEN_TTL = int(os.getenv('ACCESS_TOKEN_TTL', '300'))
+    ACCESS_TOKEN_ISSUER = os.getenv('ACCESS_TOKEN_ISSUER', 'hlspg')
+    SIGNING_KEY_CACHE_TTL = int(os.getenv('SIGNING_KEY_CACHE_TTL', '60'))
+    
+    # Background health prober (per-site health_interval/health_timeout override the defaults)
+    HEALTH_PROBER_ENABLED = os.getenv('HEALTH_PROBER_ENABLED', 'true').lower() == 'true'
+    HEALTH_PROBE_INTERVAL = int(os.getenv('HEALTH_PROBE_INTERVAL', '60'))
+    HEALTH_PROBE_TIMEOUT = int(os.getenv('HEALTH_PROBE_TIMEOUT', '5'))
+    HEALTH_PROBE_CONCURRENCY = int(os.getenv('HEALTH_PROBE_CONCURRENCY', '16'))
+    HEALTH_PROBE_VERIFY_TLS = os.getenv('HEALTH_PROBE_VERIFY_TLS', 'false').lower() == 'true'
+    
+    # Site icons fetched server-side into a shared disk cache (Pillow resizes them when installed)
+    SITE_ICON_CACHE_DIR = os.getenv('SITE_ICON_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'hlspg-icons'))
+    SITE_ICON_CACHE_MAX_BYTES = int(os.getenv('SITE_ICON_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    SITE_ICON_SIZE = int(os.getenv('SITE_ICON_SIZE', '64'))
+    SITE_ICON_FETCH_TIMEOUT = int(os.getenv('SITE_ICON_FETCH_TIMEOUT', '5'))
+    SITE_ICON_RETRY_AFTER = int(os.getenv('SITE_ICON_RETRY_AFTER', '3600'))
+    SITE_ICON_CONCURRENCY = int(os.getenv('SITE_ICON_CONCURRENCY', '4'))
+    SITE_ICON_VERIFY_TLS = os.getenv('SITE_ICON_VERIFY_TLS', 'false').lower() == 'true'
+    
+    # Delta sync for admin lists (?since=): overlap absorbs long transactions, tombstones kept for the retention
+    DELTA_SYNC_OVERLAP = int(os.getenv('DELTA_SYNC_OVERLAP', '60'))
+    DELTA_SYNC_RETENTION = int(os.getenv('DELTA_SYNC_RETENTION', str(7 * 86400)))
+    
+    # In-process admin search index rebuild interval (used without PostgreSQL pg_trgm)
+    SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', '300'))
     
     # Security
     ALLOWED_PROXIED_HOSTS = [h.strip() for h in os.getenv('ALLOWED_PROXIED_HOSTS', 'example.com').split(',')]
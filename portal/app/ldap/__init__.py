@@ -1,7 +1,7 @@
 """LDAP integration module."""
 from .connector import get_ldap_connection, LDAPConnectionError
 from .user_lookup import search_user, authenticate_user, get_user_groups
-from .group_sync import sync_group_to_db
+from .group_sync import sync_group_to_db, find_group_by_dn, sync_user_groups
 
 __all__ = [
     'get_ldap_connection',
@@ -10,5 +10,7 @@ __all__ = [
     'authenticate_user',
     'get_user_groups',
     'sync_group_to_db',
+    'find_group_by_dn',
+    'sync_user_groups',
 ]
 
@@ -1,10 +1,28 @@
 """LDAP group synchronization to database."""
 from flask import current_app
 from ..db import db
-from ..models import LDAPGroup
+from ..models import LDAPGroup, user_group_membership
+from ..utils.dn import canonicalize_dn, normalize_group_dns
+from ..utils.access import refresh_user_access
 from datetime import datetime
 
 
+def find_group_by_dn(group_dn):
+    """
+    Look up a cached LDAP group by DN, ignoring case/spacing/escaping differences.
+    
+    Args:
+        group_dn: Distinguished name of the group
+    
+    Returns:
+        LDAPGroup or None
+    """
+    canonical = canonicalize_dn(group_dn)
+    if not canonical:
+        return None
+    return LDAPGroup.query.filter_by(dn_canonical=canonical).first()
+
+
 def sync_group_to_db(group_dn, cn=None, description=None):
     """
     Sync an LDAP group to the database.
@@ -25,7 +43,7 @@ def sync_group_to_db(group_dn, cn=None, description=None):
         current_app.logger.warning("sync_group_to_db: Empty group DN provided")
         raise ValueError("Group DN cannot be empty")
     
-    group = LDAPGroup.query.filter_by(dn=normalized_dn).first()
+    group = find_group_by_dn(normalized_dn)
     
     if not group:
         group = LDAPGroup(dn=normalized_dn, cn=cn, description=description)
@@ -43,3 +61,78 @@ def sync_group_to_db(group_dn, cn=None, description=None):
     db.session.commit()
     return group
 
+
+
+def sync_user_groups(user, group_dns):
+    """
+    Replace a user's group memberships in bulk.
+    
+    Missing LDAPGroup rows are created, existing ones get last_seen bumped,
+    and the user_group_membership rows are diffed against the new set, all in
+    a fixed number of statements regardless of group count. Effective access
+    is refreshed when memberships change, and User.cached_groups is updated as
+    well for API compatibility.
+    
+    The caller is responsible for committing the session.
+    
+    Args:
+        user: User record (may be new/unflushed)
+        group_dns: Iterable of group DNs from LDAP
+    
+    Returns:
+        list: Normalized group DNs stored in cached_groups
+    """
+    normalized_dns = normalize_group_dns(group_dns)
+    canonical_to_dn = {canonicalize_dn(dn): dn for dn in normalized_dns}
+    
+    if user.id is None:
+        db.session.flush()
+    
+    groups = []
+    if canonical_to_dn:
+        groups = LDAPGroup.query.filter(LDAPGroup.dn_canonical.in_(canonical_to_dn.keys())).all()
+        existing = {g.dn_canonical for g in groups}
+        
+        if groups:
+            LDAPGroup.query.filter(LDAPGroup.id.in_([g.id for g in groups])).update(
+                {LDAPGroup.last_seen: datetime.utcnow()}, synchronize_session=False
+            )
+        
+        new_groups = [LDAPGroup(dn=dn) for canonical, dn in canonical_to_dn.items() if canonical not in existing]
+        if new_groups:
+            db.session.add_all(new_groups)
+            db.session.flush()
+            current_app.logger.debug(f"Created {len(new_groups)} new LDAP groups in DB for user {user.uid}")
+            groups.extend(new_groups)
+    
+    wanted_ids = {g.id for g in groups}
+    current_ids = {
+        row.ldap_group_id for row in db.session.execute(
+            db.select(user_group_membership.c.ldap_group_id).where(user_group_membership.c.user_id == user.id)
+        )
+    }
+    
+    removed_ids = current_ids - wanted_ids
+    added_ids = wanted_ids - current_ids
+    
+    if removed_ids:
+        db.session.execute(
+            user_group_membership.delete().where(
+                user_group_membership.c.user_id == user.id,
+                user_group_membership.c.ldap_group_id.in_(removed_ids)
+            )
+        )
+    if added_ids:
+        db.session.execute(
+            user_group_membership.insert(),
+            [{'user_id': user.id, 'ldap_group_id': group_id} for group_id in added_ids]
+        )
+    
+    if removed_ids or added_ids:
+        refresh_user_access([user.id])
+    
+    # Drop any stale relationship collection so it reloads from the table
+    db.session.expire(user, ['groups'])
+    
+    user.cached_groups = normalized_dns
+    return normalized_dns
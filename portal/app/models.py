@@ -1,8 +1,11 @@
 """SQLAlchemy models for HLSPG."""
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, UniqueConstraint, CheckConstraint, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, UniqueConstraint, CheckConstraint, Table, Index
+from sqlalchemy import event
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from .db import db
+from .utils.dn import canonicalize_dn
+from .utils.site_tokens import compute_resolved_tokens
 
 # Association table for credential-site relationships
 credential_site_association = Table(
@@ -12,6 +15,32 @@ credential_site_association = Table(
     Column('site_id', Integer, ForeignKey('sites.id', ondelete='CASCADE'), primary_key=True)
 )
 
+# Association table for user-group memberships (relational copy of User.cached_groups)
+user_group_membership = Table(
+    'user_group_membership',
+    db.Model.metadata,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('ldap_group_id', Integer, ForeignKey('ldap_groups.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_user_group_membership_ldap_group_id', 'ldap_group_id')
+)
+
+# Materialized effective access (maintained by app.utils.access)
+user_effective_roles = Table(
+    'user_effective_roles',
+    db.Model.metadata,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('role_id', Integer, ForeignKey('roles.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_user_effective_roles_role_id', 'role_id')
+)
+
+user_effective_sites = Table(
+    'user_effective_sites',
+    db.Model.metadata,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('site_id', Integer, ForeignKey('sites.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_user_effective_sites_site_id', 'site_id')
+)
+
 
 class Role(db.Model):
     """Application roles."""
@@ -31,12 +60,20 @@ class LDAPGroup(db.Model):
     
     id = Column(Integer, primary_key=True)
     dn = Column(Text, unique=True, nullable=False)
+    dn_canonical = Column(Text, index=True)  # RFC 4514 canonical form, used for lookups
     cn = Column(String(255))
     description = Column(String(1024))
     last_seen = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     role_mappings = relationship('RoleMapping', back_populates='ldap_group', cascade='all, delete-orphan')
     site_mappings = relationship('GroupSiteMap', back_populates='ldap_group', cascade='all, delete-orphan')
+    members = relationship('User', secondary=user_group_membership, back_populates='groups')
+    
+    @validates('dn')
+    def _set_dn_canonical(self, key, value):
+        """Keep dn_canonical in sync whenever the DN is assigned."""
+        self.dn_canonical = canonicalize_dn(value)
+        return value
 
 
 class RoleMapping(db.Model):
@@ -47,11 +84,15 @@ class RoleMapping(db.Model):
     ldap_group_id = Column(Integer, ForeignKey('ldap_groups.id'), nullable=False)
     role_id = Column(Integer, ForeignKey('roles.id'), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     ldap_group = relationship('LDAPGroup', back_populates='role_mappings')
     role = relationship('Role', back_populates='role_mappings')
     
-    __table_args__ = (UniqueConstraint('ldap_group_id', 'role_id', name='uq_role_mapping'),)
+    __table_args__ = (
+        UniqueConstraint('ldap_group_id', 'role_id', name='uq_role_mapping'),
+        Index('ix_role_mappings_updated_at', 'updated_at'),
+    )
 
 
 class Site(db.Model):
@@ -64,6 +105,8 @@ class Site(db.Model):
     description = Column(String(1024))
     visible = Column(Boolean, default=True)
     health_url = Column(String(1024))
+    health_interval = Column(Integer)  # Seconds between health probes (NULL = HEALTH_PROBE_INTERVAL)
+    health_timeout = Column(Integer)  # Health probe timeout in seconds (NULL = HEALTH_PROBE_TIMEOUT)
     owner = Column(String(255))
     ssh_path = Column(String(1024))  # SSH connection path (e.g., user@hostname or hostname)
     access_methods = Column(JSON)  # List of access methods (e.g., ["HTTPS", "SSH", "RDP"])
@@ -81,11 +124,28 @@ class Site(db.Model):
     requires_user_credential = Column(Boolean, default=False)
     required_credential_type = Column(String(50))  # ssh_key, certificate
     inline_console_height = Column(Integer, default=480)
+    resolved_tokens = Column(JSON)  # Templated fields with ${TOKEN} placeholders resolved (set on save)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     group_mappings = relationship('GroupSiteMap', back_populates='site', cascade='all, delete-orphan')
     associated_credentials = relationship('UserCredential', secondary=credential_site_association, back_populates='associated_sites')
+    
+    __table_args__ = (
+        # Keyset pagination sort orders and listing filters
+        Index('ix_sites_name_id', 'name', 'id'),
+        Index('ix_sites_created_at_id', 'created_at', 'id'),
+        Index('ix_sites_owner_lower', func.lower(owner)),
+        # Delta sync (?since=)
+        Index('ix_sites_updated_at', 'updated_at'),
+    )
+
+
+@event.listens_for(Site, 'before_insert')
+@event.listens_for(Site, 'before_update')
+def _store_resolved_tokens(mapper, connection, target):
+    """Resolve site token templates once per save instead of on every read."""
+    target.resolved_tokens = compute_resolved_tokens(target)
 
 
 class GroupSiteMap(db.Model):
@@ -96,11 +156,15 @@ class GroupSiteMap(db.Model):
     ldap_group_id = Column(Integer, ForeignKey('ldap_groups.id'), nullable=False)
     site_id = Column(Integer, ForeignKey('sites.id'), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     ldap_group = relationship('LDAPGroup', back_populates='site_mappings')
     site = relationship('Site', back_populates='group_mappings')
     
-    __table_args__ = (UniqueConstraint('ldap_group_id', 'site_id', name='uq_group_site'),)
+    __table_args__ = (
+        UniqueConstraint('ldap_group_id', 'site_id', name='uq_group_site'),
+        Index('ix_group_site_map_updated_at', 'updated_at'),
+    )
 
 
 class User(db.Model):
@@ -113,15 +177,16 @@ class User(db.Model):
     display_name = Column(String(255))
     email = Column(String(255))
     last_login = Column(DateTime)
-    cached_groups = Column(JSON)  # List of group DNs
+    cached_groups = Column(JSON)  # List of group DNs (kept for API compatibility, see user_group_membership)
     is_local_admin = Column(Boolean, default=False)
     password_hash = Column(String(255))  # Bcrypt hash for local admin passwords
     disabled = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
     
     audit_logs = relationship('AuditLog', back_populates='user')
     credentials = relationship('UserCredential', back_populates='user', cascade='all, delete-orphan')
+    groups = relationship('LDAPGroup', secondary=user_group_membership, back_populates='members')
 
 
 class UserCredential(db.Model):
@@ -226,5 +291,29 @@ class Certificate(db.Model):
     filename = Column(String(255), nullable=False)  # Suggested filename (e.g., "ca-cert.pem")
     enabled = Column(Boolean, default=True)  # Whether certificate is available to users
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
+
 
+
+class SigningKey(db.Model):
+    """Ed25519 keys used to sign portal access tokens (published via JWKS)."""
+    __tablename__ = 'signing_keys'
+    
+    id = Column(Integer, primary_key=True)
+    kid = Column(String(64), nullable=False, unique=True)
+    algorithm = Column(String(20), nullable=False, default='EdDSA')
+    private_key = Column(Text, nullable=False)  # Encrypted PEM (PKCS8)
+    public_key = Column(Text, nullable=False)  # PEM (SubjectPublicKeyInfo)
+    activates_at = Column(DateTime, nullable=False)  # Used for signing from this time on
+    retired_at = Column(DateTime)  # Stops signing at this time (still published for verification)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class Tombstone(db.Model):
+    """Record of a deleted row, so delta sync (?since=) can report deletions."""
+    __tablename__ = 'tombstones'
+    
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(50), nullable=False)  # sites, users, certificates, role_mappings, site_groups
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
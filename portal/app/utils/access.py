@@ -0,0 +1,153 @@
+"""Materialized effective access (users -> roles, users -> sites).
+
+The user_effective_roles and user_effective_sites tables hold the result of
+joining user_group_membership with RoleMapping/GroupSiteMap, so authorization
+checks are a single indexed lookup. They are maintained incrementally:
+
+- refresh_user_access() when a user's memberships change (login, refresh)
+- refresh_group_access() when a RoleMapping/GroupSiteMap row is created or
+  deleted for a group
+- rebuild_access() to recompute everything (flask rebuild-access)
+
+touch_group_members() bumps users.updated_at when a group's roles change, so
+delta syncs of the user list pick up the new roles.
+
+None of these functions commit; callers commit together with the change that
+triggered the refresh.
+"""
+from ..db import db
+from ..models import (
+    RoleMapping, GroupSiteMap, User, user_group_membership,
+    user_effective_roles, user_effective_sites
+)
+
+
+def _expected_roles_select(user_filter=None):
+    """SELECT (user_id, role_id) pairs derived from memberships and role mappings."""
+    stmt = (
+        db.select(user_group_membership.c.user_id, RoleMapping.role_id)
+        .join(RoleMapping, RoleMapping.ldap_group_id == user_group_membership.c.ldap_group_id)
+    )
+    if user_filter is not None:
+        stmt = stmt.where(user_group_membership.c.user_id.in_(user_filter))
+    return stmt.distinct()
+
+
+def _expected_sites_select(user_filter=None):
+    """SELECT (user_id, site_id) pairs derived from memberships and site mappings."""
+    stmt = (
+        db.select(user_group_membership.c.user_id, GroupSiteMap.site_id)
+        .join(GroupSiteMap, GroupSiteMap.ldap_group_id == user_group_membership.c.ldap_group_id)
+    )
+    if user_filter is not None:
+        stmt = stmt.where(user_group_membership.c.user_id.in_(user_filter))
+    return stmt.distinct()
+
+
+def _refresh(user_filter):
+    """Recompute materialized rows for the users selected by user_filter."""
+    # Make pending ORM changes (new mappings/memberships) visible to the INSERT ... SELECT
+    db.session.flush()
+
+    db.session.execute(user_effective_roles.delete().where(user_effective_roles.c.user_id.in_(user_filter)))
+    db.session.execute(user_effective_sites.delete().where(user_effective_sites.c.user_id.in_(user_filter)))
+    db.session.execute(
+        user_effective_roles.insert().from_select(['user_id', 'role_id'], _expected_roles_select(user_filter))
+    )
+    db.session.execute(
+        user_effective_sites.insert().from_select(['user_id', 'site_id'], _expected_sites_select(user_filter))
+    )
+
+
+def refresh_user_access(user_ids):
+    """
+    Recompute effective roles and sites for specific users.
+
+    Args:
+        user_ids: Iterable of user IDs
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        _refresh(user_ids)
+
+
+def refresh_group_access(group_id):
+    """
+    Recompute effective roles and sites for every member of a group.
+
+    Called after a RoleMapping or GroupSiteMap for the group is created or
+    deleted. Members of the group are selected in SQL, so no users are loaded.
+
+    Args:
+        group_id: LDAPGroup ID
+    """
+    members = (
+        db.select(user_group_membership.c.user_id)
+        .where(user_group_membership.c.ldap_group_id == group_id)
+    )
+    _refresh(members)
+
+
+def touch_group_members(group_id=None):
+    """
+    Mark a group's members (or every user) as updated.
+
+    Args:
+        group_id: LDAPGroup ID, or None for all users
+    """
+    stmt = db.update(User).values(updated_at=db.func.now())
+    if group_id is not None:
+        stmt = stmt.where(User.id.in_(
+            db.select(user_group_membership.c.user_id).where(user_group_membership.c.ldap_group_id == group_id)
+        ))
+    db.session.execute(stmt.execution_options(synchronize_session=False))
+
+
+def remove_site_access(site_id):
+    """Drop materialized access rows for a site that is being deleted."""
+    db.session.execute(user_effective_sites.delete().where(user_effective_sites.c.site_id == site_id))
+
+
+def rebuild_access():
+    """
+    Recompute the full effective access tables from scratch.
+
+    Returns:
+        dict: Row counts per table after the rebuild
+    """
+    db.session.flush()
+    db.session.execute(user_effective_roles.delete())
+    db.session.execute(user_effective_sites.delete())
+    db.session.execute(user_effective_roles.insert().from_select(['user_id', 'role_id'], _expected_roles_select()))
+    db.session.execute(user_effective_sites.insert().from_select(['user_id', 'site_id'], _expected_sites_select()))
+    return {
+        'roles': db.session.execute(db.select(db.func.count()).select_from(user_effective_roles)).scalar(),
+        'sites': db.session.execute(db.select(db.func.count()).select_from(user_effective_sites)).scalar(),
+    }
+
+
+def _difference_count(left, right):
+    subquery = db.except_(left, right).subquery()
+    return db.session.execute(db.select(db.func.count()).select_from(subquery)).scalar()
+
+
+def verify_access():
+    """
+    Compare the materialized tables with a fresh computation.
+
+    Returns:
+        dict: Missing/extra row counts per table (all zero when consistent)
+    """
+    materialized_roles = db.select(user_effective_roles.c.user_id, user_effective_roles.c.role_id)
+    materialized_sites = db.select(user_effective_sites.c.user_id, user_effective_sites.c.site_id)
+    return {
+        'roles_missing': _difference_count(_expected_roles_select(), materialized_roles),
+        'roles_extra': _difference_count(materialized_roles, _expected_roles_select()),
+        'sites_missing': _difference_count(_expected_sites_select(), materialized_sites),
+        'sites_extra': _difference_count(materialized_sites, _expected_sites_select()),
+    }
+
+
+def accessible_site_ids(user_id):
+    """SELECT of site IDs a user can access (for use in IN clauses)."""
+    return db.select(user_effective_sites.c.site_id).where(user_effective_sites.c.user_id == user_id)
@@ -0,0 +1,431 @@
+"""Full configuration snapshots: consistent export, diffed transactional apply.
+
+A snapshot covers sites, roles, the LDAP groups referenced by mappings,
+role and site mappings, webapp/SSO/LDAP config and certificates. Rows are
+matched by natural keys (site URL, role name, canonical group DN,
+certificate name) so a snapshot can be applied to another installation.
+
+Applying mirrors the snapshot for every section it contains: missing rows
+are created, changed fields updated, and sites, certificates and mappings
+absent from the snapshot deleted. Roles and LDAP groups are never deleted
+(groups are a cache of the directory). Sections left out of the snapshot
+are not touched. LDAP bind passwords are never exported or applied.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from ..db import db
+from ..models import (
+    Site, Role, LDAPGroup, RoleMapping, GroupSiteMap, Certificate,
+    WebAppConfig, SSOConfig, LDAPConfig, user_effective_sites
+)
+from .dn import canonicalize_dn
+from .site_tokens import compute_resolved_tokens
+from .security import proxied_url_validator
+from .site_transfer import SITE_TRANSFER_FIELDS, SITE_URL_FIELDS, SITE_DEFAULTS
+from .delta_sync import record_tombstones
+
+SNAPSHOT_VERSION = 1
+
+_SKIPPED_COLUMNS = {'id', 'created_at', 'updated_at'}
+_SECRET_COLUMNS = {'ldap_bind_password'}
+
+_SINGLETONS = {
+    'webapp_config': WebAppConfig,
+    'sso_config': SSOConfig,
+    'ldap_config': LDAPConfig,
+}
+
+ROLE_FIELDS = ['name', 'description']
+GROUP_FIELDS = ['dn', 'cn', 'description']
+CERTIFICATE_FIELDS = ['name', 'description', 'certificate_data', 'filename', 'enabled']
+
+
+class SnapshotError(ValueError):
+    """Raised for malformed snapshots or references that cannot be resolved."""
+    pass
+
+
+def _singleton_fields(model):
+    return [
+        column.name for column in model.__table__.columns
+        if column.name not in _SKIPPED_COLUMNS and column.name not in _SECRET_COLUMNS
+    ]
+
+
+def _rows(*columns):
+    return [dict(row._mapping) for row in db.session.execute(db.select(*columns))]
+
+
+def _begin_consistent_read():
+    """Read the whole export from one snapshot of the database."""
+    db.session.commit()  # End the request's implicit transaction
+    if db.engine.dialect.name == 'postgresql':
+        db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+
+
+def _check_unique_certificate_names(certificates):
+    """Certificates are keyed by name, which the table does not enforce."""
+    counts = {}
+    for certificate in certificates:
+        counts[certificate['name']] = counts.get(certificate['name'], 0) + 1
+    duplicates = sorted(name for name, count in counts.items() if count > 1)
+    if duplicates:
+        raise SnapshotError(
+            f"Certificate names must be unique for snapshots; rename the duplicates: {', '.join(duplicates)}"
+        )
+
+
+def export_snapshot():
+    """
+    Export all configuration tables, read in a single transaction.
+
+    Returns:
+        dict: Snapshot (JSON-serializable)
+
+    Raises:
+        SnapshotError: If live rows cannot be keyed (duplicate certificate names)
+    """
+    _begin_consistent_read()
+    try:
+        snapshot = {'version': SNAPSHOT_VERSION, 'exported_at': datetime.utcnow().isoformat() + 'Z'}
+
+        for section, model in _SINGLETONS.items():
+            fields = _singleton_fields(model)
+            rows = _rows(*[getattr(model, f) for f in fields])
+            snapshot[section] = rows[0] if rows else None
+
+        snapshot['roles'] = sorted(_rows(Role.name, Role.description), key=lambda r: r['name'])
+        snapshot['sites'] = sorted(_rows(*[getattr(Site, f) for f in SITE_TRANSFER_FIELDS]), key=lambda r: r['url'])
+        snapshot['certificates'] = sorted(
+            _rows(*[getattr(Certificate, f) for f in CERTIFICATE_FIELDS]), key=lambda r: r['name']
+        )
+        _check_unique_certificate_names(snapshot['certificates'])
+
+        role_mappings = db.session.execute(
+            db.select(LDAPGroup.dn, Role.name)
+            .join(RoleMapping, RoleMapping.ldap_group_id == LDAPGroup.id)
+            .join(Role, Role.id == RoleMapping.role_id)
+        ).all()
+        site_groups = db.session.execute(
+            db.select(LDAPGroup.dn, Site.url)
+            .join(GroupSiteMap, GroupSiteMap.ldap_group_id == LDAPGroup.id)
+            .join(Site, Site.id == GroupSiteMap.site_id)
+        ).all()
+        snapshot['role_mappings'] = sorted(
+            ({'group': dn, 'role': name} for dn, name in role_mappings), key=lambda m: (m['group'], m['role'])
+        )
+        snapshot['site_groups'] = sorted(
+            ({'group': dn, 'site': url} for dn, url in site_groups), key=lambda m: (m['group'], m['site'])
+        )
+
+        referenced = {m['group'] for m in snapshot['role_mappings']} | {m['group'] for m in snapshot['site_groups']}
+        snapshot['ldap_groups'] = sorted(
+            (g for g in _rows(*[getattr(LDAPGroup, f) for f in GROUP_FIELDS]) if g['dn'] in referenced),
+            key=lambda g: g['dn']
+        )
+    finally:
+        db.session.rollback()
+    return snapshot
+
+
+def _require_list(snapshot, section, required):
+    items = snapshot.get(section)
+    if items is None:
+        return None
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        raise SnapshotError(f'{section} must be a list of objects')
+    for item in items:
+        missing = [f for f in required if not item.get(f)]
+        if missing:
+            raise SnapshotError(f"{section} entry is missing {', '.join(missing)}")
+    return items
+
+
+def _field_changes(live, item, fields):
+    """Fields present in `item` whose value differs from `live` -> [old, new]."""
+    return {f: [live.get(f), item[f]] for f in fields if f in item and live.get(f) != item[f]}
+
+
+class _Plan:
+    """Changes computed by diffing a snapshot against the database."""
+
+    def __init__(self):
+        self.changes = []
+        self.creates = {}  # section -> list of rows
+        self.updates = {}  # section -> list of rows (with id)
+        self.deletes = {}  # section -> list of ids
+
+    def create(self, section, key, row):
+        self.changes.append({'section': section, 'action': 'create', 'key': key})
+        self.creates.setdefault(section, []).append(row)
+
+    def update(self, section, key, row, fields):
+        self.changes.append({'section': section, 'action': 'update', 'key': key, 'fields': fields})
+        self.updates.setdefault(section, []).append(row)
+
+    def delete(self, section, key, row_id):
+        self.changes.append({'section': section, 'action': 'delete', 'key': key})
+        self.deletes.setdefault(section, []).append(row_id)
+
+    def summary(self):
+        counts = {}
+        for change in self.changes:
+            section = counts.setdefault(change['section'], {'create': 0, 'update': 0, 'delete': 0})
+            section[change['action']] += 1
+        return counts
+
+
+def _diff_singletons(snapshot, plan):
+    for section, model in _SINGLETONS.items():
+        item = snapshot.get(section)
+        if item is None:
+            continue
+        if not isinstance(item, dict):
+            raise SnapshotError(f'{section} must be an object')
+        fields = _singleton_fields(model)
+        live = _rows(model.id, *[getattr(model, f) for f in fields])
+        if not live:
+            plan.create(section, section, {'id': 1, **{f: item[f] for f in fields if f in item}})
+            continue
+        changed = _field_changes(live[0], item, fields)
+        if changed:
+            plan.update(section, section, {'id': live[0]['id'], **{f: new for f, (_, new) in changed.items()}}, changed)
+
+
+def _diff_keyed(plan, section, items, live_rows, key_of, fields, prune, build_row=None):
+    """Diff a keyed collection; returns the live key -> id map."""
+    live = {key_of(row): row for row in live_rows}
+    wanted = {}
+    for item in items:
+        key = key_of(item)
+        if key in wanted:
+            raise SnapshotError(f'Duplicate {section} entry: {key}')
+        wanted[key] = item
+        current = live.get(key)
+        if current is None:
+            row = {f: item[f] for f in fields if f in item}
+            plan.create(section, key, build_row(row, None) if build_row else row)
+            continue
+        changed = _field_changes(current, item, fields)
+        if changed:
+            row = {'id': current['id'], **{f: new for f, (_, new) in changed.items()}}
+            plan.update(section, key, build_row(row, current) if build_row else row, changed)
+    if prune:
+        for key, current in live.items():
+            if key not in wanted:
+                plan.delete(section, key, current['id'])
+    return {key: row['id'] for key, row in live.items()}
+
+
+def _site_row(row, current, validate_url):
+    """Check written URLs, fill in tokens (bulk writes bypass the ORM save hook) and create defaults."""
+    for field in SITE_URL_FIELDS:
+        if row.get(field) and not validate_url(row[field]):
+            raise SnapshotError(f"sites entry {field} '{row[field]}' not in allowed proxied hosts")
+    merged = {**(current or SITE_DEFAULTS), **row}
+    row['resolved_tokens'] = compute_resolved_tokens(
+        SimpleNamespace(**{f: merged.get(f) for f in SITE_TRANSFER_FIELDS})
+    )
+    if current is None:
+        row = {**SITE_DEFAULTS, **row}
+    return row
+
+
+def _group_row(row, current):
+    if 'dn' in row:
+        row['dn_canonical'] = canonicalize_dn(row['dn'])
+    return row
+
+
+def plan_snapshot(snapshot):
+    """
+    Diff a snapshot against the live configuration.
+
+    Returns:
+        _Plan: Planned changes (nothing is written)
+
+    Raises:
+        SnapshotError: On a malformed snapshot or unresolvable references
+    """
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f'Unsupported snapshot (expected version {SNAPSHOT_VERSION})')
+
+    plan = _Plan()
+    _diff_singletons(snapshot, plan)
+
+    roles = _require_list(snapshot, 'roles', ['name'])
+    live_roles = _rows(Role.id, *[getattr(Role, f) for f in ROLE_FIELDS])
+    role_ids = {r['name']: r['id'] for r in live_roles}
+    if roles is not None:
+        _diff_keyed(plan, 'roles', roles, live_roles, lambda r: r['name'], ROLE_FIELDS, prune=False)
+
+    groups = _require_list(snapshot, 'ldap_groups', ['dn']) or []
+    live_groups = _rows(LDAPGroup.id, *[getattr(LDAPGroup, f) for f in GROUP_FIELDS])
+    group_key = lambda g: canonicalize_dn(g['dn'])
+    group_ids = _diff_keyed(plan, 'ldap_groups', groups, live_groups, group_key, GROUP_FIELDS,
+                            prune=False, build_row=_group_row)
+
+    sites = _require_list(snapshot, 'sites', ['name', 'url'])
+    live_sites = _rows(Site.id, *[getattr(Site, f) for f in SITE_TRANSFER_FIELDS])
+    site_ids = {s['url']: s['id'] for s in live_sites}
+    if sites is not None:
+        validate_url = proxied_url_validator()
+        _diff_keyed(plan, 'sites', sites, live_sites, lambda s: s['url'], SITE_TRANSFER_FIELDS,
+                    prune=True, build_row=lambda row, current: _site_row(row, current, validate_url))
+
+    certificates = _require_list(snapshot, 'certificates', ['name', 'certificate_data', 'filename'])
+    if certificates is not None:
+        live_certificates = _rows(Certificate.id, *[getattr(Certificate, f) for f in CERTIFICATE_FIELDS])
+        _check_unique_certificate_names(live_certificates)
+        _diff_keyed(plan, 'certificates', certificates, live_certificates, lambda c: c['name'],
+                    CERTIFICATE_FIELDS, prune=True)
+
+    # Mappings reference groups, roles and sites by key; those created by this
+    # snapshot get IDs at apply time
+    known_groups = set(group_ids) | {group_key(g) for g in groups}
+    known_roles = set(role_ids) | {r['name'] for r in roles or []}
+    known_sites = set(site_ids) | {s['url'] for s in sites or []}
+    deleted_sites = {c['key'] for c in plan.changes if c['section'] == 'sites' and c['action'] == 'delete'}
+
+    role_mappings = _require_list(snapshot, 'role_mappings', ['group', 'role'])
+    if role_mappings is not None:
+        live = db.session.execute(db.select(RoleMapping.id, LDAPGroup.dn, Role.name)
+                                  .join(LDAPGroup, LDAPGroup.id == RoleMapping.ldap_group_id)
+                                  .join(Role, Role.id == RoleMapping.role_id)).all()
+        live_keys = {(canonicalize_dn(dn), name): mapping_id for mapping_id, dn, name in live}
+        wanted = set()
+        for mapping in role_mappings:
+            key = (canonicalize_dn(mapping['group']), mapping['role'])
+            if key[1] not in known_roles:
+                raise SnapshotError(f"Unknown role '{mapping['role']}' in role_mappings")
+            if key in wanted:
+                raise SnapshotError(f'Duplicate role_mappings entry: {list(key)}')
+            wanted.add(key)
+            if key[0] not in known_groups:
+                known_groups.add(key[0])
+                plan.create('ldap_groups', key[0], _group_row({'dn': mapping['group']}, None))
+            if key not in live_keys:
+                plan.create('role_mappings', list(key), {'group': key[0], 'role': key[1]})
+        for key, mapping_id in live_keys.items():
+            if key not in wanted:
+                plan.delete('role_mappings', list(key), mapping_id)
+
+    site_groups = _require_list(snapshot, 'site_groups', ['group', 'site'])
+    if site_groups is not None:
+        live = db.session.execute(db.select(GroupSiteMap.id, LDAPGroup.dn, Site.url)
+                                  .join(LDAPGroup, LDAPGroup.id == GroupSiteMap.ldap_group_id)
+                                  .join(Site, Site.id == GroupSiteMap.site_id)).all()
+        live_keys = {(canonicalize_dn(dn), url): mapping_id for mapping_id, dn, url in live}
+        wanted = set()
+        for mapping in site_groups:
+            key = (canonicalize_dn(mapping['group']), mapping['site'])
+            if key[1] not in known_sites or key[1] in deleted_sites:
+                raise SnapshotError(f"Unknown site '{mapping['site']}' in site_groups")
+            if key in wanted:
+                raise SnapshotError(f'Duplicate site_groups entry: {list(key)}')
+            wanted.add(key)
+            if key[0] not in known_groups:
+                known_groups.add(key[0])
+                plan.create('ldap_groups', key[0], _group_row({'dn': mapping['group']}, None))
+            if key not in live_keys:
+                plan.create('site_groups', list(key), {'group': key[0], 'site': key[1]})
+        for key, mapping_id in live_keys.items():
+            # Mappings of deleted sites go with the site
+            if key not in wanted and key[1] not in deleted_sites:
+                plan.delete('site_groups', list(key), mapping_id)
+
+    return plan
+
+
+def _execute_plan(plan):
+    """Write a plan with bulk statements (caller commits)."""
+    from .access import rebuild_access, touch_group_members
+
+    for section, model in list(_SINGLETONS.items()) + [('roles', Role), ('ldap_groups', LDAPGroup),
+                                                      ('sites', Site), ('certificates', Certificate)]:
+        if plan.creates.get(section):
+            db.session.execute(db.insert(model), plan.creates[section])
+        if plan.updates.get(section):
+            db.session.execute(db.update(model), plan.updates[section])
+
+    # Bulk deletes bypass the ORM, so their tombstones are recorded here
+    if plan.deletes.get('role_mappings'):
+        db.session.execute(db.delete(RoleMapping).where(RoleMapping.id.in_(plan.deletes['role_mappings'])))
+        record_tombstones('role_mappings', plan.deletes['role_mappings'])
+    if plan.deletes.get('site_groups'):
+        db.session.execute(db.delete(GroupSiteMap).where(GroupSiteMap.id.in_(plan.deletes['site_groups'])))
+        record_tombstones('site_groups', plan.deletes['site_groups'])
+    if plan.deletes.get('sites'):
+        site_ids = plan.deletes['sites']
+        mapping_ids = db.session.execute(
+            db.select(GroupSiteMap.id).where(GroupSiteMap.site_id.in_(site_ids))
+        ).scalars().all()
+        db.session.execute(db.delete(GroupSiteMap).where(GroupSiteMap.id.in_(mapping_ids)))
+        db.session.execute(user_effective_sites.delete().where(user_effective_sites.c.site_id.in_(site_ids)))
+        db.session.execute(db.delete(Site).where(Site.id.in_(site_ids)))
+        record_tombstones('site_groups', mapping_ids)
+        record_tombstones('sites', site_ids)
+    if plan.deletes.get('certificates'):
+        db.session.execute(db.delete(Certificate).where(Certificate.id.in_(plan.deletes['certificates'])))
+        record_tombstones('certificates', plan.deletes['certificates'])
+
+    if plan.creates.get('role_mappings') or plan.creates.get('site_groups'):
+        group_ids = {canonical: group_id for group_id, canonical in
+                     db.session.execute(db.select(LDAPGroup.id, LDAPGroup.dn_canonical))}
+        role_ids = {name: role_id for role_id, name in db.session.execute(db.select(Role.id, Role.name))}
+        site_ids = {url: site_id for site_id, url in db.session.execute(db.select(Site.id, Site.url))}
+        if plan.creates.get('role_mappings'):
+            db.session.execute(db.insert(RoleMapping), [
+                {'ldap_group_id': group_ids[m['group']], 'role_id': role_ids[m['role']]}
+                for m in plan.creates['role_mappings']
+            ])
+        if plan.creates.get('site_groups'):
+            db.session.execute(db.insert(GroupSiteMap), [
+                {'ldap_group_id': group_ids[m['group']], 'site_id': site_ids[m['site']]}
+                for m in plan.creates['site_groups']
+            ])
+
+    if any(plan.creates.get(s) or plan.deletes.get(s) for s in ('sites', 'role_mappings', 'site_groups')):
+        rebuild_access()
+    if plan.creates.get('role_mappings') or plan.deletes.get('role_mappings'):
+        touch_group_members()  # Roles changed; let user list delta syncs see it
+
+
+def apply_snapshot(snapshot, dry_run=False):
+    """
+    Apply a snapshot: diff against the live state and write only the changes.
+
+    All writes happen in one transaction; nothing is written on error or in
+    dry-run mode.
+
+    Args:
+        snapshot: Snapshot dict (as produced by export_snapshot())
+        dry_run: Only report what would change
+
+    Returns:
+        dict: dry_run, summary (section -> create/update/delete counts) and changes
+
+    Raises:
+        SnapshotError: On a malformed snapshot or unresolvable references
+    """
+    from .policy import bump_policy_version
+    from .search import invalidate_search_index
+    from .events import publish_sites_changed
+
+    plan = plan_snapshot(snapshot)
+    result = {'dry_run': dry_run, 'summary': plan.summary(), 'changes': plan.changes}
+    if dry_run or not plan.changes:
+        return result
+
+    try:
+        _execute_plan(plan)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    bump_policy_version(revoke_sessions=any(
+        change['section'] in ('roles', 'role_mappings') for change in plan.changes
+    ))
+    invalidate_search_index()
+    publish_sites_changed()
+    return result
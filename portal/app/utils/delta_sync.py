@@ -0,0 +1,126 @@
+"""Delta sync (?since=<sync_token>) for admin list endpoints.
+
+List responses carry a `sync_token`: the database clock read before the
+rows were. Passing it back as `since` returns only rows whose updated_at is
+at or after it, plus the ids of rows deleted since, read from tombstones
+written on delete. The window is widened by DELTA_SYNC_OVERLAP seconds so
+rows committed by transactions that started before the token (and so carry
+an earlier updated_at) are not missed; clients apply changes as upserts, so
+repeated rows are harmless. Tombstones older than DELTA_SYNC_RETENTION
+seconds are purged, and tokens older than that are rejected with 410 so the
+client falls back to a full reload.
+"""
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..db import db
+from ..models import Site, User, Certificate, RoleMapping, GroupSiteMap, Tombstone
+
+# Model -> tombstone entity name
+SYNC_ENTITIES = {
+    Site: 'sites',
+    User: 'users',
+    Certificate: 'certificates',
+    RoleMapping: 'role_mappings',
+    GroupSiteMap: 'site_groups',
+}
+
+
+class SyncTokenError(ValueError):
+    """Raised for malformed `since` values."""
+    pass
+
+
+class SyncTokenExpired(SyncTokenError):
+    """Raised when `since` is older than the tombstone retention."""
+    pass
+
+
+def sync_now(connection=None):
+    """Current time on the database clock (the clock updated_at is written with)."""
+    execute = connection.execute if connection is not None else db.session.execute
+    now = execute(db.select(db.type_coerce(db.func.now(), db.DateTime))).scalar()
+    if isinstance(now, str):
+        now = datetime.fromisoformat(now)
+    return now.replace(tzinfo=None)
+
+
+def parse_since(value, now):
+    """
+    Parse a `since` parameter (a sync_token or ISO 8601 timestamp).
+
+    Args:
+        value: Raw parameter value
+        now: Current sync_now()
+
+    Returns:
+        datetime: Lower bound for updated_at/deleted_at, overlap applied
+
+    Raises:
+        SyncTokenError: If the value is not a timestamp
+        SyncTokenExpired: If deletions since then may already be purged
+    """
+    try:
+        since = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        raise SyncTokenError('since must be a sync_token or ISO 8601 timestamp')
+    since = since.replace(tzinfo=None)
+    if since < now - timedelta(seconds=current_app.config.get('DELTA_SYNC_RETENTION', 7 * 86400)):
+        raise SyncTokenExpired('since is older than the sync retention; reload the full list')
+    return since - timedelta(seconds=current_app.config.get('DELTA_SYNC_OVERLAP', 60))
+
+
+def sync_window(args):
+    """
+    Read the sync clock and the request's `since` parameter.
+
+    Returns:
+        tuple: (sync_token for the response, lower bound datetime or None for a full list)
+
+    Raises:
+        SyncTokenError: See parse_since()
+    """
+    now = sync_now()
+    since = parse_since(args['since'], now) if args.get('since') else None
+    return now.isoformat(), since
+
+
+def deleted_since(entity, since):
+    """Ids of `entity` rows deleted at or after `since`."""
+    rows = db.session.execute(
+        db.select(Tombstone.entity_id).distinct()
+        .where(Tombstone.entity == entity, Tombstone.deleted_at >= since)
+        .order_by(Tombstone.entity_id)
+    )
+    return [entity_id for (entity_id,) in rows]
+
+
+def record_tombstones(entity, ids, connection=None):
+    """
+    Record deletions made with bulk statements (ORM deletes are recorded automatically).
+
+    Also purges tombstones past the retention window.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    execute = connection.execute if connection is not None else db.session.execute
+    execute(db.insert(Tombstone.__table__), [{'entity': entity, 'entity_id': entity_id} for entity_id in ids])
+    if has_app_context():
+        config = current_app.config
+        keep = config.get('DELTA_SYNC_RETENTION', 7 * 86400) + config.get('DELTA_SYNC_OVERLAP', 60)
+        cutoff = sync_now(connection) - timedelta(seconds=keep)
+        execute(db.delete(Tombstone.__table__).where(Tombstone.__table__.c.deleted_at < cutoff))
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_deletions(session, flush_context):
+    """Write tombstones for synced rows deleted in this flush (including cascades)."""
+    deleted = {}
+    for obj in session.deleted:
+        entity = SYNC_ENTITIES.get(type(obj))
+        if entity is not None and obj.id is not None:
+            deleted.setdefault(entity, []).append(obj.id)
+    for entity, ids in deleted.items():
+        record_tombstones(entity, ids, connection=session.connection())
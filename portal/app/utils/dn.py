@@ -0,0 +1,210 @@
+"""Distinguished name (DN) parsing and canonicalization (RFC 4514)."""
+from functools import lru_cache
+
+
+# Characters that must be escaped anywhere inside an attribute value
+_SPECIAL_CHARS = set(',+"\\<>;=')
+_HEX_DIGITS = set('0123456789abcdefABCDEF')
+
+
+class DNParseError(ValueError):
+    """Raised when a DN string cannot be parsed."""
+    pass
+
+
+def _split_unescaped(value, separators):
+    """
+    Split a string on unescaped separator characters, ignoring quoted sections.
+
+    Args:
+        value: String to split
+        separators: Set of separator characters
+
+    Returns:
+        list: Raw (still escaped) parts
+    """
+    parts = []
+    current = []
+    in_quotes = False
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch == '\\' and i + 1 < len(value):
+            current.append(value[i:i + 2])
+            i += 2
+            continue
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch in separators and not in_quotes:
+            parts.append(''.join(current))
+            current = []
+            i += 1
+            continue
+        current.append(ch)
+        i += 1
+    if in_quotes:
+        raise DNParseError(f"Unterminated quote in DN component: {value!r}")
+    parts.append(''.join(current))
+    return parts
+
+
+def _unescape_value(raw):
+    """
+    Decode an RFC 4514 attribute value (escapes, hex pairs, quoted strings).
+
+    Leading/trailing unescaped whitespace is dropped; escaped whitespace is kept.
+    """
+    raw = raw.lstrip()
+    # Trailing whitespace is only insignificant when it is not escaped
+    while raw.endswith(' ') and not raw.endswith('\\ '):
+        raw = raw[:-1]
+
+    if len(raw) >= 2 and raw[0] == '"' and raw[-1] == '"':
+        raw = raw[1:-1]
+
+    decoded = bytearray()
+    i = 0
+    while i < len(raw):
+        ch = raw[i]
+        if ch == '\\':
+            pair = raw[i + 1:i + 3]
+            if len(pair) == 2 and all(c in _HEX_DIGITS for c in pair):
+                decoded.append(int(pair, 16))
+                i += 3
+                continue
+            if i + 1 < len(raw):
+                decoded.extend(raw[i + 1].encode('utf-8'))
+                i += 2
+                continue
+            raise DNParseError(f"Dangling escape in DN value: {raw!r}")
+        decoded.extend(ch.encode('utf-8'))
+        i += 1
+
+    try:
+        return decoded.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise DNParseError(f"Invalid UTF-8 in DN value: {raw!r}") from e
+
+
+def _escape_value(value):
+    """Escape an attribute value in the canonical RFC 4514 string form."""
+    out = []
+    for i, ch in enumerate(value):
+        if ch in _SPECIAL_CHARS:
+            out.append('\\' + ch)
+        elif ch == '#' and i == 0:
+            out.append('\\#')
+        elif ch == ' ' and (i == 0 or i == len(value) - 1):
+            out.append('\\ ')
+        elif ord(ch) < 0x20 or ord(ch) == 0x7f:
+            out.append('\\%02x' % ord(ch))
+        else:
+            out.append(ch)
+    return ''.join(out)
+
+
+def _canonical_type(attr_type):
+    """Normalize an attribute type (case-insensitive, optional OID. prefix)."""
+    attr_type = attr_type.strip().lower()
+    if attr_type.startswith('oid.'):
+        attr_type = attr_type[4:]
+    if not attr_type:
+        raise DNParseError("Empty attribute type in DN")
+    return attr_type
+
+
+def _canonical_value(raw_value):
+    """Normalize an attribute value for case-insensitive comparison."""
+    stripped = raw_value.strip()
+    if stripped.startswith('#'):
+        # BER-encoded hex string: compare as lowercase hex
+        return stripped.lower()
+    value = _unescape_value(raw_value)
+    # caseIgnoreMatch semantics: case folding and insignificant space collapsing
+    value = ' '.join(value.split()).lower()
+    return _escape_value(value)
+
+
+def parse_dn(dn):
+    """
+    Parse a DN into a list of RDNs.
+
+    Args:
+        dn: DN string (e.g. "CN=Admins, OU=Groups, DC=example, DC=com")
+
+    Returns:
+        list: List of RDNs, each a sorted tuple of (type, canonical_value) pairs
+
+    Raises:
+        DNParseError: If the DN is malformed
+    """
+    rdns = []
+    for raw_rdn in _split_unescaped(dn, {',', ';'}):
+        if not raw_rdn.strip():
+            raise DNParseError(f"Empty RDN in DN: {dn!r}")
+        avas = []
+        for raw_ava in _split_unescaped(raw_rdn, {'+'}):
+            attr_type, sep, raw_value = raw_ava.partition('=')
+            if not sep:
+                raise DNParseError(f"Missing '=' in DN component: {raw_ava!r}")
+            avas.append((_canonical_type(attr_type), _canonical_value(raw_value)))
+        rdns.append(tuple(sorted(avas)))
+    return rdns
+
+
+@lru_cache(maxsize=8192)
+def canonicalize_dn(dn):
+    """
+    Return the canonical form of a DN for equality comparisons.
+
+    Attribute types and values are lower-cased, insignificant whitespace is
+    removed, escapes are normalized and multi-valued RDNs are sorted, so that
+    e.g. "CN=Admins, OU=Groups,DC=Example,DC=com" and
+    "cn=admins,ou=groups,dc=example,dc=com" produce the same string.
+
+    Malformed DNs fall back to a stripped, lower-cased copy of the input so
+    they still compare consistently.
+
+    Args:
+        dn: DN string
+
+    Returns:
+        str: Canonical DN ('' for empty input)
+    """
+    if dn is None:
+        return ''
+    dn = str(dn).strip()
+    if not dn:
+        return ''
+    try:
+        rdns = parse_dn(dn)
+    except DNParseError:
+        return dn.lower()
+    return ','.join('+'.join(f'{t}={v}' for t, v in rdn) for rdn in rdns)
+
+
+def normalize_group_dns(group_dns):
+    """
+    Clean a list of group DNs coming from LDAP or the user cache.
+
+    Strips whitespace, drops empty entries and removes duplicates that only
+    differ in spacing/case/escaping, preserving the first occurrence.
+
+    Args:
+        group_dns: Iterable of DN strings
+
+    Returns:
+        list: Cleaned DN strings (original spelling kept)
+    """
+    normalized = []
+    seen = set()
+    for dn in group_dns or []:
+        if not dn:
+            continue
+        value = str(dn).strip()
+        canonical = canonicalize_dn(value)
+        if not canonical or canonical in seen:
+            continue
+        seen.add(canonical)
+        normalized.append(value)
+    return normalized
@@ -0,0 +1,181 @@
+"""Realtime portal events pushed over Socket.IO (the /events namespace).
+
+Every connection joins a single room of its own user: the portal room, or
+the admin room for admin UI connections (auth {"scope": "admin"}, admins
+only). Recipients are resolved from the database each time an event is
+published: site events go to the portal rooms of enabled users who can see
+the site according to the materialized access tables, and to the admin rooms
+of enabled admins. Group membership, disabled flag and role changes
+therefore take effect on the next event without the connection having to
+rejoin anything. When a user's sessions are revoked (bump_user_epoch), their
+rooms are closed so open connections stop receiving events; they are sent
+session_revoked first and must reconnect, which re-checks the session. With
+SOCKETIO_MESSAGE_QUEUE set, events emitted in any worker (or the health
+prober) are fanned out through Redis to the worker holding each connection.
+
+Events (payloads):
+    site_added / site_updated: {"site": <same shape as /api/sites entries>}
+    site_removed: {"id": site_id}
+    sites_changed: {} (bulk change; clients should reload /api/sites)
+    health: {"site_id": site_id, "health": <probe result>}
+    session_revoked: {} (the connection no longer receives events; reconnect)
+"""
+from flask import current_app
+from ..db import db
+from ..models import User, Role, Site, user_group_membership, user_effective_roles, user_effective_sites
+
+EVENTS_NAMESPACE = '/events'
+
+
+def user_room(user_id):
+    return f'user:{user_id}'
+
+
+def admin_room(user_id):
+    return f'admin:{user_id}'
+
+
+def _enabled_users():
+    return db.select(User.id).where(db.or_(User.disabled == False, User.disabled.is_(None)))
+
+
+def rooms_for_sites(site_ids):
+    """
+    Portal rooms of the enabled users who can see each site.
+
+    Returns:
+        dict: site_id -> list of rooms (admins not included)
+    """
+    site_ids = list(site_ids)
+    rooms = {site_id: [] for site_id in site_ids}
+    if not site_ids:
+        return rooms
+    rows = db.session.execute(
+        db.select(user_effective_sites.c.site_id, user_effective_sites.c.user_id)
+        .where(user_effective_sites.c.site_id.in_(site_ids))
+        .where(user_effective_sites.c.user_id.in_(_enabled_users()))
+    )
+    for site_id, user_id in rows:
+        rooms[site_id].append(user_room(user_id))
+    return rooms
+
+
+def admin_rooms():
+    """Admin rooms of enabled local admins and users holding the admin role."""
+    role_admins = (
+        db.select(user_effective_roles.c.user_id)
+        .join(Role, Role.id == user_effective_roles.c.role_id)
+        .where(Role.name == 'admin')
+    )
+    user_ids = db.session.execute(
+        _enabled_users().where(db.or_(User.is_local_admin == True, User.id.in_(role_admins)))
+    ).scalars().all()
+    return [admin_room(user_id) for user_id in user_ids]
+
+
+def publish(event, payload, rooms=None):
+    """
+    Emit an event to rooms in the events namespace (every client if rooms is None).
+
+    Call after the change has been committed. Failures are logged, never raised.
+    """
+    socketio = getattr(current_app, 'socketio', None)
+    if socketio is None:
+        return
+    if rooms is not None:
+        rooms = sorted(set(rooms))
+        if not rooms:
+            return
+    try:
+        socketio.emit(event, payload, to=rooms, namespace=EVENTS_NAMESPACE)
+    except Exception as e:
+        current_app.logger.warning(f"Event publish failed ({event}): {str(e)}")
+
+
+def publish_site_changed(site, rooms=None):
+    """Announce a created or edited site (hidden sites are removed for portal users)."""
+    from .site_listing import serialize_user_site
+
+    if rooms is None:
+        rooms = rooms_for_sites([site.id])[site.id]
+    payload = {'site': serialize_user_site(site)}
+    publish('site_updated', payload, admin_rooms())
+    if site.visible:
+        publish('site_updated', payload, rooms)
+    else:
+        publish('site_removed', {'id': site.id}, rooms)
+
+
+def publish_site_removed(site_id, rooms):
+    """Announce a deleted site to the rooms captured before the delete."""
+    publish('site_removed', {'id': site_id}, list(rooms) + admin_rooms())
+
+
+def publish_site_access_granted(site, group):
+    """Announce a site to the enabled members of a newly mapped group."""
+    from .site_listing import serialize_user_site
+
+    if not site.visible:
+        return
+    user_ids = db.session.execute(
+        db.select(user_group_membership.c.user_id)
+        .where(user_group_membership.c.ldap_group_id == group.id)
+        .where(user_group_membership.c.user_id.in_(_enabled_users()))
+    ).scalars().all()
+    publish('site_added', {'site': serialize_user_site(site)}, [user_room(user_id) for user_id in user_ids])
+
+
+def publish_site_access_revoked(site_id, group_id):
+    """Announce a site's removal to members of an unmapped group who no longer see it."""
+    still_allowed = db.select(user_effective_sites.c.user_id).where(user_effective_sites.c.site_id == site_id)
+    user_ids = db.session.execute(
+        db.select(user_group_membership.c.user_id)
+        .where(user_group_membership.c.ldap_group_id == group_id)
+        .where(user_group_membership.c.user_id.not_in(still_allowed))
+    ).scalars().all()
+    publish('site_removed', {'id': site_id}, [user_room(user_id) for user_id in user_ids])
+
+
+def publish_sites_changed():
+    """Tell every client to reload its sites after a bulk change."""
+    publish('sites_changed', {})
+
+
+def publish_health_changes(results):
+    """
+    Announce probe results whose status changed.
+
+    Args:
+        results: site_id -> probe result
+    """
+    if not results:
+        return
+    rooms = rooms_for_sites(results)
+    admins = admin_rooms()
+    visible = {
+        site_id for (site_id,) in
+        db.session.execute(db.select(Site.id).where(Site.id.in_(list(results)), Site.visible == True))
+    }
+    for site_id, result in results.items():
+        site_rooms = rooms[site_id] if site_id in visible else []
+        publish('health', {'site_id': site_id, 'health': result}, site_rooms + admins)
+
+
+def close_user_rooms(user_id):
+    """
+    Stop delivering events to a user's open connections (sessions revoked).
+
+    They are told with session_revoked, then removed from their rooms on
+    every worker; reconnecting re-checks the session. Failures are logged,
+    never raised.
+    """
+    socketio = getattr(current_app, 'socketio', None)
+    if socketio is None:
+        return
+    rooms = [user_room(user_id), admin_room(user_id)]
+    publish('session_revoked', {}, rooms)
+    try:
+        for room in rooms:
+            socketio.close_room(room, namespace=EVENTS_NAMESPACE)
+    except Exception as e:
+        current_app.logger.warning(f"Closing event rooms of user {user_id} failed: {str(e)}")
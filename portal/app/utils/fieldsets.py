@@ -0,0 +1,65 @@
+"""Sparse fieldsets (?fields=a,b,c) for list endpoints."""
+from sqlalchemy.orm import load_only
+
+
+class FieldsetError(ValueError):
+    """Raised when unknown fields are requested."""
+    pass
+
+
+def column(name, transform=None):
+    """Field backed by the column of the same name."""
+    if transform is None:
+        return (name,), lambda obj, context: getattr(obj, name)
+    return (name,), lambda obj, context: transform(getattr(obj, name))
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+class Fieldset:
+    """
+    Serializable fields of a model, each backed by zero or more columns.
+
+    Args:
+        model: Model class
+        fields: Mapping of field name -> (column names, getter(obj, context))
+        default: Field names returned when no `fields` parameter is given
+    """
+
+    def __init__(self, model, fields, default):
+        self.model = model
+        self.fields = fields
+        self.default = tuple(default)
+
+    def parse(self, value):
+        """
+        Parse a `fields` parameter ("all" or "*" selects every field).
+
+        Returns:
+            tuple: Field names in request order
+
+        Raises:
+            FieldsetError: On unknown field names
+        """
+        if not value:
+            return self.default
+        if value.strip() in ('all', '*'):
+            return tuple(self.fields)
+        names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise FieldsetError(
+                f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(self.fields)}"
+            )
+        return names
+
+    def load_only(self, names, extra=()):
+        """Loader option fetching only the columns behind `names` (plus `extra`)."""
+        columns = {c for name in names for c in self.fields[name][0]} | set(extra)
+        columns.add(self.model.__mapper__.primary_key[0].key)
+        return load_only(*[getattr(self.model, c) for c in sorted(columns)])
+
+    def serialize(self, obj, names, context=None):
+        return {name: self.fields[name][1](obj, context) for name in names}
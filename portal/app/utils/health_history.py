@@ -0,0 +1,189 @@
+"""Downsampled site health history in fixed-size ring buffers.
+
+Every probe result is folded into one bucket per resolution (1m, 1h, 1d).
+Each resolution is a fixed array of RECORD_SIZE-byte records per site, with
+a bucket's slot given by (bucket_start / step) % capacity, so a site never
+uses more than sum(capacity * RECORD_SIZE) bytes however long the prober
+runs. Stale slots are recognised by their bucket_start and overwritten.
+
+In Redis each array is a string updated in place with GETRANGE/SETRANGE
+from a Lua script; without Redis the same layout is kept in a per-process
+bytearray.
+
+A record is four fixed-width hex fields: bucket_start (8), probe count (4),
+successful probes (4) and latency sum in ms (8).
+"""
+import threading
+import time
+
+HEALTH_HISTORY_PREFIX = 'hlspg:health:history:'
+RECORD_SIZE = 24
+
+# Resolution name -> (bucket seconds, buckets kept)
+RESOLUTIONS = {
+    '1m': (60, 180),     # 3 hours
+    '1h': (3600, 168),   # 7 days
+    '1d': (86400, 90),   # 90 days
+}
+
+_RECORD_SCRIPT = """
+local ts = tonumber(ARGV[1])
+local up = tonumber(ARGV[2])
+local latency = tonumber(ARGV[3])
+for i, key in ipairs(KEYS) do
+    local step = tonumber(ARGV[2 + i * 2])
+    local capacity = tonumber(ARGV[3 + i * 2])
+    local start = ts - ts % step
+    local offset = ((start / step) % capacity) * 24
+    local record = redis.call('GETRANGE', key, offset, offset + 23)
+    local count, ups, total = 0, 0, 0
+    if string.len(record) == 24 and tonumber(string.sub(record, 1, 8), 16) == start then
+        count = tonumber(string.sub(record, 9, 12), 16)
+        ups = tonumber(string.sub(record, 13, 16), 16)
+        total = tonumber(string.sub(record, 17, 24), 16)
+    end
+    redis.call('SETRANGE', key, offset, string.format('%08x%04x%04x%08x',
+        start, math.min(count + 1, 65535), math.min(ups + up, 65535), math.min(total + latency, 4294967295)))
+    redis.call('EXPIRE', key, step * capacity)
+end
+return 1
+"""
+
+# Local fallback: (site_id, resolution) -> bytearray
+_local_buffers = {}
+_local_lock = threading.Lock()
+
+
+def _history_key(site_id, resolution):
+    return f"{HEALTH_HISTORY_PREFIX}{resolution}:{site_id}"
+
+
+def _encode(start, count, ups, total):
+    return b'%08x%04x%04x%08x' % (start, min(count, 0xffff), min(ups, 0xffff), min(total, 0xffffffff))
+
+
+def _decode(record):
+    """Return (bucket_start, count, ups, latency_sum) or None for an empty slot."""
+    if len(record) != RECORD_SIZE:
+        return None
+    try:
+        return (int(record[0:8], 16), int(record[8:12], 16), int(record[12:16], 16), int(record[16:24], 16))
+    except ValueError:
+        return None
+
+
+def _sample(result):
+    return int(result['checked_at']), 1 if result['status'] == 'up' else 0, int(round(result.get('latency_ms') or 0))
+
+
+def _record_local(site_id, result):
+    ts, up, latency = _sample(result)
+    with _local_lock:
+        for resolution, (step, capacity) in RESOLUTIONS.items():
+            buffer = _local_buffers.get((site_id, resolution))
+            if buffer is None:
+                buffer = _local_buffers[(site_id, resolution)] = bytearray(capacity * RECORD_SIZE)
+            start = ts - ts % step
+            offset = (start // step) % capacity * RECORD_SIZE
+            current = _decode(bytes(buffer[offset:offset + RECORD_SIZE]))
+            count, ups, total = current[1:] if current and current[0] == start else (0, 0, 0)
+            buffer[offset:offset + RECORD_SIZE] = _encode(start, count + 1, ups + up, total + latency)
+
+
+def record_health_results(redis_client, results):
+    """
+    Fold probe results into every resolution's ring buffer.
+
+    Args:
+        redis_client: Redis client, or None to use the in-process buffers
+        results: dict of site_id -> probe_url() result
+    """
+    if redis_client is None:
+        for site_id, result in results.items():
+            _record_local(site_id, result)
+        return
+
+    script = redis_client.register_script(_RECORD_SCRIPT)
+    args_tail = []
+    for step, capacity in RESOLUTIONS.values():
+        args_tail.extend([step, capacity])
+
+    pipe = redis_client.pipeline()
+    for site_id, result in results.items():
+        keys = [_history_key(site_id, resolution) for resolution in RESOLUTIONS]
+        script(keys=keys, args=[*_sample(result), *args_tail], client=pipe)
+    pipe.execute()
+
+
+def _series(buffer_for, site_ids, step, capacity, first_start, points):
+    series = {}
+    for site_id in site_ids:
+        buffer = buffer_for(site_id)
+        uptime = []
+        latency = []
+        for i in range(points):
+            start = first_start + i * step
+            record = None
+            if buffer:
+                offset = (start // step) % capacity * RECORD_SIZE
+                record = _decode(buffer[offset:offset + RECORD_SIZE])
+            if record is None or record[0] != start or record[1] == 0:
+                uptime.append(None)
+                latency.append(None)
+            else:
+                _, count, ups, total = record
+                uptime.append(round(ups / count, 3))
+                latency.append(round(total / count, 1))
+        series[site_id] = {'uptime': uptime, 'latency_ms': latency}
+    return series
+
+
+def get_health_history(redis_client, site_ids, resolution='1m', points=60, now=None):
+    """
+    Fetch downsampled history for many sites in one round trip.
+
+    Args:
+        redis_client: Redis client, or None to read the in-process buffers
+        site_ids: Sites to fetch
+        resolution: One of RESOLUTIONS
+        points: Number of buckets ending with the current one (capped at capacity)
+        now: Override the current time (epoch seconds)
+
+    Returns:
+        dict: {'resolution', 'step', 'start', 'sites': {site_id: {'uptime': [...],
+            'latency_ms': [...]}}} where each list holds `points` values, oldest
+            first, and None marks buckets without probes
+
+    Raises:
+        ValueError: On an unknown resolution
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Invalid resolution '{resolution}'. Allowed: {', '.join(RESOLUTIONS)}")
+    step, capacity = RESOLUTIONS[resolution]
+    points = max(1, min(int(points), capacity))
+    now = int(time.time() if now is None else now)
+    first_start = now - now % step - (points - 1) * step
+    site_ids = list(site_ids)
+
+    if redis_client is None:
+        with _local_lock:
+            buffers = {
+                site_id: bytes(_local_buffers[(site_id, resolution)])
+                for site_id in site_ids if (site_id, resolution) in _local_buffers
+            }
+    else:
+        pipe = redis_client.pipeline()
+        for site_id in site_ids:
+            pipe.get(_history_key(site_id, resolution))
+        values = pipe.execute() if site_ids else []
+        buffers = {
+            site_id: value.encode('latin-1') if isinstance(value, str) else value
+            for site_id, value in zip(site_ids, values) if value
+        }
+
+    return {
+        'resolution': resolution,
+        'step': step,
+        'start': first_start,
+        'sites': _series(buffers.get, site_ids, step, capacity, first_start, points),
+    }
@@ -0,0 +1,252 @@
+"""Background health prober for Site.health_url.
+
+One prober thread runs per worker process, but only the worker holding the
+Redis leader lease actually probes. The leader keeps a schedule (a heap of
+next-due times per site, jittered so probes spread out) and runs the checks
+on a bounded thread pool. The latest result per site is stored in the
+HEALTH_STATUS_KEY Redis hash and merged into /api/sites responses; every
+result is also folded into the downsampled history (see health_history).
+"""
+import heapq
+import json
+import os
+import random
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ..db import db
+from ..models import Site
+from .health_history import record_health_results
+
+HEALTH_STATUS_KEY = 'hlspg:health:status'
+HEALTH_LEADER_KEY = 'hlspg:health:leader'
+
+# Extend the lease only if we still own it
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def probe_url(url, timeout, verify_tls=True):
+    """
+    Check a health URL once.
+
+    Args:
+        url: URL to GET
+        timeout: Seconds before giving up
+        verify_tls: Verify HTTPS certificates
+
+    Returns:
+        dict: status ('up'/'down'), http_status, latency_ms, error, checked_at
+    """
+    context = None
+    if not verify_tls:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+    start = time.monotonic()
+    http_status = None
+    error = None
+    try:
+        request = urllib.request.Request(url, method='GET', headers={'User-Agent': 'hlspg-health-prober'})
+        with urllib.request.urlopen(request, timeout=timeout, context=context) as response:
+            http_status = response.status
+    except urllib.error.HTTPError as e:
+        http_status = e.code
+    except (urllib.error.URLError, socket.timeout, OSError, ValueError) as e:
+        error = str(getattr(e, 'reason', e))
+
+    latency_ms = round((time.monotonic() - start) * 1000, 1)
+    up = http_status is not None and 200 <= http_status < 400
+    return {
+        'status': 'up' if up else 'down',
+        'http_status': http_status,
+        'latency_ms': latency_ms,
+        'error': error,
+        'checked_at': int(time.time()),
+    }
+
+
+def get_health_statuses(redis_client, site_ids):
+    """
+    Latest probe results for many sites in one round trip.
+
+    Returns:
+        dict: site_id -> result dict (sites never probed are omitted)
+    """
+    site_ids = list(site_ids)
+    if not site_ids:
+        return {}
+    values = redis_client.hmget(HEALTH_STATUS_KEY, *[str(site_id) for site_id in site_ids])
+    return {site_id: json.loads(value) for site_id, value in zip(site_ids, values) if value}
+
+
+def forget_health_statuses(redis_client, site_ids):
+    """Drop the latest probe results of sites that are gone or no longer probed."""
+    site_ids = [str(site_id) for site_id in site_ids]
+    if site_ids:
+        redis_client.hdel(HEALTH_STATUS_KEY, *site_ids)
+
+
+class HealthProber:
+    """Leader-elected scheduler that probes site health URLs."""
+
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        self.default_interval = config.get('HEALTH_PROBE_INTERVAL', 60)
+        self.default_timeout = config.get('HEALTH_PROBE_TIMEOUT', 5)
+        self.concurrency = config.get('HEALTH_PROBE_CONCURRENCY', 16)
+        self.verify_tls = config.get('HEALTH_PROBE_VERIFY_TLS', False)
+        self.refresh_interval = config.get('HEALTH_PROBE_REFRESH', 30)
+        self.lease_ms = int(config.get('HEALTH_LEADER_LEASE', 15) * 1000)
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.sites = {}  # site_id -> (health_url, interval, timeout)
+        self.schedule = []  # heap of (due, site_id)
+        self._sites_loaded_at = 0.0
+        self._lease_checked_at = 0.0
+        self._thread = None
+
+    # Leadership
+
+    def _update_leadership(self, redis_client):
+        now = time.monotonic()
+        if now - self._lease_checked_at < self.lease_ms / 3000:
+            return self.is_leader
+        self._lease_checked_at = now
+        if self.is_leader:
+            self.is_leader = bool(redis_client.eval(_RENEW_SCRIPT, 1, HEALTH_LEADER_KEY, self.token, self.lease_ms))
+        if not self.is_leader:
+            self.is_leader = bool(redis_client.set(HEALTH_LEADER_KEY, self.token, nx=True, px=self.lease_ms))
+            if self.is_leader:
+                self.app.logger.info(f"Health prober leadership acquired by {self.token}")
+                self._sites_loaded_at = 0.0
+        return self.is_leader
+
+    # Scheduling
+
+    def _jittered(self, interval):
+        return interval * random.uniform(0.9, 1.1)
+
+    def load_sites(self, redis_client=None):
+        """
+        Reload probe targets and schedule new sites at a random offset.
+
+        With a Redis client, latest results of sites no longer probed
+        (deleted, or health URL cleared) are removed.
+        """
+        rows = db.session.query(Site.id, Site.health_url, Site.health_interval, Site.health_timeout).filter(
+            Site.health_url.isnot(None), Site.health_url != ''
+        ).all()
+        db.session.remove()
+
+        sites = {
+            row.id: (row.health_url, row.health_interval or self.default_interval, row.health_timeout or self.default_timeout)
+            for row in rows
+        }
+        now = time.monotonic()
+        scheduled = {site_id for _, site_id in self.schedule}
+        for site_id, (_, interval, _) in sites.items():
+            if site_id not in scheduled:
+                heapq.heappush(self.schedule, (now + random.uniform(0, interval), site_id))
+        # Entries for removed sites are dropped when they come due
+        self.sites = sites
+        self._sites_loaded_at = now
+        if redis_client is not None:
+            stale = [site_id for site_id in redis_client.hkeys(HEALTH_STATUS_KEY) if int(site_id) not in sites]
+            forget_health_statuses(redis_client, stale)
+
+    def due_sites(self, now=None):
+        """Pop site IDs whose probe is due, rescheduling each at a jittered interval."""
+        now = time.monotonic() if now is None else now
+        due = []
+        while self.schedule and self.schedule[0][0] <= now:
+            _, site_id = heapq.heappop(self.schedule)
+            target = self.sites.get(site_id)
+            if target is None:
+                continue
+            heapq.heappush(self.schedule, (now + self._jittered(target[1]), site_id))
+            due.append(site_id)
+        return due
+
+    # Main loop
+
+    def run_forever(self):
+        from .security import get_redis_client
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='hlspg-health') as pool:
+            in_flight = {}
+            while True:
+                try:
+                    with self.app.app_context():
+                        redis_client = get_redis_client()
+                        if not self._update_leadership(redis_client):
+                            time.sleep(self.lease_ms / 3000)
+                            continue
+                        if time.monotonic() - self._sites_loaded_at >= self.refresh_interval:
+                            self.load_sites(redis_client)
+
+                        for site_id in self.due_sites():
+                            # Skip a site whose previous probe is still running
+                            if site_id in in_flight.values():
+                                continue
+                            url, _, timeout = self.sites[site_id]
+                            in_flight[pool.submit(probe_url, url, timeout, self.verify_tls)] = site_id
+
+                        if in_flight:
+                            done, _ = wait(list(in_flight), timeout=1.0, return_when=FIRST_COMPLETED)
+                            if done:
+                                self.store_results(redis_client, {in_flight.pop(f): f.result() for f in done})
+                        else:
+                            time.sleep(1.0)
+                except Exception as e:
+                    self.app.logger.warning(f"Health prober iteration failed: {str(e)}")
+                    self.is_leader = False
+                    time.sleep(5)
+
+    def store_results(self, redis_client, results):
+        """
+        Write the latest result for each probed site and fold it into its history.
+
+        Sites whose status flipped (or that had none) are pushed to subscribed
+        clients as health events.
+        """
+        from .events import publish_health_changes
+
+        previous = get_health_statuses(redis_client, results)
+        redis_client.hset(HEALTH_STATUS_KEY, mapping={
+            str(site_id): json.dumps(result, separators=(',', ':')) for site_id, result in results.items()
+        })
+        record_health_results(redis_client, results)
+        publish_health_changes({
+            site_id: result for site_id, result in results.items()
+            if previous.get(site_id, {}).get('status') != result['status']
+        })
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.run_forever, name='hlspg-health-prober', daemon=True)
+            self._thread.start()
+
+
+def init_health_prober(app):
+    """Start the prober on the worker's first request (not for CLI commands)."""
+    if not app.config.get('HEALTH_PROBER_ENABLED', True) or app.testing:
+        return
+
+    prober = HealthProber(app)
+    app.extensions['hlspg_health_prober'] = prober
+
+    @app.before_request
+    def _start_health_prober():
+        prober.start()
@@ -0,0 +1,154 @@
+"""Keyset (cursor) pagination and listing query helpers."""
+import base64
+import json
+from datetime import datetime
+from ..db import db
+
+
+# Escape character for patterns built by like_contains_pattern()
+LIKE_ESCAPE = '\\'
+
+
+class PaginationError(ValueError):
+    """Raised for invalid cursors, sort orders or limits."""
+    pass
+
+
+def like_contains_pattern(value):
+    """
+    LIKE pattern matching `value` anywhere, with its wildcards taken literally.
+
+    Use with escape=LIKE_ESCAPE.
+    """
+    escaped = value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace('%', LIKE_ESCAPE + '%').replace('_', LIKE_ESCAPE + '_')
+    return f'%{escaped}%'
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(sort, values):
+    """Opaque cursor for the row after which the next page starts."""
+    payload = json.dumps({'s': sort, 'v': [_encode_value(v) for v in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor, sort):
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Raises:
+        PaginationError: If the cursor is malformed or was issued for another sort order
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = [_decode_value(v) for v in payload['v']]
+    except (ValueError, KeyError, TypeError) as e:
+        raise PaginationError('Invalid cursor') from e
+    if payload.get('s') != sort:
+        raise PaginationError('Cursor does not match sort order')
+    return values
+
+
+def parse_sort(sort, allowed, default):
+    """
+    Parse a sort parameter such as "name" or "-created_at".
+
+    Args:
+        sort: Raw parameter value (or None)
+        allowed: Mapping of sort name -> tuple of model attribute names (unique last)
+        default: Sort used when none is given
+
+    Returns:
+        tuple: (sort string, attribute names, descending)
+    """
+    sort = sort or default
+    descending = sort.startswith('-')
+    name = sort.lstrip('-')
+    if name not in allowed:
+        raise PaginationError(f"Invalid sort '{sort}'. Allowed: {', '.join(sorted(allowed))}")
+    return sort, allowed[name], descending
+
+
+def parse_limit(value, maximum=500):
+    """Parse a page size; None means unpaginated."""
+    if value in (None, ''):
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError) as e:
+        raise PaginationError('limit must be an integer') from e
+    if limit < 1 or limit > maximum:
+        raise PaginationError(f'limit must be between 1 and {maximum}')
+    return limit
+
+
+def keyset_paginate(query, model, sort, fields, descending, cursor=None, limit=None):
+    """
+    Apply keyset ordering/pagination to an ORM query.
+
+    Rows are ordered by `fields` (the last one must be unique, e.g. id) and
+    the page starts strictly after the cursor position, so each page is an
+    index range scan instead of an OFFSET.
+
+    Args:
+        query: ORM query over `model`
+        model: Model class
+        sort: Sort string (embedded in cursors)
+        fields: Attribute names to order by
+        descending: Sort direction
+        cursor: Cursor from a previous page, or None
+        limit: Page size, or None for all remaining rows
+
+    Returns:
+        tuple: (rows, next_cursor or None)
+    """
+    columns = [getattr(model, field) for field in fields]
+
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        if len(values) != len(columns):
+            raise PaginationError('Invalid cursor')
+        position = db.tuple_(*columns)
+        bound = db.tuple_(*[db.literal(v) for v in values])
+        query = query.filter(position < bound if descending else position > bound)
+
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, [getattr(rows[-1], field) for field in fields])
+
+
+def estimate_count(query):
+    """
+    Row count estimate for a filtered query.
+
+    On PostgreSQL this is the planner's estimate (EXPLAIN, no scan); other
+    databases are only used for small development setups and get an exact
+    count.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return query.order_by(None).count()
+    try:
+        statement = query.order_by(None).statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}').scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception:
+        return query.order_by(None).count()
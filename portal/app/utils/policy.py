@@ -0,0 +1,289 @@
+"""Compiled in-memory RBAC policy snapshot.
+
+Role mappings and group-site mappings change rarely but are read on almost
+every request. Each worker keeps a compiled snapshot of them:
+
+    canonical group DN -> frozenset of role names
+    canonical group DN -> frozenset of site IDs
+
+so resolving a user's roles or sites is pure set operations over the user's
+canonical group DNs. It also carries a host index (hostname -> URL path
+prefixes -> site ID) used by forward-auth to map proxied requests to sites. The snapshot is tagged with a policy version stored in
+Redis. Admin writes call bump_policy_version(), which increments the version
+and publishes it on a Redis pub/sub channel; a listener thread in every worker
+marks its snapshot stale when a message arrives. If Redis is unavailable, the
+snapshot falls back to a short TTL (POLICY_SNAPSHOT_TTL seconds).
+"""
+import threading
+import time
+import redis
+from urllib.parse import urlparse
+from flask import current_app
+from ..db import db
+from ..models import LDAPGroup, Role, RoleMapping, GroupSiteMap, Site
+from .dn import canonicalize_dn
+
+POLICY_VERSION_KEY = 'hlspg:policy:version'
+POLICY_CHANNEL = 'hlspg:policy:invalidate'
+# Policy version of the last change that altered users' roles (see session_claims)
+REVOCATION_EPOCH_KEY = 'hlspg:session:revocation_epoch'
+_LISTENER_RETRY_SECONDS = 5
+_LISTENER_MAX_RETRY_SECONDS = 300
+
+# Increment the version, optionally record it as the session revocation epoch
+# (atomically, so the epoch never moves backwards) and announce it
+_BUMP_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+if KEYS[2] then
+    redis.call('SET', KEYS[2], version)
+end
+redis.call('PUBLISH', ARGV[1], 'bump')
+return version
+"""
+
+
+class PolicySnapshot:
+    """Immutable compiled view of role and site mappings."""
+
+    def __init__(self, version, generation, group_roles, group_sites, host_index=None, site_count=0):
+        self.version = version
+        self.generation = generation
+        self.group_roles = group_roles
+        self.group_sites = group_sites
+        self.host_index = host_index or {}
+        self.site_count = site_count
+        self.compiled_at = time.monotonic()
+
+    def roles_for(self, canonical_group_dns):
+        """Role names granted to a set of canonical group DNs."""
+        roles = set()
+        for dn in canonical_group_dns:
+            roles |= self.group_roles.get(dn, frozenset())
+        return roles
+
+    def sites_for(self, canonical_group_dns):
+        """Site IDs mapped to a set of canonical group DNs."""
+        sites = set()
+        for dn in canonical_group_dns:
+            sites |= self.group_sites.get(dn, frozenset())
+        return sites
+
+    def site_for_url(self, host, path='/'):
+        """
+        Find the site serving a proxied request (longest matching path prefix).
+
+        Args:
+            host: Request hostname (port is ignored)
+            path: Request path
+
+        Returns:
+            int or None: Site ID
+        """
+        prefixes = self.host_index.get(_normalize_host(host))
+        if not prefixes:
+            return None
+        path = path or '/'
+        for prefix, site_id in prefixes:
+            if path == prefix or path.startswith(prefix if prefix.endswith('/') else prefix + '/'):
+                return site_id
+        return None
+
+
+def _normalize_host(host):
+    """Lower-case a host and drop any port."""
+    host = (host or '').strip().lower()
+    if host.startswith('['):
+        return host.split(']')[0] + ']'
+    return host.split(':')[0]
+
+
+def _build_host_index(rows):
+    """hostname -> [(path_prefix, site_id)] sorted by descending prefix length."""
+    index = {}
+    for site_id, *urls in rows:
+        for url in urls:
+            if not url:
+                continue
+            parsed = urlparse(url if '://' in url else f'//{url}')
+            if not parsed.hostname:
+                continue
+            prefix = parsed.path.rstrip('/') or '/'
+            entries = index.setdefault(_normalize_host(parsed.hostname), [])
+            if all(existing != prefix for existing, _ in entries):
+                entries.append((prefix, site_id))
+    for entries in index.values():
+        entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+    return index
+
+
+class _PolicyState:
+    """Per-app snapshot cache and invalidation bookkeeping."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.generation = 0
+        self.listener = None
+        self.listener_connected = False
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+
+
+def _get_state(app):
+    state = app.extensions.get('hlspg_policy')
+    if state is None:
+        state = app.extensions.setdefault('hlspg_policy', _PolicyState())
+    return state
+
+
+def _listen_for_invalidations(redis_url, state, logger):
+    """Background loop: mark the snapshot stale on every pub/sub message."""
+    delay = _LISTENER_RETRY_SECONDS
+    while True:
+        try:
+            client = redis.from_url(redis_url, decode_responses=True)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(POLICY_CHANNEL)
+            state.listener_connected = True
+            delay = _LISTENER_RETRY_SECONDS
+            # Anything may have changed while we were disconnected
+            state.invalidate()
+            for message in pubsub.listen():
+                if message.get('type') == 'message':
+                    state.invalidate()
+        except Exception as e:
+            logger.warning(
+                f"Policy invalidation listener disconnected ({str(e)}); "
+                f"falling back to POLICY_SNAPSHOT_TTL, retrying in {delay}s"
+            )
+        state.listener_connected = False
+        time.sleep(delay)
+        delay = min(delay * 2, _LISTENER_MAX_RETRY_SECONDS)
+
+
+def _ensure_listener(app, state):
+    """Start the invalidation listener for this process (after fork, lazily)."""
+    if state.listener is not None and state.listener.is_alive():
+        return
+    with state.lock:
+        if state.listener is not None and state.listener.is_alive():
+            return
+        state.listener = threading.Thread(
+            target=_listen_for_invalidations,
+            args=(app.config.get('REDIS_URL', 'redis://redis:6379/0'), state, app.logger),
+            name='hlspg-policy-listener',
+            daemon=True
+        )
+        state.listener.start()
+
+
+def _read_version():
+    """Current global policy version from Redis (0 if unavailable)."""
+    from .security import get_redis_client
+    try:
+        return int(get_redis_client().get(POLICY_VERSION_KEY) or 0)
+    except Exception as e:
+        current_app.logger.debug(f"Policy version lookup failed: {str(e)}")
+        return 0
+
+
+def compile_policy(version=0, generation=0):
+    """
+    Build a PolicySnapshot from the mapping and site tables (three queries).
+
+    Returns:
+        PolicySnapshot
+    """
+    group_roles = {}
+    rows = (
+        db.session.query(LDAPGroup.dn, LDAPGroup.dn_canonical, Role.name)
+        .join(RoleMapping, RoleMapping.ldap_group_id == LDAPGroup.id)
+        .join(Role, Role.id == RoleMapping.role_id)
+    )
+    for dn, dn_canonical, role_name in rows:
+        group_roles.setdefault(dn_canonical or canonicalize_dn(dn), set()).add(role_name)
+
+    group_sites = {}
+    rows = (
+        db.session.query(LDAPGroup.dn, LDAPGroup.dn_canonical, GroupSiteMap.site_id)
+        .join(GroupSiteMap, GroupSiteMap.ldap_group_id == LDAPGroup.id)
+    )
+    for dn, dn_canonical, site_id in rows:
+        group_sites.setdefault(dn_canonical or canonicalize_dn(dn), set()).add(site_id)
+
+    site_rows = db.session.query(Site.id, Site.url, Site.proxy_url).order_by(Site.id).all()
+    host_index = _build_host_index(site_rows)
+
+    return PolicySnapshot(
+        version=version,
+        generation=generation,
+        group_roles={dn: frozenset(roles) for dn, roles in group_roles.items()},
+        group_sites={dn: frozenset(sites) for dn, sites in group_sites.items()},
+        host_index=host_index,
+        site_count=len(site_rows),
+    )
+
+
+def get_policy(min_version=None):
+    """
+    Get the current policy snapshot, recompiling it if it is stale.
+
+    Args:
+        min_version: Recompile if the snapshot is older than this policy
+            version, e.g. when the invalidation message for a bump read
+            from Redis may not have reached this worker yet
+
+    Returns:
+        PolicySnapshot
+    """
+    app = current_app._get_current_object()
+    state = _get_state(app)
+    _ensure_listener(app, state)
+
+    snapshot = state.snapshot
+    if (snapshot is not None and snapshot.generation == state.generation
+            and (min_version is None or snapshot.version >= min_version)):
+        ttl = app.config.get('POLICY_SNAPSHOT_TTL', 30)
+        if state.listener_connected or time.monotonic() - snapshot.compiled_at < ttl:
+            return snapshot
+
+    # Read the generation and version before querying so that a concurrent
+    # bump is never folded into an older snapshot
+    generation = state.generation
+    snapshot = compile_policy(version=_read_version(), generation=generation)
+    state.snapshot = snapshot
+    current_app.logger.debug(
+        f"Compiled policy snapshot v{snapshot.version}: "
+        f"{len(snapshot.group_roles)} role groups, {len(snapshot.group_sites)} site groups, "
+        f"{len(snapshot.host_index)} hosts"
+    )
+    return snapshot
+
+
+def bump_policy_version(revoke_sessions=False):
+    """
+    Invalidate policy snapshots in every worker after a mapping or site change.
+
+    Call after the change has been committed.
+
+    Args:
+        revoke_sessions: The change altered users' roles (role mappings), so
+            roles embedded in session claims must be re-resolved as well
+
+    Returns:
+        int: New global policy version (0 if Redis is unavailable)
+    """
+    from .security import get_redis_client
+
+    _get_state(current_app._get_current_object()).invalidate()
+
+    try:
+        client = get_redis_client()
+        keys = [POLICY_VERSION_KEY, REVOCATION_EPOCH_KEY] if revoke_sessions else [POLICY_VERSION_KEY]
+        version = client.eval(_BUMP_SCRIPT, len(keys), *keys, POLICY_CHANNEL)
+        return int(version)
+    except Exception as e:
+        current_app.logger.warning(f"Policy version broadcast failed: {str(e)}")
+        return 0
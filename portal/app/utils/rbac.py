@@ -1,13 +1,16 @@
 """Role-based access control utilities."""
 from functools import wraps
-from flask import jsonify, session, current_app
+from flask import jsonify, session, current_app, g, request
 from ..db import db
-from ..models import User, Role, RoleMapping, LDAPGroup
+from ..models import User, Role, LDAPGroup, user_effective_roles, user_group_membership
+from .dn import canonicalize_dn
+from .policy import get_policy
+from .session_claims import read_epochs, load_claims, build_claims, store_claims, parse_timestamp
 
 
 def get_user_roles(user_id):
     """
-    Get roles for a user based on their cached groups.
+    Get roles for a user from the materialized effective access table.
     
     Args:
         user_id: User ID
@@ -16,104 +19,247 @@ def get_user_roles(user_id):
         list: List of role names
     """
     from flask import current_app
-    from sqlalchemy import func
-    
-    user = User.query.get(user_id)
-    if not user:
-        current_app.logger.debug(f"User {user_id} not found for role lookup")
-        return []
-    
-    if not user.cached_groups:
-        current_app.logger.debug(f"User {user.uid} has no cached groups")
-        return []
-    
-    # Get all role mappings for user's groups
-    # Normalize group DNs (strip whitespace and handle various formats)
-    group_dns = []
-    for dn in user.cached_groups:
-        if dn:
-            # Normalize: strip whitespace, handle None/empty values
-            normalized = str(dn).strip()
-            if normalized:
-                group_dns.append(normalized)
-    
-    if not group_dns:
-        current_app.logger.debug(f"User {user.uid} has no valid group DNs after normalization")
-        return []
-    
-    current_app.logger.debug(f"User {user.uid} role lookup: checking {len(group_dns)} groups")
-    
-    # First, try exact match (case-sensitive)
-    groups = LDAPGroup.query.filter(LDAPGroup.dn.in_(group_dns)).all()
-    group_ids = [g.id for g in groups]
-    matched_dns = {g.dn for g in groups}
-    
-    # If we didn't match all groups, try case-insensitive matching for the rest
-    unmatched_dns = [dn for dn in group_dns if dn not in matched_dns]
-    
-    if unmatched_dns:
-        current_app.logger.debug(
-            f"User {user.uid}: {len(unmatched_dns)} groups not found with exact match, "
-            f"trying case-insensitive match"
-        )
-        
-        for cached_dn in unmatched_dns:
-            # Try case-insensitive match
-            case_insensitive = LDAPGroup.query.filter(
-                func.lower(LDAPGroup.dn) == func.lower(cached_dn)
-            ).first()
-            
-            if case_insensitive:
-                current_app.logger.info(
-                    f"User {user.uid}: Found group with case-insensitive match: "
-                    f"'{cached_dn}' -> '{case_insensitive.dn}'"
-                )
-                groups.append(case_insensitive)
-                group_ids.append(case_insensitive.id)
-            else:
-                current_app.logger.warning(
-                    f"User {user.uid}: Group DN not found in database: '{cached_dn}'"
-                )
-    
-    if not group_ids:
-        # Log detailed debugging info
-        all_groups_in_db = [g.dn for g in LDAPGroup.query.all()]
-        current_app.logger.warning(
-            f"User {user.uid} has groups in cached_groups but none found in DB. "
-            f"Cached groups ({len(group_dns)}): {group_dns[:3]}..., "
-            f"Groups in DB (sample): {all_groups_in_db[:3] if all_groups_in_db else 'None'}..."
-        )
-        return []
-    
-    # Get role mappings for matched groups
-    mappings = RoleMapping.query.filter(RoleMapping.ldap_group_id.in_(group_ids)).all()
-    role_ids = [m.role_id for m in mappings]
-    
-    if not role_ids:
-        # Log detailed info about why no roles were found
-        group_names = [g.cn or g.dn for g in groups]
-        current_app.logger.warning(
-            f"User {user.uid} has {len(groups)} matched groups but no role mappings. "
-            f"Group IDs: {group_ids}, Group names: {group_names}"
-        )
-        return []
     
-    roles = Role.query.filter(Role.id.in_(role_ids)).all()
+    roles = (
+        db.session.query(Role.name)
+        .join(user_effective_roles, user_effective_roles.c.role_id == Role.id)
+        .filter(user_effective_roles.c.user_id == user_id)
+        .all()
+    )
     role_names = [r.name for r in roles]
     
     current_app.logger.debug(
-        f"User {user.uid} role lookup: found {len(role_names)} roles: {role_names}"
+        f"User {user_id} role lookup: found {len(role_names)} roles: {role_names}"
     )
     
     return role_names
 
 
+def get_roles_for_users(user_ids=None):
+    """
+    Resolve roles for many users in a single query.
+    
+    Args:
+        user_ids: Iterable of user IDs, or None for every user
+    
+    Returns:
+        dict: user_id -> list of role names (users without roles are omitted)
+    """
+    query = (
+        db.session.query(user_effective_roles.c.user_id, Role.name)
+        .join(Role, Role.id == user_effective_roles.c.role_id)
+        .order_by(user_effective_roles.c.user_id, Role.name)
+    )
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        query = query.filter(user_effective_roles.c.user_id.in_(user_ids))
+    
+    roles_by_user = {}
+    for user_id, role_name in query:
+        roles_by_user.setdefault(user_id, []).append(role_name)
+    return roles_by_user
+
+
+def get_member_group_dns(user_id):
+    """
+    DNs of a user's groups, read from user_group_membership.
+    
+    This is the table user_effective_roles/sites are materialized from, so
+    roles resolved through the policy snapshot for these groups always match
+    get_user_roles().
+    
+    Args:
+        user_id: User ID
+    
+    Returns:
+        list: Group DNs
+    """
+    rows = db.session.execute(
+        db.select(LDAPGroup.dn)
+        .join(user_group_membership, user_group_membership.c.ldap_group_id == LDAPGroup.id)
+        .where(user_group_membership.c.user_id == user_id)
+        .order_by(LDAPGroup.dn)
+    )
+    return [dn for (dn,) in rows]
+
+
 def has_role(user_id, role_name):
     """Check if user has a specific role."""
     roles = get_user_roles(user_id)
     return role_name in roles
 
 
+class Principal:
+    """
+    The authenticated user for the current request.
+    
+    Built either from current session claims (no database access) or from a
+    narrow query on the users table. Roles are resolved from the in-memory
+    policy snapshot and the full User row is loaded on first use, both
+    memoized for the request.
+    """
+    
+    def __init__(self, id, uid, is_local_admin, group_dns=None, display_name=None,
+                 email=None, dn=None, last_login=None, roles=None):
+        self.id = id
+        self.uid = uid
+        self.is_local_admin = bool(is_local_admin)
+        self.display_name = display_name
+        self.email = email
+        self.dn = dn
+        self.last_login = last_login
+        self._group_dns = list(group_dns) if group_dns is not None else None
+        self._groups = None
+        self._roles = list(roles) if roles is not None else None
+        self._user = None
+    
+    @classmethod
+    def from_claims(cls, claims):
+        """Build a principal from session claims."""
+        return cls(
+            claims['user_id'], claims['uid'], claims['is_local_admin'],
+            group_dns=claims.get('groups'),
+            display_name=claims.get('display_name'),
+            email=claims.get('email'),
+            dn=claims.get('dn'),
+            last_login=parse_timestamp(claims.get('last_login')),
+            roles=claims.get('roles'),
+        )
+    
+    @property
+    def group_dns(self):
+        """LDAP group DNs (loaded if they were not embedded in the claims)."""
+        if self._group_dns is None:
+            self._group_dns = get_member_group_dns(self.id)
+        return self._group_dns
+    
+    @property
+    def groups(self):
+        """Canonical group DNs."""
+        if self._groups is None:
+            self._groups = frozenset(filter(None, (canonicalize_dn(dn) for dn in self.group_dns)))
+        return self._groups
+    
+    @property
+    def roles(self):
+        """Roles granted through LDAP group mappings (resolved from the policy snapshot)."""
+        if self._roles is None:
+            self._roles = sorted(get_policy().roles_for(self.groups))
+        return self._roles
+    
+    @property
+    def site_ids(self):
+        """IDs of sites mapped to the principal's groups (visibility not applied)."""
+        return get_policy().sites_for(self.groups)
+    
+    @property
+    def all_roles(self):
+        """Mapped roles plus the implicit 'admin' role for local admins."""
+        roles = list(self.roles)
+        if self.is_local_admin and 'admin' not in roles:
+            roles.append('admin')
+        return roles
+    
+    @property
+    def user(self):
+        """Full User record (loaded on first access)."""
+        if self._user is None:
+            self._user = User.query.get(self.id)
+        return self._user
+    
+    def has_any_role(self, *role_names):
+        """Check roles; local admins implicitly hold every role."""
+        if self.is_local_admin:
+            return True
+        return any(role in self.roles for role in role_names)
+
+
+def _load_principal(user_id, epochs):
+    """Load a principal from the database and re-issue session claims."""
+    row = (
+        db.session.query(
+            User.id, User.uid, User.is_local_admin, User.display_name,
+            User.email, User.dn, User.last_login, User.disabled
+        )
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        store_claims(None)
+        return None
+    
+    principal = Principal(
+        row.id, row.uid, row.is_local_admin,
+        display_name=row.display_name, email=row.email, dn=row.dn, last_login=row.last_login
+    )
+    if epochs is not None:
+        store_claims(build_claims(principal, epochs, disabled=row.disabled))
+    return None if row.disabled else principal
+
+
+def issue_session_claims(user):
+    """
+    Embed claims for a freshly logged-in user in the session.
+    
+    Args:
+        user: User record (committed)
+    """
+    epochs = read_epochs(user.id)
+    if epochs is None:
+        store_claims(None)
+        return
+    principal = Principal(
+        user.id, user.uid, user.is_local_admin,
+        display_name=user.display_name, email=user.email, dn=user.dn, last_login=user.last_login
+    )
+    store_claims(build_claims(principal, epochs, disabled=user.disabled))
+
+
+def get_current_principal():
+    """
+    Get the authenticated, enabled principal for this request.
+    
+    Current session claims are used when the revocation epochs in Redis
+    match; otherwise the user is loaded from the database. The lookup runs at
+    most once per request and is cached on flask.g (tagged with the request,
+    since an app context can outlive a request).
+    
+    Returns:
+        Principal or None
+    """
+    current_request = request._get_current_object()
+    cached = g.get('_principal')
+    if cached is not None and cached[0] is current_request:
+        return cached[1]
+    
+    principal = None
+    user_id = session.get('user_id')
+    if user_id:
+        epochs = read_epochs(user_id)
+        claims = load_claims(user_id, epochs)
+        if claims is not None:
+            principal = None if claims.get('disabled') else Principal.from_claims(claims)
+        else:
+            principal = _load_principal(user_id, epochs)
+    
+    g._principal = (current_request, principal)
+    return principal
+
+
+def require_login(f):
+    """Decorator to require an authenticated, enabled user."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not session.get('user_id'):
+            return jsonify({'error': 'Authentication required'}), 401
+        if get_current_principal() is None:
+            return jsonify({'error': 'User not found or disabled'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 def require_role(*role_names):
     """
     Decorator to require one of the specified roles.
@@ -126,21 +272,15 @@ def require_role(*role_names):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            user_id = session.get('user_id')
-            if not user_id:
+            if not session.get('user_id'):
                 return jsonify({'error': 'Authentication required'}), 401
             
-            user = User.query.get(user_id)
-            if not user or user.disabled:
+            principal = get_current_principal()
+            if principal is None:
                 return jsonify({'error': 'User not found or disabled'}), 401
             
-            # Check if user is local admin (bypasses role check)
-            if user.is_local_admin:
-                return f(*args, **kwargs)
-            
-            # Check roles
-            user_roles = get_user_roles(user_id)
-            if not any(role in user_roles for role in role_names):
+            # Local admins bypass the role check
+            if not principal.has_any_role(*role_names):
                 return jsonify({'error': 'Insufficient permissions'}), 403
             
             return f(*args, **kwargs)
@@ -151,4 +291,3 @@ def require_role(*role_names):
 def require_admin(f):
     """Decorator to require admin role."""
     return require_role('admin')(f)
-
@@ -0,0 +1,277 @@
+"""Global admin search over sites, users, LDAP groups and certificates.
+
+On PostgreSQL with pg_trgm, each type is searched with a trigram GIN index
+over its searchable columns (migration 023), which PostgreSQL keeps up to
+date on every write. Elsewhere (SQLite, or pg_trgm unavailable) an
+in-process trigram inverted index is built on first use; rows written
+through the ORM are marked stale on commit and re-read on the next search,
+and the whole index is rebuilt after SEARCH_INDEX_TTL seconds to pick up
+writes made by other processes or bulk statements.
+"""
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..db import db
+from ..models import Site, User, LDAPGroup, Certificate
+from .pagination import like_contains_pattern, LIKE_ESCAPE
+
+
+class _SearchType:
+    def __init__(self, model, columns, title, subtitle):
+        self.model = model
+        self.columns = columns  # Searchable columns (order must match the migration's index expression)
+        self.title = title  # Columns tried in order for the result title
+        self.subtitle = subtitle
+
+    def document(self, row):
+        text = ' '.join(str(getattr(row, c)) for c in self.columns if getattr(row, c))
+        title = next((getattr(row, c) for c in self.title if getattr(row, c)), None)
+        return text.lower(), title, getattr(row, self.subtitle)
+
+    def load_columns(self):
+        names = dict.fromkeys(('id',) + self.columns + self.title + (self.subtitle,))
+        return [getattr(self.model, name) for name in names]
+
+
+SEARCH_TYPES = {
+    'sites': _SearchType(Site, ('name', 'url', 'description', 'owner'), ('name',), 'url'),
+    'users': _SearchType(User, ('uid', 'display_name', 'email'), ('display_name', 'uid'), 'uid'),
+    'groups': _SearchType(LDAPGroup, ('cn', 'dn'), ('cn', 'dn'), 'dn'),
+    'certificates': _SearchType(Certificate, ('name',), ('name',), 'filename'),
+}
+_TYPE_BY_MODEL = {search_type.model: name for name, search_type in SEARCH_TYPES.items()}
+
+# Minimum share of query trigrams a result must contain, like pg_trgm's
+# word_similarity_threshold (substring matches always qualify)
+_MIN_SHARE = 0.6
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def trigrams(text):
+    """pg_trgm-style trigrams: per word, padded with two leading and one trailing space."""
+    grams = set()
+    for word in _WORD_PATTERN.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class MemoryIndex:
+    """Trigram inverted index over (type, id) documents."""
+
+    def __init__(self):
+        self.docs = {}  # (type, id) -> (text, title, subtitle, trigram count)
+        self.postings = {name: {} for name in SEARCH_TYPES}  # type -> trigram -> set of (type, id)
+        self.titles = {}  # lowercased title -> set of (type, id), for exact-match boosts
+        self.stale = set()  # (type, id) to re-read before the next search
+        self.built_at = None
+        self.lock = threading.Lock()
+
+    def add(self, key, document):
+        self.remove(key)
+        text, title, subtitle = document
+        grams = trigrams(text)
+        self.docs[key] = (text, title, subtitle, len(grams))
+        postings = self.postings[key[0]]
+        for gram in grams:
+            postings.setdefault(gram, set()).add(key)
+        if title:
+            self.titles.setdefault(title.lower(), set()).add(key)
+
+    def remove(self, key):
+        document = self.docs.pop(key, None)
+        if document is None:
+            return
+        postings = self.postings[key[0]]
+        for gram in trigrams(document[0]):
+            keys = postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del postings[gram]
+        if document[1]:
+            self.titles.get(document[1].lower(), set()).discard(key)
+
+    def build(self):
+        self.docs, self.titles, self.stale = {}, {}, set()
+        self.postings = {name: {} for name in SEARCH_TYPES}
+        for name, search_type in SEARCH_TYPES.items():
+            for row in db.session.execute(db.select(*search_type.load_columns()).execution_options(yield_per=5000)):
+                self.add((name, row.id), search_type.document(row))
+        self.built_at = time.monotonic()
+
+    def refresh_stale(self):
+        """Re-read rows written since the last search (one query per type)."""
+        stale, self.stale = self.stale, set()
+        by_type = {}
+        for name, row_id in stale:
+            by_type.setdefault(name, set()).add(row_id)
+        for name, ids in by_type.items():
+            search_type = SEARCH_TYPES[name]
+            rows = db.session.execute(
+                db.select(*search_type.load_columns()).where(search_type.model.id.in_(ids))
+            ).all()
+            for row in rows:
+                self.add((name, row.id), search_type.document(row))
+            for row_id in ids - {row.id for row in rows}:
+                self.remove((name, row_id))
+
+    def search(self, query, types, limit):
+        query_grams = trigrams(query)
+        needle = query.lower().strip()
+        if not query_grams:
+            return []
+
+        # Count shared trigrams per document (Counter.update over sets runs in C)
+        counts = Counter()
+        for name in types:
+            postings = self.postings[name]
+            for gram in query_grams:
+                keys = postings.get(gram)
+                if keys:
+                    counts.update(keys)
+
+        # Rank the best trigram matches plus exact title matches
+        candidates = {key for key, _ in counts.most_common(limit * 20)}
+        candidates.update(key for key in self.titles.get(needle, ()) if key[0] in types)
+
+        scored = []
+        for key in candidates:
+            text, title, subtitle, doc_grams = self.docs[key]
+            count = counts[key]
+            share = count / len(query_grams)
+            substring = needle in text
+            if share < _MIN_SHARE and not substring:
+                continue
+            # Share of the query found, plus a smaller weight for how much of the row it covers
+            score = share + 0.5 * count / max(doc_grams, 1)
+            if substring:
+                score += 1.0
+            if title and title.lower() == needle:
+                score += 1.0
+            scored.append((round(score, 4), key, title, subtitle))
+        return [
+            {'type': key[0], 'id': key[1], 'title': title, 'subtitle': subtitle, 'score': score}
+            for score, key, title, subtitle in heapq.nlargest(limit, scored, key=lambda r: (r[0], -r[1][1]))
+        ]
+
+
+def _memory_index():
+    index = current_app.extensions.get('hlspg_search_index')
+    if index is None:
+        index = current_app.extensions.setdefault('hlspg_search_index', MemoryIndex())
+    return index
+
+
+def invalidate_search_index():
+    """Force the in-process index to rebuild (after bulk writes that bypass the ORM)."""
+    index = current_app.extensions.get('hlspg_search_index')
+    if index is not None:
+        index.built_at = None
+
+
+def _search_expression(search_type):
+    """lower(coalesce(a, '') || ' ' || coalesce(b, '') ...), matching the trigram index."""
+    empty = db.literal_column("''")
+    space = db.literal_column("' '")
+    expression = None
+    for name in search_type.columns:
+        part = db.func.coalesce(getattr(search_type.model, name), empty)
+        expression = part if expression is None else expression.op('||')(space).op('||')(part)
+    return db.func.lower(expression)
+
+
+def _trigram_available():
+    state = current_app.extensions.get('hlspg_search_trigram')
+    if state is None:
+        state = False
+        if db.engine.dialect.name == 'postgresql':
+            try:
+                state = db.session.execute(
+                    db.text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ).scalar() is not None
+            except Exception:
+                db.session.rollback()
+        current_app.extensions['hlspg_search_trigram'] = state
+    return state
+
+
+def _search_trigram(query, types, limit):
+    needle = query.lower().strip()
+    pattern = like_contains_pattern(needle)
+    results = []
+    for name in types:
+        search_type = SEARCH_TYPES[name]
+        expression = _search_expression(search_type)
+        score = (
+            db.func.word_similarity(needle, expression)
+            + db.case((expression.like(pattern, escape=LIKE_ESCAPE), 1.0), else_=0.0)
+        ).label('score')
+        stmt = (
+            db.select(*search_type.load_columns(), score)
+            .where(db.or_(expression.like(pattern, escape=LIKE_ESCAPE), db.literal(needle).op('<%')(expression)))
+            .order_by(score.desc(), search_type.model.id)
+            .limit(limit)
+        )
+        for row in db.session.execute(stmt):
+            _, title, subtitle = search_type.document(row)
+            results.append({'type': name, 'id': row.id, 'title': title, 'subtitle': subtitle,
+                            'score': round(float(row.score), 4)})
+    return heapq.nlargest(limit, results, key=lambda r: (r['score'], -r['id']))
+
+
+def search(query, types=None, limit=20):
+    """
+    Ranked search across entity types.
+
+    Args:
+        query: Search text
+        types: Iterable of SEARCH_TYPES keys (default: all)
+        limit: Maximum number of results overall
+
+    Returns:
+        list: dicts with type, id, title, subtitle and score, best first
+    """
+    types = [t for t in (types or SEARCH_TYPES) if t in SEARCH_TYPES]
+    if not query.strip() or not types:
+        return []
+    if _trigram_available():
+        return _search_trigram(query, types, limit)
+
+    index = _memory_index()
+    with index.lock:
+        ttl = current_app.config.get('SEARCH_INDEX_TTL', 300)
+        if index.built_at is None or time.monotonic() - index.built_at > ttl:
+            index.build()
+        elif index.stale:
+            index.refresh_stale()
+        return index.search(query, set(types), limit)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_search_writes(session, flush_context):
+    """Remember indexed rows written in this transaction."""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = _TYPE_BY_MODEL.get(type(obj))
+        if name is not None and obj.id is not None:
+            session.info.setdefault('search_written', set()).add((name, obj.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _mark_search_stale(session):
+    written = session.info.pop('search_written', None)
+    if written and has_app_context():
+        index = current_app.extensions.get('hlspg_search_index')
+        if index is not None:
+            with index.lock:
+                index.stale.update(written)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_search_writes(session):
+    session.info.pop('search_written', None)
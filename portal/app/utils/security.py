@@ -2,11 +2,13 @@
 import bcrypt
 import redis
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, session
 from datetime import timedelta
 from cryptography.fernet import Fernet
 import base64
 import hashlib
+import math
+import threading
 
 
 def hash_password(password):
@@ -52,63 +54,252 @@ def decrypt_password(encrypted_password):
         raise
 
 
+_redis_lock = threading.Lock()
+
+# 'user' limits signed-in users by user ID (anonymous callers by IP)
+RATE_LIMIT_SCOPES = ('ip', 'user')
+
+# Sliding-window counter: the previous fixed window's count, weighted by how
+# much of it still overlaps the sliding window, plus the current window's.
+# Both counts live in one hash (fields are window numbers) so the check and
+# the increment are a single atomic round trip. Time is read from Redis so
+# every worker agrees on window boundaries.
+#
+# KEYS[1] = limit key; ARGV = limit, period (seconds)
+# Returns {allowed (0/1), remaining, retry_after_ms}
+_SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local window = math.floor(now / period)
+local elapsed = now - window * period
+local counts = redis.call('HMGET', KEYS[1], window, window - 1)
+local current = tonumber(counts[1]) or 0
+local previous = tonumber(counts[2]) or 0
+local count = previous * (period - elapsed) / period + current
+
+if count + 1 > limit then
+    local wait
+    if current + 1 <= limit and previous > 0 then
+        wait = period * (1 - (limit - 1 - current) / previous) - elapsed
+    else
+        wait = period - elapsed
+        if current > 0 then
+            wait = wait + math.max(0, period * (1 - (limit - 1) / current))
+        end
+    end
+    return {0, 0, math.ceil(wait * 1000)}
+end
+
+redis.call('HINCRBY', KEYS[1], window, 1)
+redis.call('HDEL', KEYS[1], window - 2)
+redis.call('EXPIRE', KEYS[1], period * 2)
+return {1, math.floor(limit - count - 1), 0}
+"""
+
+
 def get_redis_client():
-    """Get Redis client from config."""
-    redis_url = current_app.config.get('REDIS_URL', 'redis://redis:6379/0')
-    return redis.from_url(redis_url, decode_responses=True)
+    """
+    Get the process-wide Redis client for this app.
+    
+    All callers share one connection pool (created on first use, sized by
+    REDIS_MAX_CONNECTIONS); redis-py recreates it in forked workers.
+    """
+    client = current_app.extensions.get('hlspg_redis')
+    if client is None:
+        with _redis_lock:
+            client = current_app.extensions.get('hlspg_redis')
+            if client is None:
+                config = current_app.config
+                pool = redis.ConnectionPool.from_url(
+                    config.get('REDIS_URL', 'redis://redis:6379/0'),
+                    decode_responses=True,
+                    max_connections=config.get('REDIS_MAX_CONNECTIONS', 50),
+                    socket_timeout=config.get('REDIS_SOCKET_TIMEOUT', 5),
+                    socket_connect_timeout=config.get('REDIS_SOCKET_TIMEOUT', 5),
+                    health_check_interval=30,
+                )
+                client = redis.Redis(connection_pool=pool)
+                current_app.extensions['hlspg_redis'] = client
+    return client
 
 
-def rate_limit(max_requests=None, period=None, key_func=None):
+def parse_rate_limits(value):
     """
-    Rate limiting decorator using Redis.
+    Parse per-route rate limit overrides.
     
     Args:
-        max_requests: Maximum requests allowed
-        period: Time period in seconds
-        key_func: Function to generate rate limit key (default: IP address)
+        value: "endpoint=requests/period[/scope],..." (scope: ip or user),
+            e.g. "auth.login=5/60/ip,api.bootstrap=120/60/user"
+    
+    Returns:
+        dict: endpoint -> (requests, period, scope or None)
+    
+    Raises:
+        ValueError: On a malformed entry
     """
+    limits = {}
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        endpoint, _, spec = entry.partition('=')
+        parts = spec.strip().split('/')
+        if not endpoint.strip() or len(parts) not in (2, 3):
+            raise ValueError(f"Invalid rate limit '{entry}' (expected endpoint=requests/period[/scope])")
+        scope = parts[2].strip() if len(parts) == 3 else None
+        if scope is not None and scope not in RATE_LIMIT_SCOPES:
+            raise ValueError(f"Invalid rate limit scope '{scope}' in '{entry}'")
+        limits[endpoint.strip()] = (int(parts[0]), int(parts[1]), scope)
+    return limits
+
+
+def _rate_limit_overrides():
+    """RATE_LIMITS parsed once per app."""
+    overrides = current_app.extensions.get('hlspg_rate_limits')
+    if overrides is None:
+        try:
+            overrides = parse_rate_limits(current_app.config.get('RATE_LIMITS', ''))
+        except ValueError as e:
+            current_app.logger.error(f"Ignoring RATE_LIMITS: {str(e)}")
+            overrides = {}
+        current_app.extensions['hlspg_rate_limits'] = overrides
+    return overrides
+
+
+def _rate_limit_subject(scope):
+    """Identify the caller for a scope ('user' falls back to the IP when anonymous)."""
+    user_id = session.get('user_id')
+    if scope == 'user' and user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def check_rate_limit(key, limit, period):
+    """
+    Count a request against a sliding-window limit in one atomic round trip.
+    
+    Args:
+        key: Redis key for the caller and route
+        limit: Requests allowed per period
+        period: Window length in seconds
+    
+    Returns:
+        tuple: (allowed, remaining, retry_after seconds)
+    
+    Raises:
+        redis.RedisError: If Redis is unavailable
+    """
+    script = current_app.extensions.get('hlspg_rate_limit_script')
+    if script is None:
+        script = get_redis_client().register_script(_SLIDING_WINDOW_SCRIPT)
+        current_app.extensions['hlspg_rate_limit_script'] = script
+    allowed, remaining, retry_after_ms = script(keys=[key], args=[limit, period])
+    if allowed:
+        return True, int(remaining), 0
+    return False, 0, max(1, math.ceil(int(retry_after_ms) / 1000))
+
+
+def rate_limit(max_requests=None, period=None, key_func=None, scope='ip'):
+    """
+    Rate limiting decorator using a Redis sliding window.
+    
+    RATE_LIMITS can override the limit (and scope) per endpoint. Decisions
+    are counted in the hlspg_rate_limit_decisions_total metric. Requests are
+    allowed if Redis is unavailable (fail open).
+    
+    Args:
+        max_requests: Maximum requests allowed (default: RATE_LIMIT_REQUESTS)
+        period: Time period in seconds (default: RATE_LIMIT_PERIOD)
+        key_func: Function to generate rate limit key (default: route and scope subject)
+        scope: Who a limit applies to - 'ip' or 'user' (the signed-in user, else the IP)
+    """
+    if scope not in RATE_LIMIT_SCOPES:
+        raise ValueError(f"Invalid rate limit scope: {scope}")
+    
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not max_requests:
-                max_requests_val = current_app.config.get('RATE_LIMIT_REQUESTS', 10)
-            else:
-                max_requests_val = max_requests
+            from ..api.metrics import rate_limit_decisions
             
-            if not period:
-                period_val = current_app.config.get('RATE_LIMIT_PERIOD', 60)
-            else:
-                period_val = period
+            endpoint = request.endpoint or f.__name__
+            max_requests_val = max_requests or current_app.config.get('RATE_LIMIT_REQUESTS', 10)
+            period_val = period or current_app.config.get('RATE_LIMIT_PERIOD', 60)
+            scope_val = scope
+            override = _rate_limit_overrides().get(endpoint)
+            if override:
+                max_requests_val, period_val, scope_val = override[0], override[1], override[2] or scope
             
-            if not key_func:
-                key = f"rate_limit:{request.remote_addr}"
-            else:
+            if key_func:
                 key = key_func()
+            else:
+                key = f"rate_limit:{endpoint}:{_rate_limit_subject(scope_val)}"
             
             try:
-                redis_client = get_redis_client()
-                current = redis_client.get(key)
-                
-                if current and int(current) >= max_requests_val:
-                    return jsonify({
-                        'error': 'Rate limit exceeded',
-                        'retry_after': period_val
-                    }), 429
-                
-                pipe = redis_client.pipeline()
-                pipe.incr(key)
-                pipe.expire(key, period_val)
-                pipe.execute()
-                
+                allowed, remaining, retry_after = check_rate_limit(key, max_requests_val, period_val)
             except Exception as e:
                 current_app.logger.warning(f"Rate limiting check failed: {str(e)}")
+                rate_limit_decisions.labels(endpoint=endpoint, result='error').inc()
                 # Continue on Redis failure (fail open)
+                return f(*args, **kwargs)
             
-            return f(*args, **kwargs)
+            if not allowed:
+                rate_limit_decisions.labels(endpoint=endpoint, result='limited').inc()
+                response = jsonify({
+                    'error': 'Rate limit exceeded',
+                    'retry_after': retry_after
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                response.headers['X-RateLimit-Limit'] = str(max_requests_val)
+                response.headers['X-RateLimit-Remaining'] = '0'
+                return response
+            
+            rate_limit_decisions.labels(endpoint=endpoint, result='allowed').inc()
+            response = current_app.make_response(f(*args, **kwargs))
+            response.headers['X-RateLimit-Limit'] = str(max_requests_val)
+            response.headers['X-RateLimit-Remaining'] = str(max(remaining, 0))
+            return response
         return decorated_function
     return decorator
 
 
+def proxied_url_validator():
+    """
+    Build a validator for many URLs (one WebAppConfig query, cached host decisions).
+    
+    Returns:
+        callable: url -> bool, with the same rules as validate_proxied_url()
+    """
+    from urllib.parse import urlparse
+    from ..models import WebAppConfig
+    
+    try:
+        config = WebAppConfig.query.filter_by(id=1).first()
+    except Exception:
+        return lambda url: False  # Fail closed
+    if not config or not config.proxy_host_validation_enabled:
+        # Validation disabled - allow all
+        return lambda url: True
+    
+    allowed_hosts = current_app.config.get('ALLOWED_PROXIED_HOSTS', [])
+    exact = {h for h in allowed_hosts if not h.startswith('*.')}
+    domains = tuple(h[2:] for h in allowed_hosts if h.startswith('*.'))
+    decisions = {}
+    
+    def validate(url):
+        try:
+            host = urlparse(url).netloc.split(':')[0]  # Remove port if present
+        except Exception:
+            return False
+        if host not in decisions:
+            decisions[host] = host in exact or any(host == d or host.endswith('.' + d) for d in domains)
+        return decisions[host]
+    
+    return validate
+
+
 def validate_proxied_url(url):
     """
     Validate that a URL is in the allowed proxied hosts list.
@@ -120,33 +311,5 @@ def validate_proxied_url(url):
     Returns:
         bool: True if allowed, False otherwise
     """
-    from urllib.parse import urlparse
-    from ..models import WebAppConfig
-    
-    try:
-        # Check if proxy host validation is enabled
-        config = WebAppConfig.query.filter_by(id=1).first()
-        if not config or not config.proxy_host_validation_enabled:
-            # Validation disabled - allow all
-            return True
-        
-        parsed = urlparse(url)
-        host = parsed.netloc.split(':')[0]  # Remove port if present
-        
-        allowed_hosts = current_app.config.get('ALLOWED_PROXIED_HOSTS', [])
-        
-        for allowed in allowed_hosts:
-            if allowed.startswith('*.'):
-                # Wildcard subdomain match
-                domain = allowed[2:]
-                if host.endswith('.' + domain) or host == domain:
-                    return True
-            elif host == allowed:
-                return True
-        
-        return False
-    except Exception:
-        # On error, fail closed if validation is enabled
-        # But we can't check the config in exception handler, so return False
-        return False
+    return proxied_url_validator()(url)
 
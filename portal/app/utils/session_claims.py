@@ -0,0 +1,133 @@
+"""Signed session claims with revocation epochs.
+
+At login the user's identity, roles and a `disabled` flag are embedded in the
+session together with two epochs:
+
+- a global revocation epoch: the policy version of the last change to role
+  mappings (bump_policy_version(revoke_sessions=True)); site and site-group
+  changes do not touch it, since claims carry no site access
+- a per-user epoch (bumped by bump_user_epoch() when a user is disabled,
+  edited, has their password reset or their group memberships change)
+
+On each request a single Redis MGET reads both epochs. If they match the
+claims, the principal is built from the session without touching the
+database; otherwise (or when Redis is unavailable) it is reloaded from the
+database and the claims are re-issued. Roles in re-issued claims come from
+a policy snapshot at least as new as the revocation epoch, so a worker that
+has not yet seen the invalidation for a role change cannot store stale roles
+under the new epoch.
+"""
+from datetime import datetime
+from flask import current_app, session
+from .policy import REVOCATION_EPOCH_KEY, get_policy
+
+SESSION_CLAIMS_KEY = 'claims'
+USER_EPOCH_KEY_PREFIX = 'hlspg:user_epoch:'
+
+
+def _user_epoch_key(user_id):
+    return f"{USER_EPOCH_KEY_PREFIX}{user_id}"
+
+
+def read_epochs(user_id):
+    """
+    Read the global and per-user revocation epochs in one round trip.
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        list: [global_epoch, user_epoch], or None if Redis is unavailable
+    """
+    from .security import get_redis_client
+    try:
+        values = get_redis_client().mget(REVOCATION_EPOCH_KEY, _user_epoch_key(user_id))
+        return [int(v or 0) for v in values]
+    except Exception as e:
+        current_app.logger.debug(f"Session epoch lookup failed: {str(e)}")
+        return None
+
+
+def bump_user_epoch(user_id):
+    """
+    Invalidate session claims issued to a user. Call after committing the change.
+
+    The user's realtime event connections stop receiving events as well.
+
+    Args:
+        user_id: User ID
+    """
+    from .security import get_redis_client
+    from .events import close_user_rooms
+    try:
+        get_redis_client().incr(_user_epoch_key(user_id))
+    except Exception as e:
+        current_app.logger.warning(f"User epoch bump failed for user {user_id}: {str(e)}")
+    close_user_rooms(user_id)
+
+
+def build_claims(principal, epochs, disabled=False):
+    """
+    Serialize a principal into session claims.
+
+    Group DNs are omitted (and loaded on demand) when there are more than
+    SESSION_CLAIMS_MAX_GROUPS of them; the session is deserialized and saved
+    on every request, so a user in hundreds of groups would otherwise pay for
+    a large session payload each time.
+
+    Args:
+        principal: Principal to serialize
+        epochs: [global_epoch, user_epoch] from read_epochs()
+        disabled: Whether the user is disabled
+
+    Returns:
+        dict: JSON-serializable claims
+    """
+    group_dns = principal.group_dns
+    if len(group_dns) > current_app.config.get('SESSION_CLAIMS_MAX_GROUPS', 40):
+        group_dns = None
+    return {
+        'user_id': principal.id,
+        'uid': principal.uid,
+        'display_name': principal.display_name,
+        'email': principal.email,
+        'dn': principal.dn,
+        'last_login': principal.last_login.isoformat() if principal.last_login else None,
+        'is_local_admin': principal.is_local_admin,
+        'disabled': bool(disabled),
+        'roles': sorted(get_policy(min_version=epochs[0]).roles_for(principal.groups)),
+        'groups': group_dns,
+        'epochs': list(epochs),
+    }
+
+
+def load_claims(user_id, epochs):
+    """
+    Return the session claims if they belong to user_id and are current.
+
+    Args:
+        user_id: User ID from the session
+        epochs: [global_epoch, user_epoch] from read_epochs(), or None
+
+    Returns:
+        dict or None
+    """
+    if epochs is None:
+        return None
+    claims = session.get(SESSION_CLAIMS_KEY)
+    if not claims or claims.get('user_id') != user_id or claims.get('epochs') != list(epochs):
+        return None
+    return claims
+
+
+def store_claims(claims):
+    """Write claims into the session (pass None to drop them)."""
+    if claims is None:
+        session.pop(SESSION_CLAIMS_KEY, None)
+    else:
+        session[SESSION_CLAIMS_KEY] = claims
+
+
+def parse_timestamp(value):
+    """Parse an ISO timestamp stored in claims."""
+    return datetime.fromisoformat(value) if value else None
@@ -0,0 +1,350 @@
+"""Server-side site icon fetching and disk cache.
+
+Icons are discovered from each site's page (<link rel="icon">,
+apple-touch-icon) with /favicon.ico as the fallback, fetched in the
+background, normalized to a square PNG of SITE_ICON_SIZE pixels (when Pillow
+is installed; otherwise PNG/ICO/GIF/JPEG/WebP bytes are stored as fetched)
+and written to SITE_ICON_CACHE_DIR under their content hash. Content-hashed
+files never change, so they are served with immutable caching headers.
+
+Per site, a small metadata file records the icon hash and the
+Site.updated_at it was fetched for; when the site is edited the icon is
+re-fetched lazily on its next request, while the previous icon is served in
+the meantime. The cache is trimmed to SITE_ICON_CACHE_MAX_BYTES by evicting
+the least recently served files. Every worker shares the same directory.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+try:
+    from PIL import Image
+except ImportError:  # Icons are cached as fetched
+    Image = None
+
+ICON_NAME_PATTERN = re.compile(r'^[0-9a-f]{32}\.(png|ico|gif|jpg|webp)$')
+ICON_MIMETYPES = {
+    'png': 'image/png',
+    'ico': 'image/x-icon',
+    'gif': 'image/gif',
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+_MAX_PAGE_BYTES = 256 * 1024
+_MAX_ICON_BYTES = 1024 * 1024
+_MAX_ICON_PIXELS = 4096 * 4096
+# Refresh an icon file's mtime (its LRU position) at most this often
+_TOUCH_INTERVAL = 3600
+_REL_PREFERENCE = {'apple-touch-icon': 2, 'apple-touch-icon-precomposed': 2, 'icon': 1, 'shortcut icon': 1}
+
+
+def sniff_image_type(data):
+    """Return the ICON_MIMETYPES key for raster image bytes, or None."""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if data.startswith(b'\x00\x00\x01\x00'):
+        return 'ico'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class _IconLinkParser(HTMLParser):
+    """Collect (preference, declared size, href) for icon links in a page head."""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.done = True
+        if tag != 'link' or self.done:
+            return
+        attrs = dict(attrs)
+        rel = ' '.join((attrs.get('rel') or '').lower().split())
+        href = attrs.get('href')
+        if rel not in _REL_PREFERENCE or not href:
+            return
+        # Pillow cannot rasterize SVG
+        if (attrs.get('type') or '').lower() == 'image/svg+xml' or href.lower().split('?')[0].endswith('.svg'):
+            return
+        size = 0
+        for token in (attrs.get('sizes') or '').lower().split():
+            width = token.partition('x')[0]
+            if width.isdigit():
+                size = max(size, int(width))
+        self.links.append((_REL_PREFERENCE[rel], size, href))
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.done = True
+
+
+def _ssl_context(verify_tls):
+    if verify_tls:
+        return None
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _fetch(url, timeout, context, limit):
+    """GET a URL, returning (final URL, content type, body) or None; bodies over `limit` are rejected."""
+    request = urllib.request.Request(url, headers={'User-Agent': 'hlspg-icon-fetcher'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout, context=context) as response:
+            body = response.read(limit + 1)
+            if len(body) > limit:
+                return None
+            return response.geturl(), response.headers.get_content_type(), body
+    except (urllib.error.URLError, socket.timeout, OSError, ValueError):
+        return None
+
+
+def icon_candidates(page_url, html, size):
+    """
+    Icon URLs for a page, best first.
+
+    Declared icons at least `size` pixels wide come first (smallest such
+    first), then smaller or unsized ones, then /favicon.ico.
+    """
+    parser = _IconLinkParser()
+    try:
+        parser.feed(html)
+    except Exception:
+        pass
+
+    def rank(link):
+        preference, declared, _ = link
+        if declared >= size:
+            return (0, declared, -preference)
+        return (1, -declared, -preference)
+
+    urls = [urljoin(page_url, href) for _, _, href in sorted(parser.links, key=rank)]
+    urls.append(urljoin(page_url, '/favicon.ico'))
+    return list(dict.fromkeys(urls))
+
+
+def normalize_icon(data, size):
+    """
+    Convert icon bytes to a centered size x size PNG.
+
+    Returns:
+        tuple: (extension, bytes), or None if the data is not a usable image
+    """
+    kind = sniff_image_type(data)
+    if kind is None:
+        return None
+    if Image is None:
+        return kind, data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width * image.height > _MAX_ICON_PIXELS:
+                return None
+            image = image.convert('RGBA')
+            image.thumbnail((size, size), Image.LANCZOS)
+            canvas = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+            canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2))
+            output = io.BytesIO()
+            canvas.save(output, 'PNG', optimize=True)
+            return 'png', output.getvalue()
+    except Exception:
+        return None
+
+
+def _version(updated_at):
+    return updated_at.isoformat() if updated_at else ''
+
+
+class IconCache:
+    """
+    Content-addressed icon files plus per-site metadata in one directory.
+
+    Args:
+        directory: Cache directory (created on first write)
+        max_bytes: Total size of icon files kept before LRU eviction
+        size: Normalized icon edge length in pixels
+        timeout: Seconds per HTTP request
+        verify_tls: Verify HTTPS certificates
+        retry_after: Seconds before retrying a site whose fetch failed
+        concurrency: Background fetch threads
+        logger: Logger for background fetch failures
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, size=64, timeout=5,
+                 verify_tls=False, retry_after=3600, concurrency=4, logger=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self.timeout = timeout
+        self.verify_tls = verify_tls
+        self.retry_after = retry_after
+        self.concurrency = concurrency
+        self.logger = logger
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_app(cls, app):
+        config = app.config
+        return cls(
+            config['SITE_ICON_CACHE_DIR'],
+            max_bytes=config.get('SITE_ICON_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+            size=config.get('SITE_ICON_SIZE', 64),
+            timeout=config.get('SITE_ICON_FETCH_TIMEOUT', 5),
+            verify_tls=config.get('SITE_ICON_VERIFY_TLS', False),
+            retry_after=config.get('SITE_ICON_RETRY_AFTER', 3600),
+            concurrency=config.get('SITE_ICON_CONCURRENCY', 4),
+            logger=app.logger,
+        )
+
+    def icon_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _meta_path(self, site_id):
+        return os.path.join(self.directory, 'sites', f'{int(site_id)}.json')
+
+    def _read_meta(self, site_id):
+        try:
+            with open(self._meta_path(site_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, site_id, updated_at):
+        """
+        Current icon file name for a site.
+
+        Returns:
+            tuple: (file name or None, needs_refresh)
+        """
+        meta = self._read_meta(site_id)
+        if meta is None:
+            return None, True
+        name = meta.get('icon')
+        if name and not os.path.exists(self.icon_path(name)):
+            return None, True  # Evicted
+        if meta.get('version') != _version(updated_at):
+            return name, True
+        if name is None:
+            return None, time.time() - meta.get('fetched_at', 0) > self.retry_after
+        return name, False
+
+    def touch(self, name):
+        """Mark an icon file as recently served (its mtime is the LRU clock)."""
+        path = self.icon_path(name)
+        try:
+            if time.time() - os.path.getmtime(path) > _TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def fetch(self, url):
+        """
+        Discover and download the best icon for a site URL.
+
+        Returns:
+            tuple: (extension, normalized bytes), or None if none was usable
+        """
+        context = _ssl_context(self.verify_tls)
+        page = _fetch(url, self.timeout, context, _MAX_PAGE_BYTES)
+        if page is not None and page[1] in ('text/html', 'application/xhtml+xml'):
+            page_url, html = page[0], page[2].decode('utf-8', errors='replace')
+        else:
+            page_url, html = url, ''
+        for candidate in icon_candidates(page_url, html, self.size):
+            fetched = _fetch(candidate, self.timeout, context, _MAX_ICON_BYTES)
+            if fetched is None:
+                continue
+            icon = normalize_icon(fetched[2], self.size)
+            if icon is not None:
+                return icon
+        return None
+
+    def refresh(self, site_id, url, updated_at):
+        """Fetch and store a site's icon now; returns the icon file name or None."""
+        icon = self.fetch(url)
+        name = None
+        if icon is not None:
+            extension, data = icon
+            name = f'{hashlib.sha256(data).hexdigest()[:32]}.{extension}'
+            path = self.icon_path(name)
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                self._write_atomic(path, data)
+        meta = {'icon': name, 'version': _version(updated_at), 'fetched_at': int(time.time())}
+        self._write_atomic(self._meta_path(site_id), json.dumps(meta).encode('utf-8'))
+        if name is not None:
+            self.evict()
+        return name
+
+    def schedule(self, site_id, url, updated_at):
+        """Refresh a site's icon on the background pool (once at a time per site)."""
+        with self._lock:
+            if site_id in self._pending:
+                return
+            self._pending.add(site_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='hlspg-icons')
+        future = self._executor.submit(self.refresh, site_id, url, updated_at)
+        future.add_done_callback(lambda f: self._finished(site_id, f))
+
+    def _finished(self, site_id, future):
+        with self._lock:
+            self._pending.discard(site_id)
+        error = future.exception()
+        if error is not None and self.logger is not None:
+            self.logger.warning(f"Icon refresh for site {site_id} failed: {str(error)}")
+
+    def evict(self):
+        """Delete least recently served icons until the cache fits max_bytes."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.is_file() and ICON_NAME_PATTERN.match(entry.name)]
+        except OSError:
+            return
+        stats = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries]
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def get_icon_cache(app):
+    cache = app.extensions.get('hlspg_site_icons')
+    if cache is None:
+        cache = app.extensions.setdefault('hlspg_site_icons', IconCache.from_app(app))
+    return cache
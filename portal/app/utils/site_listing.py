@@ -0,0 +1,122 @@
+"""Filtering, sorting, keyset pagination and serialization for site listings."""
+from ..db import db
+from ..models import Site
+from .pagination import (
+    parse_sort, parse_limit, keyset_paginate, estimate_count, like_contains_pattern, LIKE_ESCAPE,
+)
+from .site_tokens import get_resolved_tokens
+
+# Sort name -> ordering columns (unique id last); each is backed by an index
+SITE_SORTS = {
+    'name': ('name', 'id'),
+    'created_at': ('created_at', 'id'),
+    'id': ('id',),
+}
+DEFAULT_SITE_SORT = 'name'
+
+
+def _truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def apply_site_filters(query, args):
+    """
+    Apply name/owner/access_method/visible filters from request args.
+
+    Args:
+        query: Site query
+        args: Request args (name: substring, owner: exact (case-insensitive),
+            access_method: e.g. "SSH", visible: true/false)
+
+    Returns:
+        tuple: (query, filtered) where filtered tells whether any filter applied
+    """
+    filtered = False
+
+    name = (args.get('name') or '').strip()
+    if name:
+        query = query.filter(Site.name.ilike(like_contains_pattern(name), escape=LIKE_ESCAPE))
+        filtered = True
+
+    owner = (args.get('owner') or '').strip()
+    if owner:
+        query = query.filter(db.func.lower(Site.owner) == owner.lower())
+        filtered = True
+
+    access_method = (args.get('access_method') or '').strip()
+    if access_method:
+        # access_methods is a JSON list; match the serialized element
+        query = query.filter(
+            db.cast(Site.access_methods, db.Text).like(like_contains_pattern(f'"{access_method}"'), escape=LIKE_ESCAPE)
+        )
+        filtered = True
+
+    visible = args.get('visible')
+    if visible not in (None, ''):
+        if _truthy(visible):
+            query = query.filter(Site.visible == True)
+        else:
+            query = query.filter(db.or_(Site.visible == False, Site.visible.is_(None)))
+        filtered = True
+
+    return query, filtered
+
+
+def list_sites_page(query, args, unfiltered_total):
+    """
+    Filter, sort and paginate a site query.
+
+    Without a `limit` argument every matching site is returned (the behaviour
+    existing clients rely on); with one, `next_cursor` points at the next page.
+
+    Args:
+        query: Base Site query (e.g. already restricted to accessible sites)
+        args: Request args (filters plus sort, limit, cursor)
+        unfiltered_total: Cached/known count of `query` without filters, or
+            None to estimate it
+
+    Returns:
+        tuple: (sites, meta dict with next_cursor and total_estimate)
+
+    Raises:
+        PaginationError: On invalid sort, limit or cursor
+    """
+    sort, fields, descending = parse_sort(args.get('sort'), SITE_SORTS, DEFAULT_SITE_SORT)
+    limit = parse_limit(args.get('limit'))
+
+    query, filtered = apply_site_filters(query, args)
+    total = estimate_count(query) if filtered or unfiltered_total is None else unfiltered_total
+
+    sites, next_cursor = keyset_paginate(
+        query, Site, sort, fields, descending, cursor=args.get('cursor'), limit=limit
+    )
+    return sites, {'next_cursor': next_cursor, 'total_estimate': total, 'sort': sort}
+
+
+def serialize_user_site(s):
+    """Site as returned to portal users by /api/sites (and in realtime events)."""
+    resolved = get_resolved_tokens(s)
+    return {
+        'id': s.id,
+        'name': s.name,
+        'url': s.url,
+        'description': s.description,
+        'health_url': s.health_url,
+        'access_methods': s.access_methods or [],
+        'proxy_url': resolved['proxy_url'],
+        'sign_on_method': s.sign_on_method,
+        'console_enabled': s.console_enabled or False,
+        'console_type': s.console_type,
+        'console_url': resolved['console_url'],
+        'ssh_path': s.ssh_path,
+        'inline_web_url': resolved['inline_web_url'],
+        'inline_ssh_url': resolved['inline_ssh_url'],
+        'inline_vnc_url': resolved['inline_vnc_url'],
+        'inline_proxy_mode': s.inline_proxy_mode,
+        'inline_proxy_auth': s.inline_proxy_auth,
+        'inline_proxy_instructions': s.inline_proxy_instructions,
+        'inline_proxy_instructions_resolved': resolved['inline_proxy_instructions'],
+        'requires_user_credential': s.requires_user_credential or False,
+        'required_credential_type': s.required_credential_type,
+        'inline_console_height': s.inline_console_height
+    }
@@ -1,9 +1,27 @@
 """Utility helpers for resolving site token placeholders."""
 import re
+import threading
+from functools import lru_cache
 
 
 TOKEN_PATTERN = re.compile(r"\$\{([^}]+)\}")
 
+# Site fields that may contain ${TOKEN} placeholders
+TEMPLATED_FIELDS = (
+    'proxy_url',
+    'console_url',
+    'inline_web_url',
+    'inline_ssh_url',
+    'inline_vnc_url',
+    'inline_proxy_instructions',
+)
+
+# Per-site resolved values keyed by (site id, updated_at), for sites whose
+# resolved_tokens column has not been populated yet
+_resolved_cache = {}
+_resolved_cache_lock = threading.Lock()
+_RESOLVED_CACHE_SIZE = 4096
+
 
 def _token_map(site):
     return {
@@ -21,16 +39,100 @@ def _token_map(site):
     }
 
 
-def resolve_site_tokens(value, site):
+@lru_cache(maxsize=2048)
+def compile_template(value):
+    """
+    Parse a template into segments.
+
+    Args:
+        value: Template string
+
+    Returns:
+        tuple or None: Alternating (literal, token_key, raw_placeholder) parts,
+            or None if the string has no placeholders
+    """
+    if '${' not in value:
+        return None
+    segments = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(value):
+        if match.start() > position:
+            segments.append((value[position:match.start()], None, None))
+        segments.append((None, match.group(1).strip().upper(), match.group(0)))
+        position = match.end()
+    if position < len(value):
+        segments.append((value[position:], None, None))
+    return tuple(segments)
+
+
+def _render(segments, token_values):
+    parts = []
+    for literal, key, raw in segments:
+        if key is None:
+            parts.append(literal)
+        else:
+            parts.append(token_values.get(key, raw))
+    return ''.join(parts)
+
+
+def resolve_site_tokens(value, site, token_values=None):
     """Replace ${TOKEN} placeholders with site attributes."""
     if not isinstance(value, str):
         return value
 
-    token_values = _token_map(site)
+    segments = compile_template(value)
+    if segments is None:
+        return value
+
+    return _render(segments, token_values if token_values is not None else _token_map(site))
+
+
+def compute_resolved_tokens(site):
+    """
+    Resolve every templated field of a site.
+
+    The token map is only built when at least one field has placeholders.
+
+    Returns:
+        dict: field name -> resolved value
+    """
+    token_values = None
+    resolved = {}
+    for field in TEMPLATED_FIELDS:
+        value = getattr(site, field)
+        segments = compile_template(value) if isinstance(value, str) else None
+        if segments is None:
+            resolved[field] = value
+            continue
+        if token_values is None:
+            token_values = _token_map(site)
+        resolved[field] = _render(segments, token_values)
+    return resolved
+
+
+def get_resolved_tokens(site):
+    """
+    Resolved templated fields for a site.
+
+    Uses the resolved_tokens column stored when the site was saved, falling
+    back to an in-memory cache keyed by (id, updated_at).
 
-    def replacer(match):
-        key = match.group(1).strip().upper()
-        return token_values.get(key, match.group(0))
+    Returns:
+        dict: field name -> resolved value
+    """
+    stored = getattr(site, 'resolved_tokens', None)
+    if stored is not None:
+        return stored
 
-    return TOKEN_PATTERN.sub(replacer, value)
+    if site.id is None:
+        return compute_resolved_tokens(site)
 
+    key = (site.id, site.updated_at)
+    resolved = _resolved_cache.get(key)
+    if resolved is None:
+        resolved = compute_resolved_tokens(site)
+        with _resolved_cache_lock:
+            if len(_resolved_cache) >= _RESOLVED_CACHE_SIZE:
+                _resolved_cache.clear()
+            _resolved_cache[key] = resolved
+    return resolved
@@ -0,0 +1,250 @@
+"""Bulk site import and streaming export (CSV or NDJSON)."""
+import csv
+import io
+import json
+from types import SimpleNamespace
+from sqlalchemy.exc import IntegrityError, DataError
+from ..db import db
+from ..models import Site
+from .security import proxied_url_validator
+from .site_tokens import compute_resolved_tokens
+
+# Columns exported and accepted on import (id is exported for reference only)
+SITE_TRANSFER_FIELDS = [
+    'name', 'url', 'description', 'visible', 'owner',
+    'health_url', 'health_interval', 'health_timeout',
+    'ssh_path', 'access_methods', 'proxy_url', 'sign_on_method',
+    'console_enabled', 'console_type', 'console_url',
+    'inline_web_url', 'inline_ssh_url', 'inline_vnc_url',
+    'inline_proxy_mode', 'inline_proxy_auth', 'inline_proxy_instructions',
+    'requires_user_credential', 'required_credential_type', 'inline_console_height',
+]
+EXPORT_COLUMNS = ['id'] + SITE_TRANSFER_FIELDS
+
+_BOOL_FIELDS = {'visible', 'console_enabled', 'requires_user_credential'}
+_INT_FIELDS = {'health_interval', 'health_timeout', 'inline_console_height'}
+SITE_URL_FIELDS = ('url', 'proxy_url', 'console_url', 'inline_web_url', 'inline_ssh_url', 'inline_vnc_url')
+
+# Same defaults as create_site
+SITE_DEFAULTS = {
+    'visible': True,
+    'access_methods': [],
+    'console_enabled': False,
+    'inline_proxy_mode': 'none',
+    'inline_proxy_auth': 'none',
+    'requires_user_credential': False,
+    'inline_console_height': 480,
+}
+
+# Rows validated, deduplicated and inserted per transaction
+IMPORT_BATCH_SIZE = 500
+# Rows fetched per round trip on export
+_EXPORT_BATCH_SIZE = 1000
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'y'):
+        return True
+    if text in ('0', 'false', 'no', 'n'):
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+def _coerce(raw):
+    """Map an input record onto Site columns (raises ValueError on bad values)."""
+    row = {}
+    for field in SITE_TRANSFER_FIELDS:
+        value = raw.get(field)
+        if value is None or value == '':
+            continue
+        if field in _BOOL_FIELDS:
+            value = _parse_bool(value)
+        elif field in _INT_FIELDS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{field} must be an integer")
+        elif field == 'access_methods':
+            if isinstance(value, str):
+                value = [m.strip() for m in value.split(';') if m.strip()]
+            elif not isinstance(value, list):
+                raise ValueError('access_methods must be a list')
+        else:
+            if not isinstance(value, str):
+                raise ValueError(f"{field} must be a string")
+            max_length = Site.__table__.c[field].type.length
+            if max_length and len(value) > max_length:
+                raise ValueError(f"{field} exceeds {max_length} characters")
+        row[field] = value
+    return row
+
+
+def iter_import_records(stream, fmt):
+    """
+    Read records from a binary stream without loading it whole.
+
+    Args:
+        stream: Binary file-like object (request stream or file)
+        fmt: 'csv' (access_methods separated by ';') or 'ndjson'
+
+    Yields:
+        tuple: (line number, record dict or None, parse error or None)
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'expected a JSON object'
+            continue
+        yield line_number, record, None
+
+
+def _import_batch(batch, seen_urls, validate_url, report, dry_run):
+    """Validate, deduplicate and insert one batch of (line, record, error) tuples."""
+    candidates = []
+    for line, record, error in batch:
+        url = (record or {}).get('url')
+        if error is None:
+            try:
+                row = _coerce(record)
+                if not row.get('name') or not row.get('url'):
+                    raise ValueError('name and url required')
+                for field in SITE_URL_FIELDS:
+                    if row.get(field) and not validate_url(row[field]):
+                        raise ValueError(f'{field} not in allowed proxied hosts')
+                if row['url'] in seen_urls:
+                    raise ValueError('Duplicate URL in import')
+            except ValueError as e:
+                error = str(e)
+        if error:
+            report['errors'].append({'line': line, 'url': url, 'error': error})
+            continue
+        seen_urls.add(row['url'])
+        candidates.append((line, row))
+
+    if not candidates:
+        return
+
+    # One query per batch for URLs that already exist
+    existing = {
+        url for (url,) in db.session.query(Site.url).filter(Site.url.in_([row['url'] for _, row in candidates]))
+    }
+    rows = []
+    for line, row in candidates:
+        if row['url'] in existing:
+            report['errors'].append({'line': line, 'url': row['url'], 'error': 'Site with this URL already exists'})
+            continue
+        row = {**SITE_DEFAULTS, **row}
+        # Core inserts bypass the ORM save hooks, so resolve tokens here
+        row['resolved_tokens'] = compute_resolved_tokens(
+            SimpleNamespace(**{field: row.get(field) for field in SITE_TRANSFER_FIELDS})
+        )
+        rows.append((line, row))
+
+    if rows and not dry_run:
+        try:
+            db.session.execute(db.insert(Site), [row for _, row in rows])
+            db.session.commit()
+        except (IntegrityError, DataError) as e:
+            # E.g. a URL created concurrently; the batch is rolled back as a whole
+            db.session.rollback()
+            error = f'Batch insert failed: {e.orig}'
+            report['errors'].extend({'line': line, 'url': row['url'], 'error': error} for line, row in rows)
+            return
+    report['created'] += len(rows)
+
+
+def import_sites(records, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import sites in batched transactions.
+
+    Each batch is validated with one proxied-host config lookup, checked for
+    existing URLs in one query and inserted with one executemany. Invalid or
+    duplicate rows are reported and skipped; valid rows are still imported.
+    A batch the database rejects is rolled back and its rows reported as
+    failed, and the import continues with the next batch.
+
+    Args:
+        records: Iterable of (line, record, error) from iter_import_records()
+        dry_run: Validate only, insert nothing
+        batch_size: Rows per transaction
+
+    Returns:
+        dict: created, failed, errors (list of {line, url, error}, by line), dry_run
+    """
+    from .policy import bump_policy_version
+    from .search import invalidate_search_index
+    from .events import publish_sites_changed
+
+    validate_url = proxied_url_validator()
+    report = {'created': 0, 'failed': 0, 'errors': [], 'dry_run': dry_run}
+    seen_urls = set()
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            _import_batch(batch, seen_urls, validate_url, report, dry_run)
+            batch = []
+    if batch:
+        _import_batch(batch, seen_urls, validate_url, report, dry_run)
+
+    report['errors'].sort(key=lambda error: error['line'])
+    report['failed'] = len(report['errors'])
+    if report['created'] and not dry_run:
+        bump_policy_version()
+        invalidate_search_index()
+        publish_sites_changed()
+    return report
+
+
+def iter_export_rows():
+    """Yield every site as a dict keyed by EXPORT_COLUMNS (streamed query)."""
+    columns = [getattr(Site, column) for column in EXPORT_COLUMNS]
+    stmt = db.select(*columns).order_by(Site.id).execution_options(yield_per=_EXPORT_BATCH_SIZE)
+    for row in db.session.execute(stmt):
+        yield dict(row._mapping)
+
+
+def export_chunks(rows, fmt):
+    """
+    Serialize export rows as CSV or NDJSON text chunks.
+
+    In CSV, access_methods is written as a ';'-separated list.
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for i, row in enumerate(rows, 1):
+            row['access_methods'] = ';'.join(row['access_methods'] or [])
+            writer.writerow(row)
+            if i % _EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, separators=(',', ':')))
+        if len(lines) >= _EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
@@ -0,0 +1,300 @@
+"""Portal-signed access tokens and JWKS publication.
+
+Tokens are compact JWTs signed with Ed25519 (alg EdDSA) carrying the user,
+their roles and, when issued for a site launch, the site ID (also used as the
+audience "site:<id>"). Downstream services validate them locally against the
+public keys published at /.well-known/jwks.json.
+
+Signing keys live in the signing_keys table (private keys encrypted with the
+app secret) and are cached in memory per worker for SIGNING_KEY_CACHE_TTL
+seconds. Rotation inserts a new key that activates in the future and retires
+the current one at the same instant; as long as the activation delay is at
+least the cache TTL, every worker switches keys without a restart and the new
+public key is in the JWKS before any token is signed with it. Retired keys
+stay published until tokens signed with them have expired.
+"""
+import base64
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from flask import current_app
+from ..db import db
+from ..models import SigningKey
+from .security import encrypt_password, decrypt_password
+
+
+# Advisory lock held while creating a signing key on PostgreSQL
+_SIGNING_KEY_LOCK_ID = 0x686c7370  # "hlsp"
+
+
+class TokenError(ValueError):
+    """Raised when a token is malformed, has a bad signature or is expired."""
+    pass
+
+
+def _b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64url_decode(value):
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def _json_segment(value):
+    return _b64url_encode(json.dumps(value, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+
+
+class _LoadedKey:
+    """A signing key with its key objects deserialized."""
+
+    def __init__(self, row):
+        self.kid = row.kid
+        self.activates_at = row.activates_at
+        self.retired_at = row.retired_at
+        self.public_key = serialization.load_pem_public_key(row.public_key.encode('ascii'))
+        self._encrypted_private_key = row.private_key
+        self._private_key = None
+
+    @property
+    def private_key(self):
+        if self._private_key is None:
+            pem = decrypt_password(self._encrypted_private_key)
+            self._private_key = serialization.load_pem_private_key(pem.encode('ascii'), password=None)
+        return self._private_key
+
+    def is_signing_at(self, now):
+        return self.activates_at <= now and (self.retired_at is None or self.retired_at > now)
+
+    def to_jwk(self):
+        raw = self.public_key.public_bytes(
+            encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw
+        )
+        return {'kty': 'OKP', 'crv': 'Ed25519', 'x': _b64url_encode(raw), 'kid': self.kid, 'alg': 'EdDSA', 'use': 'sig'}
+
+
+class _KeyCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = None
+        self.loaded_at = 0.0
+
+
+def _get_cache():
+    return current_app.extensions.setdefault('hlspg_signing_keys', _KeyCache())
+
+
+def _retention():
+    """How long a retired key stays published."""
+    return timedelta(seconds=(
+        current_app.config.get('ACCESS_TOKEN_TTL', 300)
+        + current_app.config.get('SIGNING_KEY_CACHE_TTL', 60)
+    ))
+
+
+def _load_keys(force=False):
+    """Published keys (newest activation first), cached per worker."""
+    cache = _get_cache()
+    ttl = current_app.config.get('SIGNING_KEY_CACHE_TTL', 60)
+    if not force and cache.keys is not None and time.monotonic() - cache.loaded_at < ttl:
+        return cache.keys
+
+    with cache.lock:
+        cutoff = datetime.utcnow() - _retention()
+        rows = (
+            SigningKey.query
+            .filter(db.or_(SigningKey.retired_at.is_(None), SigningKey.retired_at > cutoff))
+            .order_by(SigningKey.activates_at.desc(), SigningKey.id.desc())
+            .all()
+        )
+        cache.keys = [_LoadedKey(row) for row in rows]
+        cache.loaded_at = time.monotonic()
+        return cache.keys
+
+
+def generate_signing_key(activates_at=None):
+    """
+    Create a new Ed25519 signing key (added to the session, not committed).
+
+    Args:
+        activates_at: When the key starts signing (default: now)
+
+    Returns:
+        SigningKey
+    """
+    private_key = Ed25519PrivateKey.generate()
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode('ascii')
+    public_pem = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('ascii')
+
+    key = SigningKey(
+        kid=uuid.uuid4().hex,
+        algorithm='EdDSA',
+        private_key=encrypt_password(private_pem),
+        public_key=public_pem,
+        activates_at=activates_at or datetime.utcnow()
+    )
+    db.session.add(key)
+    return key
+
+
+def rotate_signing_key(activate_in=0):
+    """
+    Schedule a new signing key and retire the current ones when it activates.
+
+    The caller commits.
+
+    Args:
+        activate_in: Seconds until the new key starts signing
+
+    Returns:
+        SigningKey: The new key
+    """
+    activates_at = datetime.utcnow() + timedelta(seconds=activate_in)
+    SigningKey.query.filter(
+        SigningKey.activates_at <= activates_at,
+        db.or_(SigningKey.retired_at.is_(None), SigningKey.retired_at > activates_at)
+    ).update({SigningKey.retired_at: activates_at}, synchronize_session=False)
+    return generate_signing_key(activates_at=activates_at)
+
+
+def _current_signing_key():
+    now = datetime.utcnow()
+    for key in _load_keys():
+        if key.is_signing_at(now):
+            return key
+    return _create_signing_key()
+
+
+def _create_signing_key():
+    """
+    Create a key when none is signing (first use, or every key retired).
+
+    Creation is serialized across workers: threads share the cache lock and
+    processes take a transaction-scoped advisory lock on PostgreSQL, then
+    re-check for an active key so only the first caller inserts one.
+    """
+    with _get_cache().lock:
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(db.text('SELECT pg_advisory_xact_lock(:lock_id)'),
+                               {'lock_id': _SIGNING_KEY_LOCK_ID})
+        now = datetime.utcnow()
+        active = SigningKey.query.filter(
+            SigningKey.activates_at <= now,
+            db.or_(SigningKey.retired_at.is_(None), SigningKey.retired_at > now)
+        ).first()
+        if active is None:
+            generate_signing_key()
+            current_app.logger.info("Generated new access token signing key")
+        db.session.commit()  # Releases the advisory lock
+
+    now = datetime.utcnow()
+    for key in _load_keys(force=True):
+        if key.is_signing_at(now):
+            return key
+    raise TokenError('No signing key available')
+
+
+def issue_token(principal, site_id=None, ttl=None):
+    """
+    Mint a signed access token for a principal.
+
+    Args:
+        principal: rbac.Principal
+        site_id: Site the token is issued for (sets the audience)
+        ttl: Lifetime in seconds (default ACCESS_TOKEN_TTL)
+
+    Returns:
+        tuple: (token, expires_in)
+    """
+    ttl = ttl or current_app.config.get('ACCESS_TOKEN_TTL', 300)
+    key = _current_signing_key()
+    now = int(time.time())
+    claims = {
+        'iss': current_app.config.get('ACCESS_TOKEN_ISSUER', 'hlspg'),
+        'sub': principal.uid,
+        'user_id': principal.id,
+        'name': principal.display_name or principal.uid,
+        'email': principal.email or '',
+        'roles': principal.all_roles,
+        'iat': now,
+        'nbf': now,
+        'exp': now + ttl,
+        'jti': uuid.uuid4().hex,
+    }
+    if site_id is not None:
+        claims['site_id'] = site_id
+        claims['aud'] = f'site:{site_id}'
+
+    signing_input = f"{_json_segment({'alg': 'EdDSA', 'typ': 'JWT', 'kid': key.kid})}.{_json_segment(claims)}"
+    signature = key.private_key.sign(signing_input.encode('ascii'))
+    return f"{signing_input}.{_b64url_encode(signature)}", ttl
+
+
+def verify_token(token, audience=None):
+    """
+    Validate a portal access token against the published keys.
+
+    Args:
+        token: Compact JWT
+        audience: Expected audience (e.g. "site:3"), or None to skip the check
+
+    Returns:
+        dict: Token claims
+
+    Raises:
+        TokenError: If the token is invalid or expired
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.split('.')
+        header = json.loads(_b64url_decode(header_segment))
+        claims = json.loads(_b64url_decode(payload_segment))
+        signature = _b64url_decode(signature_segment)
+    except (ValueError, AttributeError) as e:
+        raise TokenError('Malformed token') from e
+
+    if header.get('alg') != 'EdDSA':
+        raise TokenError('Unsupported algorithm')
+
+    key = next((k for k in _load_keys() if k.kid == header.get('kid')), None)
+    if key is None:
+        key = next((k for k in _load_keys(force=True) if k.kid == header.get('kid')), None)
+    if key is None:
+        raise TokenError('Unknown signing key')
+
+    try:
+        key.public_key.verify(signature, f'{header_segment}.{payload_segment}'.encode('ascii'))
+    except InvalidSignature as e:
+        raise TokenError('Invalid signature') from e
+
+    now = time.time()
+    if claims.get('exp', 0) <= now or claims.get('nbf', 0) > now + 30:
+        raise TokenError('Token expired or not yet valid')
+    if audience is not None and claims.get('aud') != audience:
+        raise TokenError('Invalid audience')
+    return claims
+
+
+def get_jwks():
+    """
+    Public keys for token verification, in JWKS format.
+
+    Returns:
+        dict: {'keys': [...]}
+    """
+    keys = _load_keys()
+    now = datetime.utcnow()
+    if not any(key.is_signing_at(now) for key in keys):
+        # Another worker may have just created the first key; don't serve a stale set
+        keys = _load_keys(force=True)
+    return {'keys': [key.to_jwk() for key in keys]}
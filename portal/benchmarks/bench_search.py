@@ -0,0 +1,63 @@
+"""Micro-benchmark the in-process admin search index (SQLite fallback).
+
+Builds a trigram index over synthetic sites, users and groups and times
+ranked queries. PostgreSQL deployments use the pg_trgm indexes instead.
+
+Usage:
+    python benchmarks/bench_search.py [--rows 100000] [--runs 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.search import MemoryIndex
+
+WORDS = ['grafana', 'proxmox', 'nas', 'router', 'backup', 'plex', 'vault', 'gitlab', 'kibana', 'switch',
+         'printer', 'camera', 'ups', 'esxi', 'ilo', 'pihole', 'jellyfin', 'nextcloud', 'home', 'lab']
+
+
+def build(rows):
+    rng = random.Random(1)
+    index = MemoryIndex()
+    for i in range(rows):
+        kind = i % 3
+        word = rng.choice(WORDS)
+        if kind == 0:
+            text = f'{word}-{i} https://{word}{i}.lab.example.com {rng.choice(WORDS)} server ops'
+            index.add(('sites', i), (text, f'{word}-{i}', f'https://{word}{i}.lab.example.com'))
+        elif kind == 1:
+            text = f'user{i} {word.title()} User{i} user{i}@example.com'
+            index.add(('users', i), (text.lower(), f'{word.title()} User{i}', f'user{i}'))
+        else:
+            text = f'{word}-admins-{i} cn={word}-admins-{i},ou=groups,dc=example,dc=com'
+            index.add(('groups', i), (text, f'{word}-admins-{i}', f'cn={word}-admins-{i}'))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    index = build(args.rows)
+    print(f"Indexed {args.rows} rows in {time.perf_counter() - start:.1f} s")
+    
+    types = {'sites', 'users', 'groups', 'certificates'}
+    for query in ('grafana-42', 'jellyfin', 'user4242', 'nextclod', 'admins'):
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            results = index.search(query, types, 20)
+            timings.append(time.perf_counter() - start)
+        top = results[0]['title'] if results else '-'
+        print(f"  {query!r:<14} {min(timings) * 1000:7.2f} ms best, top hit: {top}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Add canonical DN column to ldap_groups
+
+Revision ID: 016_ldap_group_dn_canonical
+Revises: 015_add_certificates
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.dn import canonicalize_dn
+
+# revision identifiers, used by Alembic.
+revision = '016_ldap_group_dn_canonical'
+down_revision = '015_add_certificates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ldap_groups', sa.Column('dn_canonical', sa.Text(), nullable=True))
+
+    # Populate canonical DNs for existing groups
+    conn = op.get_bind()
+    ldap_groups = sa.table(
+        'ldap_groups',
+        sa.column('id', sa.Integer()),
+        sa.column('dn', sa.Text()),
+        sa.column('dn_canonical', sa.Text()),
+    )
+    rows = conn.execute(sa.select(ldap_groups.c.id, ldap_groups.c.dn)).fetchall()
+    updates = [{'group_id': row.id, 'canonical': canonicalize_dn(row.dn)} for row in rows]
+    if updates:
+        conn.execute(
+            ldap_groups.update()
+            .where(ldap_groups.c.id == sa.bindparam('group_id'))
+            .values(dn_canonical=sa.bindparam('canonical')),
+            updates
+        )
+
+    op.create_index('ix_ldap_groups_dn_canonical', 'ldap_groups', ['dn_canonical'])
+
+
+def downgrade():
+    op.drop_index('ix_ldap_groups_dn_canonical', table_name='ldap_groups')
+    op.drop_column('ldap_groups', 'dn_canonical')
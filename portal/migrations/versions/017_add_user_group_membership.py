@@ -0,0 +1,50 @@
+"""Add user_group_membership association table
+
+Revision ID: 017_user_group_membership
+Revises: 016_ldap_group_dn_canonical
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.dn import canonicalize_dn
+
+# revision identifiers, used by Alembic.
+revision = '017_user_group_membership'
+down_revision = '016_ldap_group_dn_canonical'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_group_membership',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('ldap_group_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['ldap_group_id'], ['ldap_groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'ldap_group_id')
+    )
+    op.create_index('ix_user_group_membership_ldap_group_id', 'user_group_membership', ['ldap_group_id'])
+
+    # Backfill memberships from users.cached_groups
+    conn = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer()), sa.column('cached_groups', sa.JSON()))
+    ldap_groups = sa.table('ldap_groups', sa.column('id', sa.Integer()), sa.column('dn_canonical', sa.Text()))
+    membership = sa.table('user_group_membership', sa.column('user_id', sa.Integer()), sa.column('ldap_group_id', sa.Integer()))
+
+    group_ids = {row.dn_canonical: row.id for row in conn.execute(sa.select(ldap_groups.c.id, ldap_groups.c.dn_canonical))}
+    rows = set()
+    for user in conn.execute(sa.select(users.c.id, users.c.cached_groups)):
+        for dn in user.cached_groups or []:
+            group_id = group_ids.get(canonicalize_dn(dn))
+            if group_id:
+                rows.add((user.id, group_id))
+    if rows:
+        conn.execute(membership.insert(), [{'user_id': u, 'ldap_group_id': g} for u, g in rows])
+
+
+def downgrade():
+    op.drop_index('ix_user_group_membership_ldap_group_id', table_name='user_group_membership')
+    op.drop_table('user_group_membership')
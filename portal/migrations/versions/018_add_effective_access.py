@@ -0,0 +1,56 @@
+"""Add materialized effective access tables
+
+Revision ID: 018_effective_access
+Revises: 017_user_group_membership
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018_effective_access'
+down_revision = '017_user_group_membership'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_effective_roles',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'role_id')
+    )
+    op.create_index('ix_user_effective_roles_role_id', 'user_effective_roles', ['role_id'])
+
+    op.create_table(
+        'user_effective_sites',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('site_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['site_id'], ['sites.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'site_id')
+    )
+    op.create_index('ix_user_effective_sites_site_id', 'user_effective_sites', ['site_id'])
+
+    # Initial population from memberships and mappings
+    op.execute(
+        'INSERT INTO user_effective_roles (user_id, role_id) '
+        'SELECT DISTINCT m.user_id, rm.role_id FROM user_group_membership m '
+        'JOIN role_mappings rm ON rm.ldap_group_id = m.ldap_group_id'
+    )
+    op.execute(
+        'INSERT INTO user_effective_sites (user_id, site_id) '
+        'SELECT DISTINCT m.user_id, gsm.site_id FROM user_group_membership m '
+        'JOIN group_site_map gsm ON gsm.ldap_group_id = m.ldap_group_id'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_user_effective_sites_site_id', table_name='user_effective_sites')
+    op.drop_table('user_effective_sites')
+    op.drop_index('ix_user_effective_roles_role_id', table_name='user_effective_roles')
+    op.drop_table('user_effective_roles')
@@ -0,0 +1,34 @@
+"""Add signing keys table for portal access tokens
+
+Revision ID: 019_signing_keys
+Revises: 018_effective_access
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '019_signing_keys'
+down_revision = '018_effective_access'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'signing_keys',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kid', sa.String(length=64), nullable=False),
+        sa.Column('algorithm', sa.String(length=20), nullable=False, server_default='EdDSA'),
+        sa.Column('private_key', sa.Text(), nullable=False),
+        sa.Column('public_key', sa.Text(), nullable=False),
+        sa.Column('activates_at', sa.DateTime(), nullable=False),
+        sa.Column('retired_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.UniqueConstraint('kid', name='uq_signing_keys_kid')
+    )
+
+
+def downgrade():
+    op.drop_table('signing_keys')
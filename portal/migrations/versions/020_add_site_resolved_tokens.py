@@ -0,0 +1,54 @@
+"""Add resolved token column to sites
+
+Revision ID: 020_site_resolved_tokens
+Revises: 019_signing_keys
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from types import SimpleNamespace
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.site_tokens import compute_resolved_tokens
+
+# revision identifiers, used by Alembic.
+revision = '020_site_resolved_tokens'
+down_revision = '019_signing_keys'
+branch_labels = None
+depends_on = None
+
+_TOKEN_SOURCE_COLUMNS = (
+    'name', 'url', 'proxy_url', 'ssh_path', 'sign_on_method', 'console_url',
+    'inline_web_url', 'inline_ssh_url', 'inline_vnc_url', 'inline_proxy_mode',
+    'inline_proxy_auth', 'inline_proxy_instructions',
+)
+
+
+def upgrade():
+    op.add_column('sites', sa.Column('resolved_tokens', sa.JSON(), nullable=True))
+
+    # Populate resolved values for existing sites
+    conn = op.get_bind()
+    sites = sa.table(
+        'sites',
+        sa.column('id', sa.Integer()),
+        sa.column('resolved_tokens', sa.JSON()),
+        *(sa.column(name, sa.Text()) for name in _TOKEN_SOURCE_COLUMNS)
+    )
+    rows = conn.execute(sa.select(sites.c.id, *(sites.c[name] for name in _TOKEN_SOURCE_COLUMNS))).fetchall()
+    updates = [
+        {'site_id': row.id, 'resolved': compute_resolved_tokens(SimpleNamespace(**row._mapping))}
+        for row in rows
+    ]
+    if updates:
+        conn.execute(
+            sites.update()
+            .where(sites.c.id == sa.bindparam('site_id'))
+            .values(resolved_tokens=sa.bindparam('resolved')),
+            updates
+        )
+
+
+def downgrade():
+    op.drop_column('sites', 'resolved_tokens')
@@ -0,0 +1,27 @@
+"""Add indexes for site listing sort orders and filters
+
+Revision ID: 021_site_listing_indexes
+Revises: 020_site_resolved_tokens
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '021_site_listing_indexes'
+down_revision = '020_site_resolved_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_sites_name_id', 'sites', ['name', 'id'])
+    op.create_index('ix_sites_created_at_id', 'sites', ['created_at', 'id'])
+    op.create_index('ix_sites_owner_lower', 'sites', [sa.text('lower(owner)')])
+
+
+def downgrade():
+    op.drop_index('ix_sites_owner_lower', table_name='sites')
+    op.drop_index('ix_sites_created_at_id', table_name='sites')
+    op.drop_index('ix_sites_name_id', table_name='sites')
@@ -0,0 +1,25 @@
+"""Add per-site health probe interval and timeout
+
+Revision ID: 022_site_health_probe
+Revises: 021_site_listing_indexes
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '022_site_health_probe'
+down_revision = '021_site_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('sites', sa.Column('health_interval', sa.Integer(), nullable=True))
+    op.add_column('sites', sa.Column('health_timeout', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('sites', 'health_timeout')
+    op.drop_column('sites', 'health_interval')
@@ -0,0 +1,41 @@
+"""Add trigram indexes for the admin search
+
+Revision ID: 023_search_trigram
+Revises: 022_site_health_probe
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '023_search_trigram'
+down_revision = '022_site_health_probe'
+branch_labels = None
+depends_on = None
+
+# table -> searchable columns; must match app/utils/search.py SEARCH_TYPES
+SEARCH_COLUMNS = {
+    'sites': ('name', 'url', 'description', 'owner'),
+    'users': ('uid', 'display_name', 'email'),
+    'ldap_groups': ('cn', 'dn'),
+    'certificates': ('name',),
+}
+
+
+def _expression(columns):
+    return "lower(" + " || ' ' || ".join(f"coalesce({c}, '')" for c in columns) + ")"
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return  # Other databases use the in-process search index
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in SEARCH_COLUMNS.items():
+        op.execute(f'CREATE INDEX ix_{table}_search_trgm ON {table} USING gin ({_expression(columns)} gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in SEARCH_COLUMNS:
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_trgm')
@@ -0,0 +1,49 @@
+"""Add updated_at indexes and tombstones for delta sync
+
+Revision ID: 024_delta_sync
+Revises: 023_search_trigram
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '024_delta_sync'
+down_revision = '023_search_trigram'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('role_mappings', 'group_site_map'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = created_at WHERE created_at IS NOT NULL')
+
+    op.create_index('ix_sites_updated_at', 'sites', ['updated_at'])
+    op.create_index('ix_users_updated_at', 'users', ['updated_at'])
+    op.create_index('ix_certificates_updated_at', 'certificates', ['updated_at'])
+    op.create_index('ix_role_mappings_updated_at', 'role_mappings', ['updated_at'])
+    op.create_index('ix_group_site_map_updated_at', 'group_site_map', ['updated_at'])
+
+    op.create_table(
+        'tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstones_deleted_at', 'tombstones', ['deleted_at'])
+
+
+def downgrade():
+    op.drop_index('ix_tombstones_deleted_at', table_name='tombstones')
+    op.drop_table('tombstones')
+    op.drop_index('ix_group_site_map_updated_at', table_name='group_site_map')
+    op.drop_index('ix_role_mappings_updated_at', table_name='role_mappings')
+    op.drop_index('ix_certificates_updated_at', table_name='certificates')
+    op.drop_index('ix_users_updated_at', table_name='users')
+    op.drop_index('ix_sites_updated_at', table_name='sites')
+    op.drop_column('group_site_map', 'updated_at')
+    op.drop_column('role_mappings', 'updated_at')
@@ -3,6 +3,7 @@ import pytest
 from app import create_app
 from app.db import db
 from app.config import Config
+from app.models import User
 import tempfile
 import os
 
@@ -39,6 +40,36 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture
+def login_as():
+    """Log a test client in as a user; returns the client."""
+    def login(client, user):
+        with client.session_transaction() as sess:
+            sess['user_id'] = user.id
+            sess['username'] = user.uid
+        return client
+    return login
+
+
+@pytest.fixture
+def admin_client(app, client, login_as):
+    """Test client logged in as a local admin."""
+    admin = User(uid='admin', is_local_admin=True)
+    db.session.add(admin)
+    db.session.commit()
+    return login_as(client, admin)
+
+
+@pytest.fixture
+def fake_redis(app):
+    """In-memory Redis with Lua scripting, installed as the app's shared client."""
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    redis_client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    app.extensions['hlspg_redis'] = redis_client
+    return redis_client
+
+
 @pytest.fixture
 def runner(app):
     """Create test CLI runner."""
@@ -0,0 +1,55 @@
+"""Test materialized effective access."""
+from app.db import db
+from app.models import User, Role, LDAPGroup, RoleMapping, Site, GroupSiteMap
+from app.ldap.group_sync import sync_user_groups
+from app.utils.access import refresh_group_access, verify_access
+from app.utils.rbac import get_user_roles
+
+
+def test_effective_access_tracks_mapping_changes(app):
+    """Mapping changes are reflected incrementally for group members."""
+    with app.app_context():
+        user = User(uid='testuser')
+        role = Role(name='operator')
+        group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+        site = Site(name='Test Site', url='https://test.example.com')
+        db.session.add_all([user, role, group, site])
+        sync_user_groups(user, ['cn=ops,dc=test'])
+        db.session.commit()
+        
+        assert get_user_roles(user.id) == []
+        
+        mapping = RoleMapping(ldap_group_id=group.id, role_id=role.id)
+        db.session.add(mapping)
+        db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=site.id))
+        refresh_group_access(group.id)
+        db.session.commit()
+        
+        assert get_user_roles(user.id) == ['operator']
+        assert not any(verify_access().values())
+        
+        db.session.delete(mapping)
+        refresh_group_access(group.id)
+        db.session.commit()
+        
+        assert get_user_roles(user.id) == []
+
+
+def test_rebuild_access_repairs_drift(app, runner):
+    """The rebuild command restores consistency after out-of-band changes."""
+    with app.app_context():
+        user = User(uid='testuser')
+        role = Role(name='operator')
+        group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+        db.session.add_all([user, role, group])
+        sync_user_groups(user, ['cn=ops,dc=test'])
+        db.session.add(RoleMapping(ldap_group_id=group.id, role_id=role.id))
+        db.session.commit()
+        
+        assert verify_access()['roles_missing'] == 1
+        
+        result = runner.invoke(args=['rebuild-access'])
+        
+        assert result.exit_code == 0
+        assert 'verified' in result.output
+        assert get_user_roles(user.id) == ['operator']
@@ -0,0 +1,66 @@
+"""Test the access-review report."""
+import csv
+import io
+import json
+import pytest
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap, Role, RoleMapping
+from app.ldap.group_sync import sync_user_groups
+
+
+@pytest.fixture
+def review_data(app, login_as):
+    with app.app_context():
+        admin = User(uid='admin', is_local_admin=True)
+        alice = User(uid='alice')
+        bob = User(uid='bob', disabled=True)
+        ops = LDAPGroup(dn='cn=ops,dc=test')
+        devs = LDAPGroup(dn='cn=devs,dc=test')
+        grafana = Site(name='Grafana', url='https://grafana.example.com')
+        vault = Site(name='Vault', url='https://vault.example.com')
+        db.session.add_all([admin, alice, bob, ops, devs, grafana, vault])
+        db.session.commit()
+        
+        role = Role.query.filter_by(name='user').first() or Role(name='user')
+        db.session.add_all([
+            GroupSiteMap(ldap_group_id=ops.id, site_id=grafana.id),
+            GroupSiteMap(ldap_group_id=ops.id, site_id=vault.id),
+            GroupSiteMap(ldap_group_id=devs.id, site_id=grafana.id),
+            RoleMapping(ldap_group_id=ops.id, role=role),
+        ])
+        sync_user_groups(alice, [ops.dn, devs.dn])
+        sync_user_groups(bob, [devs.dn])
+        db.session.commit()
+        
+        with app.test_client() as client:
+            login_as(client, admin)
+            yield client, {'grafana': grafana.id, 'ops': ops.id, 'alice': alice.id}
+
+
+def test_access_review_csv(review_data):
+    client, ids = review_data
+    response = client.get('/api/admin/access-review')
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    
+    paths = {(r['uid'], r['site_name'], r['via'], r['group_dn']) for r in rows}
+    assert paths == {
+        ('alice', 'Grafana', 'group', 'cn=ops,dc=test'),
+        ('alice', 'Grafana', 'group', 'cn=devs,dc=test'),
+        ('alice', 'Vault', 'group', 'cn=ops,dc=test'),
+        ('bob', 'Grafana', 'group', 'cn=devs,dc=test'),
+        ('admin', 'Grafana', 'local_admin', ''),
+        ('admin', 'Vault', 'local_admin', ''),
+    }
+    ops_row = next(r for r in rows if r['group_dn'] == 'cn=ops,dc=test')
+    assert ops_row['group_roles'] == 'user'
+
+
+def test_access_review_ndjson_filters(review_data):
+    client, ids = review_data
+    response = client.get(f"/api/admin/access-review?format=ndjson&site_id={ids['grafana']}&group_id={ids['ops']}")
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(r['uid'], r['site_name']) for r in rows] == [('alice', 'Grafana')]
+    
+    assert client.get('/api/admin/access-review?format=xml').status_code == 400
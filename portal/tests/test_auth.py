@@ -1,7 +1,7 @@
 """Test authentication."""
 import pytest
 from app.db import db
-from app.models import User
+from app.models import User, LDAPGroup, Role, RoleMapping, user_group_membership
 from app.auth.routes import login, logout, me
 
 
@@ -42,3 +42,98 @@ def test_logout(client):
     response = client.post('/api/auth/logout')
     assert response.status_code == 200
 
+
+
+def test_principal_is_request_scoped(app):
+    """The principal is loaded once per request and skips disabled users."""
+    from app.utils.rbac import get_current_principal
+    
+    with app.app_context():
+        active = User(uid='active', is_local_admin=True)
+        disabled = User(uid='disabled', disabled=True)
+        db.session.add_all([active, disabled])
+        db.session.commit()
+        
+        with app.test_request_context():
+            from flask import session
+            session['user_id'] = active.id
+            principal = get_current_principal()
+            assert principal.uid == 'active'
+            assert principal is get_current_principal()
+            assert principal.has_any_role('admin')
+            assert 'admin' in principal.all_roles
+        
+        with app.test_request_context():
+            from flask import session
+            session['user_id'] = disabled.id
+            assert get_current_principal() is None
+
+
+def test_disabled_user_rejected_by_require_login(app, client, login_as):
+    """Endpoints guarded by require_login reject disabled users."""
+    with app.app_context():
+        user = User(uid='disabled', disabled=True)
+        db.session.add(user)
+        db.session.commit()
+        
+        login_as(client, user)
+        
+        response = client.get('/api/credentials')
+        assert response.status_code == 401
+        assert response.get_json()['error'] == 'User not found or disabled'
+
+
+def test_session_claims_skip_user_load_until_epoch_changes(app, client, monkeypatch, login_as):
+    """Current session claims are trusted; a bumped epoch forces a reload."""
+    epochs = [0, 0]
+    monkeypatch.setattr('app.utils.rbac.read_epochs', lambda user_id: list(epochs))
+    
+    with app.app_context():
+        user = User(uid='claims', display_name='Before')
+        db.session.add(user)
+        db.session.commit()
+        
+        login_as(client, user)
+        
+        assert client.get('/api/auth/me').get_json()['user']['display_name'] == 'Before'
+        
+        user.display_name = 'After'
+        user.disabled = True
+        db.session.commit()
+        
+        # Claims still match the epochs: served from the session
+        assert client.get('/api/auth/me').get_json()['user']['display_name'] == 'Before'
+        
+        # Bumping the user epoch revokes the claims
+        epochs[1] += 1
+        assert client.get('/api/auth/me').status_code == 401
+
+
+def test_reissued_claims_do_not_use_a_stale_policy_snapshot(app, client, monkeypatch, login_as):
+    """Roles re-issued under a new revocation epoch come from a snapshot at least that new."""
+    epochs = [0, 0]
+    version = [0]
+    monkeypatch.setattr('app.utils.rbac.read_epochs', lambda user_id: list(epochs))
+    monkeypatch.setattr('app.utils.policy._read_version', lambda: version[0])
+    
+    with app.app_context():
+        group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+        user = User(uid='member')
+        db.session.add_all([group, user])
+        db.session.commit()
+        db.session.execute(user_group_membership.insert().values(user_id=user.id, ldap_group_id=group.id))
+        db.session.commit()
+        
+        login_as(client, user)
+        assert client.get('/api/auth/me').get_json()['roles'] == []
+        
+        # Another worker maps the group and bumps the version; this worker's
+        # snapshot is not invalidated (its pub/sub message has not arrived)
+        admin = Role.query.filter_by(name='admin').first()
+        db.session.add(RoleMapping(ldap_group_id=group.id, role_id=admin.id))
+        db.session.commit()
+        version[0] = epochs[0] = 1
+        
+        assert client.get('/api/auth/me').get_json()['roles'] == ['admin']
+        with client.session_transaction() as sess:
+            assert sess['claims']['roles'] == ['admin']
@@ -0,0 +1,124 @@
+"""Test the /api/bootstrap endpoint."""
+import gzip
+import json
+from sqlalchemy import event
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap, UserCredential, user_group_membership
+from app.utils.access import refresh_group_access
+from app.utils.policy import bump_policy_version
+
+
+def _add_member():
+    user = User(uid='member', cached_groups=['cn=ops,dc=test'])
+    group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+    db.session.add_all([user, group])
+    db.session.commit()
+    db.session.execute(user_group_membership.insert().values(user_id=user.id, ldap_group_id=group.id))
+    db.session.commit()
+    return user, group
+
+
+def _add_sites(group, count, offset=0):
+    sites = [Site(name=f'Site {i}', url=f'https://site{i}.example.com') for i in range(offset, offset + count)]
+    db.session.add_all(sites)
+    db.session.commit()
+    db.session.add_all([GroupSiteMap(ldap_group_id=group.id, site_id=site.id) for site in sites])
+    refresh_group_access(group.id)
+    db.session.commit()
+    bump_policy_version()
+    return sites
+
+
+def _add_credentials(user, sites):
+    for site in sites:
+        credential = UserCredential(user_id=user.id, name=f'key for {site.name}', credential_type='password',
+                                    data='x')
+        credential.associated_sites.append(site)
+        db.session.add(credential)
+    db.session.commit()
+
+
+def _count_queries(app, client, path):
+    client.get(path)  # Load the policy snapshot
+    statements = []
+    
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_bootstrap_returns_all_sections(app, client, login_as):
+    """One response carries what the five separate endpoints return."""
+    with app.app_context():
+        user, group = _add_member()
+        login_as(client, user)
+        _add_sites(group, 2)
+        
+        data = client.get('/api/bootstrap').get_json()
+        assert set(data['sections']) == {'me', 'config', 'sites', 'certificates', 'credentials'}
+        assert set(data['etags']) == set(data['sections'])
+        assert data['unchanged'] == []
+        assert data['sections']['me'] == client.get('/api/auth/me').get_json()
+        assert data['sections']['sites']['sites'] == client.get('/api/sites').get_json()['sites']
+        assert data['sections']['config']['app_title'] == 'HLSPG Portal'
+
+
+def test_query_count_does_not_grow_with_data(app, client, login_as):
+    """The query budget is fixed, not per site or credential."""
+    with app.app_context():
+        user, group = _add_member()
+        login_as(client, user)
+        sites = _add_sites(group, 1)
+        _add_credentials(user, sites)
+        baseline = _count_queries(app, client, '/api/bootstrap')
+        
+        sites = _add_sites(group, 5, offset=1)
+        _add_credentials(user, sites)
+        assert _count_queries(app, client, '/api/bootstrap') == baseline
+
+
+def test_partial_refresh_with_section_etags(app, client, login_as):
+    """Sections whose ETag the client holds are not resent."""
+    with app.app_context():
+        user, group = _add_member()
+        login_as(client, user)
+        first = client.get('/api/bootstrap').get_json()
+        known = ','.join(f'{name}:{etag}' for name, etag in first['etags'].items())
+        
+        _add_credentials(user, _add_sites(group, 1))
+        data = client.get('/api/bootstrap', query_string={
+            'sections': 'me,sites,credentials', 'etags': known,
+        }).get_json()
+        assert set(data['sections']) == {'sites', 'credentials'}
+        assert data['unchanged'] == ['me']
+        assert len(data['sections']['credentials']['credentials']) == 1
+        
+        assert client.get('/api/bootstrap?sections=me,nope').status_code == 400
+
+
+def test_compressed_and_conditional(app, client, login_as):
+    """Large responses are gzipped; a matching If-None-Match is a 304."""
+    with app.app_context():
+        user, group = _add_member()
+        login_as(client, user)
+        _add_sites(group, 20)
+        
+        response = client.get('/api/bootstrap', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        data = json.loads(gzip.decompress(response.get_data()))
+        assert len(data['sections']['sites']['sites']) == 20
+        
+        again = client.get('/api/bootstrap', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag'],
+        })
+        assert again.status_code == 304
+        assert 'Content-Encoding' not in client.get('/api/bootstrap').headers
@@ -0,0 +1,111 @@
+"""Test configuration snapshot export/apply."""
+import pytest
+from app.db import db
+from app.models import LDAPGroup, Role, RoleMapping, Site, GroupSiteMap, Certificate, SSOConfig, WebAppConfig
+from app.utils.config_snapshot import export_snapshot, apply_snapshot, SnapshotError
+
+
+def _seed():
+    group = LDAPGroup(dn='cn=ops,ou=groups,dc=test', cn='ops')
+    site = Site(name='Grafana', url='https://grafana.example.com', proxy_url='https://p.example.com/${NAME}')
+    db.session.add_all([group, site, SSOConfig(id=1, account_settings_url='https://sso.example.com')])
+    db.session.commit()
+    db.session.add_all([
+        RoleMapping(ldap_group_id=group.id, role_id=Role.query.filter_by(name='admin').first().id),
+        GroupSiteMap(ldap_group_id=group.id, site_id=site.id),
+    ])
+    db.session.commit()
+
+
+def test_apply_own_export_is_a_no_op(app):
+    """Re-applying an export produces no changes."""
+    with app.app_context():
+        _seed()
+        snapshot = export_snapshot()
+        
+        assert snapshot['site_groups'] == [{'group': 'cn=ops,ou=groups,dc=test', 'site': 'https://grafana.example.com'}]
+        assert [g['dn'] for g in snapshot['ldap_groups']] == ['cn=ops,ou=groups,dc=test']
+        assert apply_snapshot(snapshot)['changes'] == []
+
+
+def test_apply_writes_only_the_diff(app):
+    """Creates, updates and deletes are planned by key; dry runs write nothing."""
+    with app.app_context():
+        _seed()
+        snapshot = export_snapshot()
+        snapshot['sites'][0]['description'] = 'Dashboards'
+        snapshot['sites'].append({'name': 'Loki', 'url': 'https://loki.example.com'})
+        snapshot['site_groups'] = [{'group': 'CN=Ops,OU=Groups,DC=test', 'site': 'https://loki.example.com'}]
+        snapshot['role_mappings'] = []
+        snapshot['certificates'] = [{'name': 'CA', 'certificate_data': 'PEM', 'filename': 'ca.pem'}]
+        
+        planned = apply_snapshot(snapshot, dry_run=True)
+        assert planned['summary'] == {
+            'sites': {'create': 1, 'update': 1, 'delete': 0},
+            'certificates': {'create': 1, 'update': 0, 'delete': 0},
+            'role_mappings': {'create': 0, 'update': 0, 'delete': 1},
+            'site_groups': {'create': 1, 'update': 0, 'delete': 1},
+        }
+        assert Site.query.count() == 1
+        
+        apply_snapshot(snapshot)
+        grafana = Site.query.filter_by(name='Grafana').one()
+        loki = Site.query.filter_by(name='Loki').one()
+        assert grafana.description == 'Dashboards'
+        assert grafana.resolved_tokens['proxy_url'] == 'https://p.example.com/Grafana'
+        assert loki.inline_proxy_mode == 'none'
+        assert [m.site_id for m in GroupSiteMap.query.all()] == [loki.id]
+        assert RoleMapping.query.count() == 0
+        assert Certificate.query.one().filename == 'ca.pem'
+        assert apply_snapshot(snapshot)['changes'] == []
+
+
+def test_apply_rejects_unknown_references(app, admin_client):
+    """Mappings to sites missing from both the snapshot and the database are rejected."""
+    with app.app_context():
+        with pytest.raises(SnapshotError):
+            apply_snapshot({'version': 1, 'site_groups': [{'group': 'cn=x,dc=test', 'site': 'https://nope.example.com'}]})
+        
+        assert admin_client.post('/api/admin/config/snapshot', json={'version': 99}).status_code == 400
+        exported = admin_client.get('/api/admin/config/snapshot')
+        assert exported.status_code == 200 and exported.get_json()['version'] == 1
+
+
+def test_apply_validates_site_urls_and_rejects_duplicate_mappings(app):
+    """Site URLs must pass proxied host validation; repeated mappings are rejected."""
+    with app.app_context():
+        _seed()
+        db.session.add(WebAppConfig(id=1, proxy_host_validation_enabled=True))
+        db.session.commit()
+        app.config['ALLOWED_PROXIED_HOSTS'] = ['*.example.com']
+        snapshot = export_snapshot()
+        assert apply_snapshot(snapshot, dry_run=True)['changes'] == []
+        
+        snapshot['sites'].append({'name': 'Evil', 'url': 'https://evil.test'})
+        with pytest.raises(SnapshotError):
+            apply_snapshot(snapshot, dry_run=True)
+        
+        snapshot = export_snapshot()
+        snapshot['site_groups'] = [{'group': 'cn=dev,dc=test', 'site': 'https://grafana.example.com'}] * 2
+        with pytest.raises(SnapshotError):
+            apply_snapshot(snapshot)
+        snapshot = export_snapshot()
+        snapshot['role_mappings'] = [{'group': 'cn=dev,dc=test', 'role': 'admin'}, {'group': 'CN=Dev,DC=test', 'role': 'admin'}]
+        with pytest.raises(SnapshotError):
+            apply_snapshot(snapshot)
+        assert RoleMapping.query.count() == 1
+
+
+def test_duplicate_certificate_names_fail_clearly(app):
+    """Certificates are keyed by name, so live duplicates stop export and apply."""
+    with app.app_context():
+        db.session.add_all([
+            Certificate(name='CA', certificate_data='PEM1', filename='a.pem'),
+            Certificate(name='CA', certificate_data='PEM2', filename='b.pem'),
+        ])
+        db.session.commit()
+        with pytest.raises(SnapshotError, match='CA'):
+            export_snapshot()
+        with pytest.raises(SnapshotError, match='CA'):
+            apply_snapshot({'version': 1, 'certificates': [{'name': 'CA', 'certificate_data': 'PEM1', 'filename': 'a.pem'}]})
+        assert Certificate.query.count() == 2
@@ -0,0 +1,97 @@
+"""Test delta sync (?since=) on admin list endpoints."""
+from datetime import datetime, timedelta
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap, Certificate, Tombstone, user_group_membership
+
+
+def _use_short_overlap(app):
+    # One second, as SQLite stores CURRENT_TIMESTAMP without fractional seconds
+    app.config['DELTA_SYNC_OVERLAP'] = 1
+
+
+def _backdate(*models):
+    """Move every row's updated_at an hour back, as if nothing changed recently."""
+    past = datetime.utcnow() - timedelta(hours=1)
+    for model in models:
+        db.session.execute(db.update(model).values(updated_at=past))
+    db.session.commit()
+
+
+def test_sites_and_matrix_return_only_changes(app, admin_client):
+    """Changed rows come back in full; deleted rows (and cascaded mappings) as ids."""
+    with app.app_context():
+        _use_short_overlap(app)
+        group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+        kept = Site(name='Kept', url='https://kept.example.com')
+        edited = Site(name='Edited', url='https://edited.example.com')
+        removed = Site(name='Removed', url='https://removed.example.com')
+        db.session.add_all([group, kept, edited, removed])
+        db.session.commit()
+        mapping = GroupSiteMap(ldap_group_id=group.id, site_id=removed.id)
+        db.session.add(mapping)
+        db.session.commit()
+        _backdate(Site, GroupSiteMap)
+        
+        full = admin_client.get('/api/admin/sites').get_json()
+        assert len(full['sites']) == 3
+        matrix_token = admin_client.get('/api/admin/mapping-matrix').get_json()['sync_token']
+        
+        edited.description = 'now with a description'
+        db.session.delete(removed)
+        db.session.commit()
+        
+        delta = admin_client.get('/api/admin/sites', query_string={'since': full['sync_token']}).get_json()
+        assert [s['name'] for s in delta['sites']] == ['Edited']
+        assert delta['deleted'] == [removed.id]
+        assert delta['sync_token'] >= full['sync_token']
+        
+        matrix = admin_client.get('/api/admin/mapping-matrix', query_string={'since': matrix_token}).get_json()
+        assert [s['name'] for s in matrix['sites']] == ['Edited']
+        assert matrix['site_groups'] == []
+        assert matrix['deleted'] == {'sites': [removed.id], 'site_groups': [mapping.id], 'role_mappings': []}
+
+
+def test_role_mapping_changes_reach_user_deltas(app, admin_client):
+    """Creating a role mapping marks the group's members as updated (their roles changed)."""
+    with app.app_context():
+        _use_short_overlap(app)
+        member = User(uid='member')
+        other = User(uid='other')
+        group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+        db.session.add_all([member, other, group])
+        db.session.commit()
+        db.session.execute(user_group_membership.insert().values(user_id=member.id, ldap_group_id=group.id))
+        db.session.commit()
+        _backdate(User)
+        
+        token = admin_client.get('/api/admin/users').get_json()['sync_token']
+        response = admin_client.post('/api/admin/role-mappings', json={'ldap_group_dn': 'cn=ops,dc=test', 'role_name': 'admin'})
+        assert response.status_code == 201
+        
+        delta = admin_client.get('/api/admin/users', query_string={'since': token}).get_json()
+        assert [(u['uid'], u['roles']) for u in delta['users']] == [('member', ['admin'])]
+        assert delta['deleted'] == []
+        
+        mappings = admin_client.get('/api/admin/role-mappings', query_string={'since': token}).get_json()
+        assert [m['role']['name'] for m in mappings['mappings']] == ['admin']
+
+
+def test_invalid_and_expired_tokens(app, admin_client):
+    """Malformed tokens are a 400; tokens older than the retention are a 410."""
+    with app.app_context():
+        assert admin_client.get('/api/admin/certificates?since=yesterday').status_code == 400
+        expired = (datetime.utcnow() - timedelta(days=30)).isoformat()
+        response = admin_client.get('/api/admin/certificates', query_string={'since': expired})
+        assert response.status_code == 410
+
+
+def test_old_tombstones_are_purged(app):
+    """Recording a deletion drops tombstones past the retention window."""
+    with app.app_context():
+        db.session.add(Tombstone(entity='certificates', entity_id=1, deleted_at=datetime.utcnow() - timedelta(days=30)))
+        certificate = Certificate(name='CA', certificate_data='-----BEGIN CERTIFICATE-----', filename='ca.pem')
+        db.session.add(certificate)
+        db.session.commit()
+        db.session.delete(certificate)
+        db.session.commit()
+        assert [t.entity_id for t in Tombstone.query.all()] == [certificate.id]
@@ -0,0 +1,36 @@
+"""Test DN canonicalization."""
+import pytest
+from app.utils.dn import canonicalize_dn, normalize_group_dns, parse_dn, DNParseError
+
+
+def test_canonicalize_case_and_spacing():
+    """DNs differing only in case and spacing canonicalize identically."""
+    assert canonicalize_dn('CN=Admins, OU=Groups,DC=Example,DC=com') == 'cn=admins,ou=groups,dc=example,dc=com'
+    assert canonicalize_dn(' cn = Domain  Admins ,dc=test') == 'cn=domain admins,dc=test'
+
+
+def test_canonicalize_escaping():
+    """Hex escapes, quoted values and backslash escapes are normalized."""
+    expected = 'cn=smith\\, john,dc=test'
+    assert canonicalize_dn('CN=Smith\\2C John,DC=test') == expected
+    assert canonicalize_dn('cn="Smith, John",dc=test') == expected
+    assert canonicalize_dn('cn=Smith\\, John,dc=test') == expected
+
+
+def test_canonicalize_multivalued_rdn():
+    """Multi-valued RDN components are sorted."""
+    assert canonicalize_dn('uid=b+CN=A,dc=test') == canonicalize_dn('cn=a+uid=b,dc=test')
+
+
+def test_canonicalize_malformed_falls_back():
+    """Malformed DNs fall back to a lower-cased copy."""
+    assert canonicalize_dn(' NotADN ') == 'notadn'
+    assert canonicalize_dn(None) == ''
+    with pytest.raises(DNParseError):
+        parse_dn('cn=a,,dc=test')
+
+
+def test_normalize_group_dns_dedupes():
+    """Equivalent DNs are collapsed, keeping the first spelling."""
+    result = normalize_group_dns(['CN=Admins,DC=test', ' cn=admins, dc=test ', '', None, 'cn=users,dc=test'])
+    assert result == ['CN=Admins,DC=test', 'cn=users,dc=test']
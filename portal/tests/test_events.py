@@ -0,0 +1,101 @@
+"""Test realtime site events on the /events Socket.IO namespace."""
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap, user_group_membership
+from app.ldap.group_sync import sync_user_groups
+from app.utils.access import refresh_group_access
+from app.utils.events import EVENTS_NAMESPACE
+
+
+def _events(app, client, auth=None):
+    return app.socketio.test_client(app, namespace=EVENTS_NAMESPACE, flask_test_client=client, auth=auth)
+
+
+def _received(socket):
+    return [(event['name'], event['args'][0]) for event in socket.get_received(EVENTS_NAMESPACE)]
+
+
+def _setup(app):
+    admin = User(uid='admin', is_local_admin=True)
+    member = User(uid='member', cached_groups=['cn=ops,dc=test'])
+    outsider = User(uid='outsider')
+    group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+    site = Site(name='Grafana', url='https://grafana.example.com')
+    db.session.add_all([admin, member, outsider, group, site])
+    db.session.commit()
+    db.session.execute(user_group_membership.insert().values(user_id=member.id, ldap_group_id=group.id))
+    db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=site.id))
+    refresh_group_access(group.id)
+    db.session.commit()
+    return admin, member, outsider, group, site
+
+
+def test_site_edits_reach_only_users_who_can_see_the_site(app, login_as):
+    """An edit is pushed to the mapped group's members and the admin room, nobody else."""
+    with app.app_context():
+        admin, member, outsider, group, site = _setup(app)
+        admin_client = login_as(app.test_client(), admin)
+        member_events = _events(app, login_as(app.test_client(), member))
+        outsider_events = _events(app, login_as(app.test_client(), outsider))
+        admin_events = _events(app, admin_client, auth={'scope': 'admin'})
+        assert member_events.is_connected(EVENTS_NAMESPACE)
+        
+        response = admin_client.put(f'/api/admin/sites/{site.id}', json={'description': 'Dashboards'})
+        assert response.status_code == 200
+        
+        [(name, payload)] = _received(member_events)
+        assert name == 'site_updated'
+        assert payload['site']['description'] == 'Dashboards'
+        assert _received(outsider_events) == []
+        assert [name for name, _ in _received(admin_events)] == ['site_updated']
+
+
+def test_unmapping_a_group_removes_the_site(app, login_as):
+    """Members who lose access get site_removed."""
+    with app.app_context():
+        admin, member, outsider, group, site = _setup(app)
+        member_events = _events(app, login_as(app.test_client(), member))
+        
+        response = login_as(app.test_client(), admin).delete(f'/api/admin/sites/{site.id}/groups/{group.id}')
+        assert response.status_code == 200
+        assert _received(member_events) == [('site_removed', {'id': site.id})]
+
+
+def test_admin_scope_requires_admin(app, login_as):
+    """Non-admins cannot join the admin room."""
+    with app.app_context():
+        admin, member, outsider, group, site = _setup(app)
+        socket = _events(app, login_as(app.test_client(), member), auth={'scope': 'admin'})
+        assert not socket.is_connected(EVENTS_NAMESPACE)
+
+
+def test_members_removed_from_the_group_stop_receiving_site_events(app, login_as):
+    """Access is re-checked on every event, so a dropped member gets nothing more."""
+    with app.app_context():
+        admin, member, outsider, group, site = _setup(app)
+        admin_client = login_as(app.test_client(), admin)
+        member_events = _events(app, login_as(app.test_client(), member))
+        
+        sync_user_groups(member, [])
+        db.session.commit()
+        response = admin_client.put(f'/api/admin/sites/{site.id}', json={'description': 'Dashboards'})
+        assert response.status_code == 200
+        assert _received(member_events) == []
+
+
+def test_revoking_sessions_closes_the_users_rooms(app, login_as):
+    """Disabling a user tells their connections and stops delivery, even to admin connections."""
+    with app.app_context():
+        admin, member, outsider, group, site = _setup(app)
+        admin_client = login_as(app.test_client(), admin)
+        member_events = _events(app, login_as(app.test_client(), member))
+        admin_events = _events(app, admin_client, auth={'scope': 'admin'})
+        
+        assert admin_client.put(f'/api/admin/users/{member.id}', json={'disabled': True}).status_code == 200
+        assert _received(member_events) == [('session_revoked', {})]
+        
+        # Re-enabled without reconnecting: the old connection stays out of its room
+        assert admin_client.put(f'/api/admin/users/{member.id}', json={'disabled': False}).status_code == 200
+        _received(admin_events)
+        admin_client.put(f'/api/admin/sites/{site.id}', json={'description': 'Dashboards'})
+        assert _received(member_events) == []
+        assert [name for name, _ in _received(admin_events)] == ['site_updated']
@@ -0,0 +1,60 @@
+"""Test the forward-auth endpoint."""
+import pytest
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap
+from app.ldap.group_sync import sync_user_groups
+from app.utils.policy import compile_policy
+
+
+@pytest.fixture
+def mapped_site(app):
+    """A user mapped to one site through an LDAP group, plus an unmapped site."""
+    with app.app_context():
+        user = User(uid='proxyuser', email='proxy@example.com')
+        group = LDAPGroup(dn='cn=ops,ou=groups,dc=test')
+        site = Site(name='Grafana', url='https://grafana.example.com/')
+        other = Site(name='Vault', url='https://tools.example.com/vault')
+        db.session.add_all([user, group, site, other])
+        db.session.commit()
+        db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=site.id))
+        sync_user_groups(user, [group.dn])
+        db.session.commit()
+        yield user, site, other
+
+
+def test_host_index_longest_prefix(app):
+    """Requests map to the site with the longest matching path prefix."""
+    with app.app_context():
+        root = Site(name='Root', url='https://tools.example.com')
+        vault = Site(name='Vault', url='https://tools.example.com/vault/')
+        db.session.add_all([root, vault])
+        db.session.commit()
+        
+        snapshot = compile_policy()
+        assert snapshot.site_for_url('TOOLS.example.com:443', '/vault/ui') == vault.id
+        assert snapshot.site_for_url('tools.example.com', '/vaultish') == root.id
+        assert snapshot.site_for_url('unknown.example.com', '/') is None
+
+
+def test_verify_requires_session(client, mapped_site):
+    response = client.get('/api/auth/verify', headers={'X-Original-URL': 'https://grafana.example.com/'})
+    assert response.status_code == 401
+
+
+def test_verify_allows_mapped_site(client, mapped_site, login_as):
+    user, site, other = mapped_site
+    login_as(client, user)
+    
+    response = client.get('/api/auth/verify', headers={'X-Original-URL': 'https://grafana.example.com/d/abc'})
+    assert response.status_code == 200
+    assert response.headers['X-Auth-User'] == 'proxyuser'
+    assert response.headers['X-Auth-Site-Id'] == str(site.id)
+    
+    response = client.get('/api/auth/verify', headers={
+        'X-Forwarded-Host': 'tools.example.com',
+        'X-Forwarded-Uri': '/vault/login',
+    })
+    assert response.status_code == 403
+    
+    response = client.get('/api/auth/verify', headers={'X-Original-URL': 'https://nowhere.example.com/'})
+    assert response.status_code == 403
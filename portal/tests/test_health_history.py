@@ -0,0 +1,95 @@
+"""Test the downsampled health history store."""
+import pytest
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap
+from app.ldap.group_sync import sync_user_groups
+from app.utils import health_history
+from app.utils.health_history import RESOLUTIONS, record_health_results, get_health_history
+
+
+@pytest.fixture(autouse=True)
+def _clear_local_buffers():
+    health_history._local_buffers.clear()
+    yield
+    health_history._local_buffers.clear()
+
+
+def _result(ts, up=True, latency=10.0):
+    return {'status': 'up' if up else 'down', 'latency_ms': latency, 'checked_at': ts}
+
+
+def test_results_are_downsampled_per_resolution():
+    """Probes in the same bucket are aggregated; empty buckets are None."""
+    base = 1_700_000_000 - 1_700_000_000 % 3600
+    record_health_results(None, {1: _result(base, latency=10)})
+    record_health_results(None, {1: _result(base + 30, up=False, latency=30)})
+    record_health_results(None, {1: _result(base + 120, latency=40)})
+    
+    minutes = get_health_history(None, [1, 2], resolution='1m', points=3, now=base + 120)
+    assert minutes['start'] == base
+    assert minutes['sites'][1] == {'uptime': [0.5, None, 1.0], 'latency_ms': [20.0, None, 40.0]}
+    assert minutes['sites'][2] == {'uptime': [None] * 3, 'latency_ms': [None] * 3}
+    
+    hours = get_health_history(None, [1], resolution='1h', points=1, now=base + 120)
+    assert hours['sites'][1]['uptime'] == [round(2 / 3, 3)]
+
+
+def test_ring_buffer_memory_is_bounded():
+    """Old buckets are overwritten in place instead of growing the buffer."""
+    step, capacity = RESOLUTIONS['1m']
+    for i in range(capacity * 3):
+        record_health_results(None, {1: _result(i * step)})
+    
+    assert len(health_history._local_buffers[(1, '1m')]) == capacity * health_history.RECORD_SIZE
+    now = (capacity * 3 - 1) * step
+    history = get_health_history(None, [1], resolution='1m', points=capacity + 50, now=now)
+    assert history['sites'][1]['uptime'] == [1.0] * capacity
+    
+    with pytest.raises(ValueError):
+        get_health_history(None, [1], resolution='5m')
+
+
+def test_record_script_updates_redis_ring_buffers(fake_redis):
+    """The Lua script aggregates buckets in place and bounds each Redis string."""
+    step, capacity = RESOLUTIONS['1m']
+    base = 1_700_000_000 - 1_700_000_000 % 3600
+    record_health_results(fake_redis, {1: _result(base, latency=10), 2: _result(base, up=False, latency=5)})
+    record_health_results(fake_redis, {1: _result(base + 30, up=False, latency=30)})
+    record_health_results(fake_redis, {1: _result(base + 120, latency=40)})
+    
+    minutes = get_health_history(fake_redis, [1, 2, 3], resolution='1m', points=3, now=base + 120)
+    assert minutes['sites'][1] == {'uptime': [0.5, None, 1.0], 'latency_ms': [20.0, None, 40.0]}
+    assert minutes['sites'][2] == {'uptime': [0.0, None, None], 'latency_ms': [5.0, None, None]}
+    assert minutes['sites'][3] == {'uptime': [None] * 3, 'latency_ms': [None] * 3}
+    hours = get_health_history(fake_redis, [1], resolution='1h', points=1, now=base + 120)
+    assert hours['sites'][1]['uptime'] == [round(2 / 3, 3)]
+    
+    # A bucket one full ring later reuses the slot instead of appending.
+    key = health_history._history_key(1, '1m')
+    length = fake_redis.strlen(key)
+    record_health_results(fake_redis, {1: _result(base + step * capacity, latency=50)})
+    assert fake_redis.strlen(key) == length <= capacity * health_history.RECORD_SIZE
+    wrapped = get_health_history(fake_redis, [1], resolution='1m', points=1, now=base + step * capacity)
+    assert wrapped['sites'][1] == {'uptime': [1.0], 'latency_ms': [50.0]}
+    assert 0 < fake_redis.ttl(key) <= step * capacity
+
+
+def test_history_endpoint_limits_to_accessible_sites(app, client, login_as):
+    """Users only receive history for sites mapped to their groups."""
+    with app.app_context():
+        user = User(uid='testuser')
+        group = LDAPGroup(dn='cn=users,ou=groups,dc=test')
+        mine = Site(name='Mine', url='https://mine.example.com')
+        other = Site(name='Other', url='https://other.example.com')
+        db.session.add_all([user, group, mine, other])
+        db.session.commit()
+        db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=mine.id))
+        sync_user_groups(user, [group.dn])
+        db.session.commit()
+        
+        login_as(client, user)
+        
+        response = client.get(f'/api/sites/health/history?site_ids={mine.id},{other.id}&points=5')
+        assert response.status_code == 200
+        assert list(response.get_json()['sites']) == [str(mine.id)]
+        assert client.get('/api/sites/health/history?resolution=5m').status_code == 400
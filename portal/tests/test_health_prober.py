@@ -0,0 +1,105 @@
+"""Test the background health prober."""
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from app.db import db
+from app.models import Site
+from app.utils.health_prober import HealthProber, probe_url, HEALTH_LEADER_KEY
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == '/ok' else 503)
+        self.end_headers()
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def health_server():
+    server = HTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_probe_url_reports_status(health_server):
+    """2xx/3xx is up; errors and other statuses are down."""
+    assert probe_url(f'{health_server}/ok', timeout=2)['status'] == 'up'
+    failing = probe_url(f'{health_server}/fail', timeout=2)
+    assert failing['status'] == 'down' and failing['http_status'] == 503
+    unreachable = probe_url('http://127.0.0.1:1/', timeout=1)
+    assert unreachable['status'] == 'down' and unreachable['error']
+
+
+def test_schedule_uses_per_site_intervals(app):
+    """Every site with a health URL is scheduled within its interval and rescheduled with jitter."""
+    with app.app_context():
+        db.session.add_all([
+            Site(name='Fast', url='https://fast.example.com', health_url='https://fast.example.com/h', health_interval=10),
+            Site(name='Default', url='https://default.example.com', health_url='https://default.example.com/h'),
+            Site(name='None', url='https://none.example.com'),
+        ])
+        db.session.commit()
+        
+        prober = HealthProber(app)
+        prober.load_sites()
+        assert sorted(interval for _, interval, _ in prober.sites.values()) == [10, app.config['HEALTH_PROBE_INTERVAL']]
+        
+        due = prober.due_sites(now=10**9)
+        assert len(due) == 2
+        assert prober.due_sites(now=10**9) == []
+        next_due = {site_id: due_at for due_at, site_id in prober.schedule}
+        fast_id = Site.query.filter_by(name='Fast').first().id
+        assert 10**9 + 9 <= next_due[fast_id] <= 10**9 + 11
+
+
+def test_refresh_forgets_sites_no_longer_probed(app):
+    """Latest results of deleted sites (or sites without a health URL) are removed on refresh."""
+    class FakeRedis:
+        def __init__(self, statuses):
+            self.statuses = statuses
+        
+        def hkeys(self, key):
+            return list(self.statuses)
+        
+        def hdel(self, key, *fields):
+            for field in fields:
+                self.statuses.pop(field)
+    
+    with app.app_context():
+        site = Site(name='Probed', url='https://probed.example.com', health_url='https://probed.example.com/h')
+        db.session.add(site)
+        db.session.commit()
+        site_id = site.id
+        redis_client = FakeRedis({str(site_id): '{}', str(site_id + 1): '{}'})
+        
+        HealthProber(app).load_sites(redis_client)
+        assert list(redis_client.statuses) == [str(site_id)]
+
+
+def test_only_one_prober_leads(app):
+    """The leader lease is held by a single prober until it expires."""
+    class FakeRedis:
+        def __init__(self):
+            self.values = {}
+        
+        def set(self, key, value, nx=False, px=None):
+            if nx and key in self.values:
+                return None
+            self.values[key] = value
+            return True
+        
+        def eval(self, script, numkeys, key, token, ttl):
+            return 1 if self.values.get(key) == token else 0
+    
+    redis_client = FakeRedis()
+    first, second = HealthProber(app), HealthProber(app)
+    assert first._update_leadership(redis_client) is True
+    assert second._update_leadership(redis_client) is False
+    
+    first._lease_checked_at = 0
+    assert first._update_leadership(redis_client) is True
+    assert redis_client.values[HEALTH_LEADER_KEY] == first.token
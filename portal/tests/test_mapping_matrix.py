@@ -0,0 +1,38 @@
+"""Test the mapping matrix endpoint."""
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap, Role, RoleMapping
+
+
+def test_mapping_matrix_and_etag(app, client, login_as):
+    with app.app_context():
+        admin = User(uid='admin', is_local_admin=True)
+        group = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+        unmapped = LDAPGroup(dn='cn=unused,dc=test', cn='unused')
+        site = Site(name='Grafana', url='https://grafana.example.com')
+        db.session.add_all([admin, group, unmapped, site])
+        db.session.commit()
+        role = Role.query.filter_by(name='admin').first()
+        site_map = GroupSiteMap(ldap_group_id=group.id, site_id=site.id)
+        role_map = RoleMapping(ldap_group_id=group.id, role_id=role.id)
+        db.session.add_all([site_map, role_map])
+        db.session.commit()
+        
+        login_as(client, admin)
+        
+        response = client.get('/api/admin/mapping-matrix')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [g['dn'] for g in data['groups']] == ['cn=ops,dc=test']
+        assert data['site_groups'] == [[site_map.id, site.id, group.id]]
+        assert data['role_mappings'] == [[role_map.id, role.id, group.id]]
+        assert any(r['name'] == 'admin' for r in data['roles'])
+        
+        etag = response.headers['ETag']
+        cached = client.get('/api/admin/mapping-matrix', headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+        
+        db.session.delete(site_map)
+        db.session.commit()
+        changed = client.get('/api/admin/mapping-matrix', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.get_json()['site_groups'] == []
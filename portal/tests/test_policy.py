@@ -0,0 +1,120 @@
+"""Test the compiled RBAC policy snapshot."""
+import threading
+import pytest
+from app.db import db
+from app.models import User, LDAPGroup, Role, RoleMapping, Site, GroupSiteMap
+from app.ldap.group_sync import sync_user_groups
+from app.utils.policy import compile_policy, get_policy, bump_policy_version
+from app.utils.dn import canonicalize_dn
+from app.utils.rbac import get_user_roles
+
+
+def test_compile_policy_uses_canonical_dns(app):
+    """Snapshot maps canonical group DNs to role names and site IDs."""
+    with app.app_context():
+        group = LDAPGroup(dn='CN=Admins, OU=Groups,DC=Test')
+        role = Role.query.filter_by(name='admin').first()
+        site = Site(name='Site', url='https://site.example.com')
+        db.session.add_all([group, site])
+        db.session.commit()
+        db.session.add_all([
+            RoleMapping(ldap_group_id=group.id, role_id=role.id),
+            GroupSiteMap(ldap_group_id=group.id, site_id=site.id),
+        ])
+        db.session.commit()
+        
+        snapshot = compile_policy()
+        groups = {canonicalize_dn('cn=admins,ou=groups,dc=test')}
+        
+        assert snapshot.roles_for(groups) == {'admin'}
+        assert snapshot.sites_for(groups) == {site.id}
+        assert snapshot.roles_for({'cn=other,dc=test'}) == set()
+
+
+def test_bump_policy_version_invalidates_snapshot(app, client, login_as):
+    """Mapping changes are visible immediately after bump_policy_version()."""
+    with app.app_context():
+        user = User(uid='testuser')
+        group = LDAPGroup(dn='cn=users,ou=groups,dc=test')
+        site = Site(name='Site', url='https://site.example.com')
+        db.session.add_all([user, group, site])
+        db.session.commit()
+        sync_user_groups(user, ['cn=users,ou=groups,dc=test'])
+        db.session.commit()
+        
+        login_as(client, user)
+        
+        assert client.get('/api/sites').get_json()['sites'] == []
+        stale = get_policy()
+        
+        db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=site.id))
+        db.session.commit()
+        bump_policy_version()
+        
+        assert get_policy() is not stale
+        assert [s['name'] for s in client.get('/api/sites').get_json()['sites']] == ['Site']
+
+
+def test_principal_roles_match_materialized_roles(app, client, login_as):
+    """Snapshot-resolved roles and user_effective_roles come from the same memberships."""
+    with app.app_context():
+        user = User(uid='testuser')
+        group = LDAPGroup(dn='cn=ops,ou=groups,dc=test')
+        db.session.add_all([user, group])
+        db.session.commit()
+        role = Role.query.filter_by(name='admin').first()
+        db.session.add(RoleMapping(ldap_group_id=group.id, role_id=role.id))
+        db.session.commit()
+        sync_user_groups(user, ['CN=Ops,OU=Groups,DC=Test'])
+        db.session.commit()
+        bump_policy_version()
+        
+        login_as(client, user)
+        
+        assert client.get('/api/auth/me').get_json()['roles'] == get_user_roles(user.id) == ['admin']
+        
+        # cached_groups drifting from the membership table grants nothing
+        sync_user_groups(user, [])
+        user.cached_groups = ['cn=ops,ou=groups,dc=test']
+        db.session.commit()
+        with client.session_transaction() as sess:
+            sess.pop('claims', None)
+        assert client.get('/api/auth/me').get_json()['roles'] == get_user_roles(user.id) == []
+
+
+def test_invalidation_listener_logs_and_backs_off(monkeypatch):
+    """Connection failures are logged and retried with growing delays."""
+    from app.utils import policy
+    
+    class Stop(Exception):
+        pass
+    
+    class Logger:
+        def __init__(self):
+            self.warnings = []
+        
+        def warning(self, message):
+            self.warnings.append(message)
+    
+    delays = []
+    real_sleep = policy.time.sleep
+    
+    def sleep(seconds):
+        if threading.current_thread() is not threading.main_thread():
+            return real_sleep(seconds)  # Listener threads of other apps
+        delays.append(seconds)
+        if len(delays) == 4:
+            raise Stop()
+    
+    def refuse(*args, **kwargs):
+        raise ConnectionError('Connection refused')
+    
+    monkeypatch.setattr(policy.redis, 'from_url', refuse)
+    monkeypatch.setattr(policy.time, 'sleep', sleep)
+    logger = Logger()
+    with pytest.raises(Stop):
+        policy._listen_for_invalidations('redis://localhost:1/0', policy._PolicyState(), logger)
+    
+    assert delays == [5, 10, 20, 40]
+    assert len(logger.warnings) == 4
+    assert 'Connection refused' in logger.warnings[0]
@@ -0,0 +1,150 @@
+"""Test the rate limiting decorator and shared Redis client."""
+import pytest
+from flask import jsonify
+from prometheus_client import REGISTRY
+from app.utils import security
+from app.utils.security import rate_limit, parse_rate_limits, get_redis_client
+
+
+def _decisions(endpoint, result):
+    return REGISTRY.get_sample_value(
+        'hlspg_rate_limit_decisions_total', {'endpoint': endpoint, 'result': result}
+    ) or 0
+
+
+def _add_limited_route(app, **kwargs):
+    @rate_limit(**kwargs)
+    def limited():
+        return jsonify({'ok': True})
+    app.add_url_rule('/limited', 'limited', limited)
+
+
+def test_parse_rate_limits():
+    """Overrides parse to (requests, period, scope); malformed entries raise."""
+    assert parse_rate_limits('auth.login=5/60/ip, api.bootstrap=120/60/user,api.sites=30/10') == {
+        'auth.login': (5, 60, 'ip'),
+        'api.bootstrap': (120, 60, 'user'),
+        'api.sites': (30, 10, None),
+    }
+    assert parse_rate_limits('') == {}
+    with pytest.raises(ValueError):
+        parse_rate_limits('auth.login=5')
+    with pytest.raises(ValueError):
+        parse_rate_limits('auth.login=5/60/everyone')
+
+
+def test_redis_client_is_shared(app):
+    """Every caller gets the same pooled client."""
+    with app.app_context():
+        assert get_redis_client() is get_redis_client()
+
+
+def test_fails_open_without_redis(app, client):
+    """Requests are allowed (and counted as errors) when Redis is unreachable."""
+    _add_limited_route(app, max_requests=1, period=60)
+    before = _decisions('limited', 'error')
+    assert client.get('/limited').status_code == 200
+    assert client.get('/limited').status_code == 200
+    assert _decisions('limited', 'error') == before + 2
+
+
+def test_limits_per_user_with_config_override(app, client, monkeypatch):
+    """User-scoped limits key on the user ID; RATE_LIMITS overrides the decorator."""
+    calls = []
+    
+    def fake_check(key, limit, period):
+        calls.append((key, limit, period))
+        return len(calls) <= 1, 0, 7
+    
+    monkeypatch.setattr(security, 'check_rate_limit', fake_check)
+    app.config['RATE_LIMITS'] = 'limited=3/30'
+    _add_limited_route(app, max_requests=100, period=60, scope='user')
+    with client.session_transaction() as sess:
+        sess['user_id'] = 42
+    before = _decisions('limited', 'limited')
+    
+    assert client.get('/limited').status_code == 200
+    response = client.get('/limited')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '7'
+    assert response.get_json()['retry_after'] == 7
+    assert calls[0] == ('rate_limit:limited:user:42', 3, 30)
+    assert _decisions('limited', 'limited') == before + 1
+
+
+class _RedisClock:
+    """Stands in for the time module behind fakeredis' TIME command."""
+    
+    def __init__(self, now):
+        self.now = now
+    
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def redis_clock(monkeypatch):
+    clock = _RedisClock(600 * 60 + 30)
+    monkeypatch.setattr('fakeredis.commands_mixins.server_mixin.time', clock)
+    return clock
+
+
+def _drain(key, limit, period):
+    """Call check_rate_limit until rejected; returns the allowed results and the rejection."""
+    allowed = []
+    while True:
+        result = security.check_rate_limit(key, limit, period)
+        if not result[0]:
+            return allowed, result
+        allowed.append(result)
+        assert len(allowed) <= limit
+
+
+def test_sliding_window_script_rejects_over_limit(app, fake_redis, redis_clock):
+    """limit+1 requests in a window are rejected with the wait until one fits."""
+    with app.app_context():
+        allowed, rejected = _drain('rate_limit:test', 5, 60)
+    
+    assert [remaining for _, remaining, _ in allowed] == [4, 3, 2, 1, 0]
+    # 30 s left in this window, then 5 weighted previous requests must decay
+    # to 4 (12 s into the next one).
+    assert rejected == (False, 0, 42)
+    assert fake_redis.hgetall('rate_limit:test') == {'600': '5'}
+    assert 0 < fake_redis.ttl('rate_limit:test') <= 120
+
+
+def test_sliding_window_script_weights_previous_window(app, fake_redis, redis_clock):
+    """Halfway into a window, half of the previous window's requests still count."""
+    with app.app_context():
+        _drain('rate_limit:test', 5, 60)
+        
+        redis_clock.now += 60
+        allowed, rejected = _drain('rate_limit:test', 5, 60)
+        # 2.5 weighted + 2 current: the next request fits once the weight
+        # drops to 2, 6 s later.
+        assert [remaining for _, remaining, _ in allowed] == [1, 0]
+        assert rejected == (False, 0, 6)
+        
+        redis_clock.now += 6
+        assert security.check_rate_limit('rate_limit:test', 5, 60) == (True, 0, 0)
+        
+        redis_clock.now += 60
+        assert security.check_rate_limit('rate_limit:test', 5, 60)[0]
+    
+    # Windows older than the previous one are dropped.
+    assert fake_redis.hgetall('rate_limit:test') == {'601': '3', '602': '1'}
+
+
+def test_retry_after_header_from_script(app, client, fake_redis, redis_clock):
+    """The decorator turns the script's wait into the Retry-After header."""
+    _add_limited_route(app, max_requests=2, period=10)
+    redis_clock.now = 1000 * 10 + 2.5
+    
+    assert client.get('/limited').status_code == 200
+    assert client.get('/limited').status_code == 200
+    response = client.get('/limited')
+    assert response.status_code == 429
+    # 7.5 s left in the window plus 5 s for the 2 weighted requests to decay
+    # to 1, rounded up.
+    assert response.headers['Retry-After'] == '13'
+    assert response.get_json()['retry_after'] == 13
@@ -2,7 +2,8 @@
 import pytest
 from app.db import db
 from app.models import User, Role, LDAPGroup, RoleMapping
-from app.utils.rbac import get_user_roles, has_role
+from app.ldap.group_sync import sync_user_groups
+from app.utils.rbac import get_user_roles, get_roles_for_users, has_role
 
 
 def test_get_user_roles(app):
@@ -21,6 +22,7 @@ def test_get_user_roles(app):
         # Create mapping
         mapping = RoleMapping(ldap_group_id=group.id, role_id=role.id)
         db.session.add(mapping)
+        sync_user_groups(user, user.cached_groups)
         db.session.commit()
         
         # Test role retrieval
@@ -41,8 +43,75 @@ def test_has_role(app):
         
         mapping = RoleMapping(ldap_group_id=group.id, role_id=role.id)
         db.session.add(mapping)
+        sync_user_groups(user, user.cached_groups)
         db.session.commit()
         
         assert has_role(user.id, 'admin') is True
         assert has_role(user.id, 'user') is False
 
+
+
+def test_get_user_roles_canonical_dn_match(app):
+    """Cached group DNs match LDAP groups regardless of case/spacing."""
+    with app.app_context():
+        user = User(uid='testuser', cached_groups=['CN=Operators, OU=Groups, DC=Test'])
+        role = Role(name='operator')
+        group = LDAPGroup(dn='cn=operators,ou=groups,dc=test', cn='operators')
+        db.session.add_all([user, role, group])
+        db.session.commit()
+        
+        assert group.dn_canonical == 'cn=operators,ou=groups,dc=test'
+        
+        db.session.add(RoleMapping(ldap_group_id=group.id, role_id=role.id))
+        sync_user_groups(user, user.cached_groups)
+        db.session.commit()
+        
+        assert get_user_roles(user.id) == ['operator']
+
+
+def test_sync_user_groups(app):
+    """Memberships are created, deduplicated and pruned in bulk."""
+    with app.app_context():
+        user = User(uid='testuser')
+        db.session.add(user)
+        
+        stored = sync_user_groups(user, ['cn=a,dc=test', 'CN=A, DC=test', 'cn=b,dc=test'])
+        db.session.commit()
+        
+        assert stored == ['cn=a,dc=test', 'cn=b,dc=test']
+        assert sorted(g.dn for g in user.groups) == ['cn=a,dc=test', 'cn=b,dc=test']
+        assert LDAPGroup.query.count() == 2
+        
+        sync_user_groups(user, ['cn=b,dc=test'])
+        db.session.commit()
+        
+        assert [g.dn for g in user.groups] == ['cn=b,dc=test']
+        assert user.cached_groups == ['cn=b,dc=test']
+
+
+def test_get_roles_for_users(app):
+    """Roles for many users are resolved together."""
+    with app.app_context():
+        alice = User(uid='alice')
+        bob = User(uid='bob')
+        carol = User(uid='carol')
+        operator = Role(name='operator')
+        auditor = Role(name='auditor')
+        ops = LDAPGroup(dn='cn=ops,dc=test', cn='ops')
+        audit = LDAPGroup(dn='cn=audit,dc=test', cn='audit')
+        db.session.add_all([alice, bob, carol, operator, auditor, ops, audit])
+        db.session.flush()
+        db.session.add_all([
+            RoleMapping(ldap_group_id=ops.id, role_id=operator.id),
+            RoleMapping(ldap_group_id=audit.id, role_id=auditor.id),
+        ])
+        sync_user_groups(alice, ['cn=ops,dc=test', 'cn=audit,dc=test'])
+        sync_user_groups(bob, ['cn=audit,dc=test'])
+        db.session.commit()
+        
+        roles = get_roles_for_users()
+        
+        assert roles[alice.id] == ['auditor', 'operator']
+        assert roles[bob.id] == ['auditor']
+        assert carol.id not in roles
+        assert get_roles_for_users([bob.id]) == {bob.id: ['auditor']}
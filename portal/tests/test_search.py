@@ -0,0 +1,45 @@
+"""Test the global admin search."""
+from app.db import db
+from app.models import User, LDAPGroup, Site, Certificate
+
+
+def test_search_ranks_across_types(app, admin_client):
+    """Exact and substring matches rank above fuzzy ones; types can be filtered."""
+    with app.app_context():
+        db.session.add_all([
+            Site(name='Grafana', url='https://grafana.lab.example.com', owner='ops'),
+            Site(name='Grafana Loki', url='https://loki.lab.example.com'),
+            User(uid='jdoe', display_name='Jane Grafton', email='jane@example.com'),
+            LDAPGroup(dn='cn=grafana-admins,ou=groups,dc=test', cn='grafana-admins'),
+            Certificate(name='Lab CA', certificate_data='PEM', filename='lab-ca.pem'),
+        ])
+        db.session.commit()
+        
+        results = admin_client.get('/api/admin/search?q=grafana').get_json()['results']
+        assert results[0]['title'] == 'Grafana'
+        assert {r['type'] for r in results} == {'sites', 'groups'}
+        
+        fuzzy = admin_client.get('/api/admin/search?q=grafna&types=sites').get_json()['results']
+        assert [r['title'] for r in fuzzy][:1] == ['Grafana']
+        
+        assert admin_client.get('/api/admin/search?q=lab ca&types=certificates').get_json()['results'][0]['subtitle'] == 'lab-ca.pem'
+        assert admin_client.get('/api/admin/search?q=x&types=bogus').status_code == 400
+        assert admin_client.get('/api/admin/search').status_code == 400
+
+
+def test_search_index_follows_commits(app, admin_client):
+    """Renamed and deleted rows are reflected after commit."""
+    with app.app_context():
+        site = Site(name='Proxmox', url='https://pve.example.com')
+        db.session.add(site)
+        db.session.commit()
+        assert admin_client.get('/api/admin/search?q=proxmox').get_json()['results'][0]['id'] == site.id
+        
+        site.name = 'Hypervisor'
+        db.session.commit()
+        assert admin_client.get('/api/admin/search?q=proxmox').get_json()['results'] == []
+        assert admin_client.get('/api/admin/search?q=hypervisor').get_json()['results'][0]['id'] == site.id
+        
+        db.session.delete(site)
+        db.session.commit()
+        assert admin_client.get('/api/admin/search?q=hypervisor').get_json()['results'] == []
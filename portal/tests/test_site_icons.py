@@ -0,0 +1,137 @@
+"""Test server-side site icon fetching and caching."""
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap
+from app.ldap.group_sync import sync_user_groups
+from app.utils.site_icons import IconCache, ICON_NAME_PATTERN, icon_candidates, get_icon_cache
+
+
+def _png(color):
+    """A valid 2x2 RGB PNG."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + bytes(color) * 2 for _ in range(2))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 2, 2, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+PAGE = b'<html><head><link rel="icon" href="/static/icon.png" sizes="32x32"></head><body></body></html>'
+ICONS = {'/static/icon.png': _png((255, 0, 0)), '/favicon.ico': _png((0, 0, 255))}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/':
+            body, content_type = PAGE, 'text/html; charset=utf-8'
+        elif self.path in ICONS:
+            body, content_type = ICONS[self.path], 'image/png'
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def icon_server():
+    server = HTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_icon_candidates_prefer_declared_sizes():
+    """Icons at least the target size come first, SVG is skipped and /favicon.ico is last."""
+    html = (
+        '<head><link rel="icon" href="/small.png" sizes="16x16">'
+        '<link rel="apple-touch-icon" href="/touch.png" sizes="180x180">'
+        '<link rel="icon" href="/vector.svg" type="image/svg+xml">'
+        '<link rel="icon" href="/medium.png" sizes="96x96"></head>'
+    )
+    assert icon_candidates('https://site.example.com/app/', html, 64) == [
+        'https://site.example.com/medium.png',
+        'https://site.example.com/touch.png',
+        'https://site.example.com/small.png',
+        'https://site.example.com/favicon.ico',
+    ]
+
+
+def test_refresh_follows_site_updated_at(tmp_path, icon_server):
+    """Icons are stored under their content hash and go stale when the site changes."""
+    icons = IconCache(str(tmp_path))
+    updated_at = datetime(2024, 1, 1)
+    
+    assert icons.lookup(1, updated_at) == (None, True)
+    name = icons.refresh(1, f'{icon_server}/', updated_at)
+    assert ICON_NAME_PATTERN.match(name)
+    assert icons.lookup(1, updated_at) == (name, False)
+    assert icons.lookup(1, datetime(2024, 2, 1)) == (name, True)
+    
+    # Identical content shares one file
+    assert icons.refresh(2, f'{icon_server}/', updated_at) == name
+    
+    # A site without any icon is retried only after retry_after
+    assert icons.refresh(3, 'http://127.0.0.1:1/', updated_at) is None
+    assert icons.lookup(3, updated_at) == (None, False)
+
+
+def test_evict_removes_least_recently_served(tmp_path):
+    """The cache is trimmed to max_bytes, oldest mtime first."""
+    icons = IconCache(str(tmp_path), max_bytes=250)
+    names = [f'{str(i) * 32}.png' for i in range(3)]
+    for age, name in zip((300, 200, 100), names):
+        path = tmp_path / name
+        path.write_bytes(b'x' * 100)
+        mtime = path.stat().st_mtime - age
+        os.utime(path, (mtime, mtime))
+    
+    icons.evict()
+    assert sorted(os.listdir(tmp_path)) == names[1:]
+
+
+def test_icon_endpoints(app, client, tmp_path, icon_server, login_as):
+    """Site icons redirect to immutable, content-hashed URLs for users with access."""
+    with app.app_context():
+        app.config['SITE_ICON_CACHE_DIR'] = str(tmp_path)
+        user = User(uid='iconuser')
+        group = LDAPGroup(dn='cn=users,ou=groups,dc=test', cn='users')
+        site = Site(name='Iconic', url=f'{icon_server}/')
+        other = Site(name='Other', url=f'{icon_server}/other')
+        db.session.add_all([user, group, site, other])
+        db.session.commit()
+        db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=site.id))
+        sync_user_groups(user, ['CN=Users,OU=Groups,DC=test'])
+        db.session.commit()
+        
+        name = get_icon_cache(app).refresh(site.id, site.url, site.updated_at)
+        
+        login_as(client, user)
+        
+        assert client.get(f'/api/sites/{other.id}/icon').status_code == 403
+        
+        response = client.get(f'/api/sites/{site.id}/icon')
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith(f'/api/icons/{name}')
+        
+        response = client.get(f'/api/icons/{name}')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/png'
+        assert 'immutable' in response.headers['Cache-Control']
+        
+        cached = client.get(f'/api/icons/{name}', headers={'If-None-Match': response.headers['ETag']})
+        assert cached.status_code == 304
+        assert client.get('/api/icons/../secret.png').status_code == 404
@@ -0,0 +1,30 @@
+"""Test site token template resolution."""
+from app.db import db
+from app.models import Site
+from app.utils.site_tokens import compile_template, resolve_site_tokens, get_resolved_tokens
+
+
+def test_compile_template_static_short_circuit():
+    assert compile_template('https://static.example.com') is None
+    assert compile_template('${URL}/console') == ((None, 'URL', '${URL}'), ('/console', None, None))
+
+
+def test_resolve_site_tokens_keeps_unknown_placeholders(app):
+    with app.app_context():
+        site = Site(name='Box', url='https://box.example.com')
+        assert resolve_site_tokens('${ url }/x ${UNKNOWN}', site) == 'https://box.example.com/x ${UNKNOWN}'
+        assert resolve_site_tokens(None, site) is None
+
+
+def test_resolved_tokens_stored_on_save(app):
+    with app.app_context():
+        site = Site(name='Box', url='https://box.example.com', console_url='${URL}/console',
+                    inline_proxy_instructions='Connect to ${NAME}')
+        db.session.add(site)
+        db.session.commit()
+        assert site.resolved_tokens['console_url'] == 'https://box.example.com/console'
+        assert site.resolved_tokens['inline_proxy_instructions'] == 'Connect to Box'
+        
+        site.url = 'https://new.example.com'
+        db.session.commit()
+        assert get_resolved_tokens(site)['console_url'] == 'https://new.example.com/console'
@@ -0,0 +1,209 @@
+"""Test site access endpoints."""
+from app.db import db
+from app.models import User, LDAPGroup, Site, GroupSiteMap
+from app.ldap.group_sync import sync_user_groups
+
+
+def test_accessible_sites_follow_group_membership(app, client, login_as):
+    """Only visible sites mapped to the user's groups are returned."""
+    with app.app_context():
+        user = User(uid='testuser')
+        group = LDAPGroup(dn='cn=users,ou=groups,dc=test', cn='users')
+        visible = Site(name='Visible', url='https://visible.example.com')
+        hidden = Site(name='Hidden', url='https://hidden.example.com', visible=False)
+        unmapped = Site(name='Unmapped', url='https://unmapped.example.com')
+        db.session.add_all([user, group, visible, hidden, unmapped])
+        db.session.commit()
+        
+        db.session.add_all([
+            GroupSiteMap(ldap_group_id=group.id, site_id=visible.id),
+            GroupSiteMap(ldap_group_id=group.id, site_id=hidden.id),
+        ])
+        sync_user_groups(user, ['CN=Users,OU=Groups,DC=test'])
+        db.session.commit()
+        
+        login_as(client, user)
+        response = client.get('/api/sites')
+        
+        assert response.status_code == 200
+        assert [s['name'] for s in response.get_json()['sites']] == ['Visible']
+
+
+def test_accessible_sites_requires_login(client):
+    """Anonymous requests are rejected."""
+    response = client.get('/api/sites')
+    assert response.status_code == 401
+
+
+class _FakeRedis:
+    """Minimal hash store standing in for Redis."""
+    
+    def __init__(self):
+        self.hashes = {}
+    
+    def hmget(self, key, *fields):
+        return [self.hashes.get(key, {}).get(f) for f in fields]
+    
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+    
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+    
+    def expire(self, key, seconds):
+        pass
+    
+    def pipeline(self):
+        return self
+    
+    def execute(self):
+        return []
+
+
+def test_sites_etag_and_shared_cache(app, client, monkeypatch, login_as):
+    """Users with the same groups share one cached payload; ETags yield 304."""
+    fake = _FakeRedis()
+    monkeypatch.setattr('app.api.sites.get_redis_client', lambda: fake)
+    
+    with app.app_context():
+        first = User(uid='first')
+        second = User(uid='second')
+        group = LDAPGroup(dn='cn=users,ou=groups,dc=test')
+        site = Site(name='Shared', url='https://shared.example.com')
+        db.session.add_all([first, second, group, site])
+        db.session.commit()
+        db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=site.id))
+        sync_user_groups(first, [group.dn])
+        sync_user_groups(second, ['CN=Users,OU=Groups,DC=test'])
+        db.session.commit()
+        
+        login_as(client, first)
+        response = client.get('/api/sites')
+        etag = response.headers['ETag']
+        assert [s['name'] for s in response.get_json()['sites']] == ['Shared']
+        assert len(fake.hashes) == 1
+        
+        login_as(client, second)
+        assert client.get('/api/sites', headers={'If-None-Match': etag}).status_code == 304
+        assert len(fake.hashes) == 1
+
+
+def test_admin_sites_keyset_pagination_and_filters(app, client, login_as):
+    """Admin listing pages with cursors and filters server-side."""
+    with app.app_context():
+        admin = User(uid='admin', is_local_admin=True)
+        db.session.add(admin)
+        db.session.add_all([
+            Site(name=f'Site {i:02d}', url=f'https://site{i}.example.com', owner='ops' if i % 2 else 'dev',
+                 access_methods=['HTTPS', 'SSH'] if i % 3 == 0 else ['HTTPS'])
+            for i in range(7)
+        ])
+        db.session.commit()
+        login_as(client, admin)
+        
+        names = []
+        cursor = None
+        while True:
+            url = '/api/admin/sites?limit=3' + (f'&cursor={cursor}' if cursor else '')
+            data = client.get(url).get_json()
+            names.extend(s['name'] for s in data['sites'])
+            assert data['total_estimate'] == 7
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        assert names == [f'Site {i:02d}' for i in range(7)]
+        
+        data = client.get('/api/admin/sites?sort=-name&owner=OPS&access_method=SSH').get_json()
+        assert [s['name'] for s in data['sites']] == ['Site 03']
+        assert data['total_estimate'] == 1
+        
+        assert client.get('/api/admin/sites?sort=bogus').status_code == 400
+        assert client.get('/api/admin/sites?limit=2&cursor=garbage').status_code == 400
+
+
+def test_sites_include_latest_health(app, client, monkeypatch, login_as):
+    """Probe results are merged into cached payloads and change the ETag; deleting a site drops its result."""
+    from app.utils.health_prober import HEALTH_STATUS_KEY
+    fake = _FakeRedis()
+    monkeypatch.setattr('app.api.sites.get_redis_client', lambda: fake)
+    monkeypatch.setattr('app.admin.sites.get_redis_client', lambda: fake)
+    
+    with app.app_context():
+        user = User(uid='testuser')
+        group = LDAPGroup(dn='cn=users,ou=groups,dc=test')
+        site = Site(name='Probed', url='https://probed.example.com', health_url='https://probed.example.com/health')
+        db.session.add_all([user, group, site])
+        db.session.commit()
+        db.session.add(GroupSiteMap(ldap_group_id=group.id, site_id=site.id))
+        sync_user_groups(user, [group.dn])
+        db.session.commit()
+        site_id = site.id
+        
+        login_as(client, user)
+        first = client.get('/api/sites')
+        assert 'health' not in first.get_json()
+        
+        fake.hset(HEALTH_STATUS_KEY, mapping={str(site_id): '{"status":"up","latency_ms":12.5,"checked_at":1}'})
+        second = client.get('/api/sites')
+        assert second.get_json()['health'][str(site_id)]['status'] == 'up'
+        assert second.get_json()['sites'] == first.get_json()['sites']
+        assert second.headers['ETag'] != first.headers['ETag']
+        
+        admin = User(uid='admin', is_local_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        login_as(client, admin)
+        assert client.delete(f'/api/admin/sites/{site_id}').status_code == 200
+        assert fake.hashes[HEALTH_STATUS_KEY] == {}
+
+
+def test_admin_sites_sparse_fieldsets(app, client, login_as):
+    """Only requested fields are serialized and their columns fetched."""
+    from sqlalchemy import event
+    
+    with app.app_context():
+        admin = User(uid='admin', is_local_admin=True)
+        db.session.add_all([admin, Site(name='Big', url='https://big.example.com', inline_proxy_instructions='x' * 1000)])
+        db.session.commit()
+        login_as(client, admin)
+        
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            data = client.get('/api/admin/sites?fields=name,url').get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        assert data['sites'] == [{'name': 'Big', 'url': 'https://big.example.com'}]
+        site_selects = [s for s in statements if 'FROM sites' in s]
+        assert site_selects and not any('inline_proxy_instructions' in s for s in site_selects)
+        
+        assert 'inline_proxy_instructions' not in client.get('/api/admin/sites').get_json()['sites'][0]
+        assert len(client.get('/api/admin/sites?fields=all').get_json()['sites'][0]) == 27
+        assert client.get('/api/admin/sites?fields=bogus').status_code == 400
+        assert client.get('/api/admin/users?fields=uid,auth_type').get_json()['users'] == [{'uid': 'admin', 'auth_type': 'Local'}]
+
+
+def test_user_sites_escape_wildcards_and_count_visible(app, client, login_as):
+    """LIKE wildcards in the name filter match literally; hidden sites are not counted."""
+    with app.app_context():
+        user = User(uid='testuser')
+        group = LDAPGroup(dn='cn=users,ou=groups,dc=test')
+        sites = [
+            Site(name='Uptime 100%', url='https://uptime.example.com'),
+            Site(name='Build_01', url='https://build.example.com'),
+            Site(name='Builder', url='https://builder.example.com'),
+            Site(name='Hidden', url='https://hidden.example.com', visible=False),
+        ]
+        db.session.add_all([user, group, *sites])
+        db.session.commit()
+        db.session.add_all([GroupSiteMap(ldap_group_id=group.id, site_id=site.id) for site in sites])
+        sync_user_groups(user, [group.dn])
+        db.session.commit()
+        login_as(client, user)
+        
+        assert client.get('/api/sites').get_json()['total_estimate'] == 3
+        assert [s['name'] for s in client.get('/api/sites?name=%25').get_json()['sites']] == ['Uptime 100%']
+        assert [s['name'] for s in client.get('/api/sites?name=d_').get_json()['sites']] == ['Build_01']
@@ -0,0 +1,71 @@
+"""Test portal-signed access tokens and JWKS."""
+import pytest
+from app.db import db
+from app.models import SigningKey
+from app.utils.rbac import Principal
+from app.utils.tokens import (
+    issue_token, verify_token, rotate_signing_key, generate_signing_key, get_jwks, TokenError,
+)
+
+
+def _principal():
+    return Principal(1, 'tokenuser', False, [], display_name='Token User', roles=['user'])
+
+
+def test_issue_and_verify_token(app):
+    """Tokens verify against the published key and carry the site audience."""
+    with app.app_context():
+        token, expires_in = issue_token(_principal(), site_id=7)
+        
+        claims = verify_token(token, audience='site:7')
+        assert claims['sub'] == 'tokenuser'
+        assert claims['user_id'] == 1
+        assert claims['roles'] == ['user']
+        assert claims['site_id'] == 7
+        assert expires_in == app.config['ACCESS_TOKEN_TTL']
+        
+        with pytest.raises(TokenError):
+            verify_token(token, audience='site:8')
+        
+        header, payload, signature = token.split('.')
+        with pytest.raises(TokenError):
+            verify_token(f'{header}.{payload}.{signature[::-1]}')
+
+
+def test_rotation_keeps_old_key_published(app):
+    """After rotation the retired key stays in the JWKS and old tokens still verify."""
+    with app.app_context():
+        old_token, _ = issue_token(_principal())
+        old_kid = SigningKey.query.one().kid
+        
+        rotate_signing_key(activate_in=0)
+        db.session.commit()
+        app.extensions.pop('hlspg_signing_keys', None)
+        
+        new_token, _ = issue_token(_principal())
+        kids = {key['kid'] for key in get_jwks()['keys']}
+        
+        assert old_kid in kids and len(kids) == 2
+        assert verify_token(old_token)['sub'] == 'tokenuser'
+        assert verify_token(new_token)['sub'] == 'tokenuser'
+        assert new_token.split('.')[0] != old_token.split('.')[0]
+
+
+def test_first_key_is_created_once_and_published_immediately(app):
+    """A worker with a stale cache reuses the key another worker created; JWKS never lags it."""
+    with app.app_context():
+        assert get_jwks()['keys'] == []  # Caches an empty key set
+        key = generate_signing_key()
+        db.session.commit()
+        assert [k['kid'] for k in get_jwks()['keys']] == [key.kid]
+        
+        app.extensions['hlspg_signing_keys'].keys = []
+        token, _ = issue_token(_principal())
+        assert SigningKey.query.count() == 1
+        assert verify_token(token)['sub'] == 'tokenuser'
+
+
+def test_jwks_endpoint(client):
+    response = client.get('/.well-known/jwks.json')
+    assert response.status_code == 200
+    assert 'keys' in response.get_json()